@@ -119,6 +119,58 @@ LOGGING = {
     },
 }
 
+# Cosecha OAI-PMH
+# Número de artículos por sentencia INSERT en el upsert masivo de cada página.
+COSECHA_BATCH_SIZE = config('COSECHA_BATCH_SIZE', default=500, cast=int)
+# Analiza cada página de forma incremental mientras se descarga (memoria acotada).
+COSECHA_STREAMING = config('COSECHA_STREAMING', default=False, cast=bool)
+# Descarga y análisis en un hilo aparte, solapados con la escritura en la base de datos.
+# La profundidad es el número de lotes o páginas en espera entre ambas etapas.
+COSECHA_PIPELINE = config('COSECHA_PIPELINE', default=True, cast=bool)
+COSECHA_PIPELINE_PROFUNDIDAD = config('COSECHA_PIPELINE_PROFUNDIDAD', default=4, cast=int)
+# Procesos que analizan las páginas en paralelo durante la cosecha (0: análisis en el mismo proceso).
+COSECHA_PROCESOS = config('COSECHA_PROCESOS', default=0, cast=int)
+# Revistas cosechadas en paralelo y conexiones simultáneas permitidas contra un mismo host.
+COSECHA_WORKERS = config('COSECHA_WORKERS', default=4, cast=int)
+COSECHA_MAX_POR_HOST = config('COSECHA_MAX_POR_HOST', default=2, cast=int)
+# Flujos ListRecords&set=... simultáneos al cosechar un repositorio por sets.
+COSECHA_SETS_POR_HOST = config('COSECHA_SETS_POR_HOST', default=2, cast=int)
+# Segundos sin latido tras los que un trabajo o una cosecha en curso se da por abandonado
+# (worker caído): el trabajo se marca como fallido y la cosecha puede reanudarse.
+# Debe superar lo que puede tardar una página con todos sus reintentos.
+COSECHA_VENCIMIENTO = config('COSECHA_VENCIMIENTO', default=900, cast=int)
+# Directorio donde se archivan comprimidas las páginas ListRecords de cada cosecha, para
+# reprocesarlas sin volver a cosechar (comando `reprocesar`). Vacío: no se archivan.
+COSECHA_ARCHIVO_DIR = config('COSECHA_ARCHIVO_DIR', default='')
+# Cliente HTTP: timeouts en segundos y reintentos con espera exponencial (o Retry-After).
+COSECHA_TIMEOUT_CONEXION = config('COSECHA_TIMEOUT_CONEXION', default=10, cast=float)
+COSECHA_TIMEOUT_LECTURA = config('COSECHA_TIMEOUT_LECTURA', default=120, cast=float)
+COSECHA_REINTENTOS = config('COSECHA_REINTENTOS', default=5, cast=int)
+COSECHA_ESPERA_BASE = config('COSECHA_ESPERA_BASE', default=2, cast=float)
+COSECHA_ESPERA_MAXIMA = config('COSECHA_ESPERA_MAXIMA', default=300, cast=float)
+
+# API
+# Artículos por página en los listados (paginación por cursor) y máximo que puede pedirse con ?page_size=.
+API_ARTICULOS_POR_PAGINA = config('API_ARTICULOS_POR_PAGINA', default=50, cast=int)
+API_ARTICULOS_MAX_POR_PAGINA = config('API_ARTICULOS_MAX_POR_PAGINA', default=500, cast=int)
+# Filas leídas por consulta al exportar artículos en streaming (/api/articulos/exportar/).
+API_EXPORTACION_BLOQUE = config('API_EXPORTACION_BLOQUE', default=2000, cast=int)
+# Palabras clave devueltas por /api/palabras-clave/ por defecto y máximo que puede pedirse con ?limite=.
+API_PALABRAS_CLAVE_LIMITE = config('API_PALABRAS_CLAVE_LIMITE', default=20, cast=int)
+API_PALABRAS_CLAVE_MAX_LIMITE = config('API_PALABRAS_CLAVE_MAX_LIMITE', default=200, cast=int)
+
+# Caché de las respuestas de lectura (revistas, estadísticas, instituciones), versionada por
+# generación. La cosecha corre en otro proceso (harvest_worker), así que el backend debe ser
+# compartido entre procesos: archivos en disco por defecto, o Memcached/Redis en varios servidores.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+    }
+}
+# Segundos que se conserva cada respuesta; una cosecha o edición las invalida antes.
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=86400, cast=int)
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -2,13 +2,14 @@ import csv
 from django import forms
 from django.http import HttpResponse
 from django.contrib import admin, messages
-from django.shortcuts import redirect, render
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import path, reverse
 from django.utils.html import format_html
 from import_export.admin import ImportExportMixin 
-from .models import Revista, Articulo
+from .models import Revista, Articulo, HarvestRun, HarvestJob
 from .resources import RevistaResource, ArticuloResource
-from .utils import cosechar_datos_directo
 
 @admin.register(Revista)
 class RevistaAdmin(ImportExportMixin, admin.ModelAdmin):
@@ -20,13 +21,14 @@ class RevistaAdmin(ImportExportMixin, admin.ModelAdmin):
         'official_url',
         'base_url',
         'last_harvest_date',
+        'estado_cosecha',
         'publisher',
         'admin_email',
     )
     search_fields = ('repository_name', 'base_url', 'admin_email', 'official_url', 'description')
     list_filter = ('protocol_version', 'publisher',)
     resource_class = RevistaResource
-    actions = ['cosecha_seleccionados']
+    actions = ['cosecha_seleccionados', 'actualizar_sets']
 
     def cover_image_display(self, obj):
         if obj.cover_image:
@@ -34,6 +36,23 @@ class RevistaAdmin(ImportExportMixin, admin.ModelAdmin):
         return "No Image"
     cover_image_display.short_description = "Portada"
 
+    def get_queryset(self, request):
+        ultimo_trabajo = HarvestJob.objects.filter(revista=OuterRef('pk')).order_by('-creado')
+        return super().get_queryset(request).annotate(
+            ultimo_trabajo_estado=Subquery(ultimo_trabajo.values('estado')[:1])
+        )
+
+    def estado_cosecha(self, obj):
+        if not obj.ultimo_trabajo_estado:
+            return "-"
+        return format_html(
+            '<a href="{}?revista__id__exact={}">{}</a>',
+            reverse('admin:revistas_harvestjob_changelist'),
+            obj.pk,
+            dict(HarvestJob.ESTADOS)[obj.ultimo_trabajo_estado],
+        )
+    estado_cosecha.short_description = "Cosecha"
+
     def get_form(self, request, obj=None, **kwargs):
         if obj is None:
             kwargs['form'] = RevistaCreateForm
@@ -48,12 +67,13 @@ class RevistaAdmin(ImportExportMixin, admin.ModelAdmin):
         return custom_urls + urls
 
     def cosechar_revista(self, request, pk):
-        try:
-            revista = Revista.objects.get(pk=pk)
-            cosechar_datos_directo(revista.base_url, revista.metadata_prefix, revista.id)
-            messages.success(request, f"Datos cosechados exitosamente desde la revista: {revista.repository_name}")
-        except Exception as e:
-            messages.error(request, f"Error al cosechar datos: {str(e)}")
+        revista = get_object_or_404(Revista, pk=pk)
+        HarvestJob.encolar(revista)
+        messages.success(
+            request,
+            f"Cosecha de la revista {revista.repository_name} encolada. "
+            f"El proceso harvest_worker la ejecutará en segundo plano."
+        )
         return redirect('admin:revistas_revista_changelist')
 
     def editar_revista(self, request, pk):
@@ -90,40 +110,103 @@ class RevistaAdmin(ImportExportMixin, admin.ModelAdmin):
     
     def cosecha_seleccionados(self, request, queryset):
         """
-        Realiza la cosecha de datos para las revistas seleccionadas.
+        Encola la cosecha de las revistas seleccionadas.
         """
         if not queryset.exists():
             messages.error(request, "No se seleccionaron revistas para cosechar.")
             return
     
-        errores = []
-        exitos = 0
-    
+        encoladas = 0
         for revista in queryset:
-            try:
-                # Reutilizamos la función `cosechar_datos_directo`
-                cosechar_datos_directo(revista.base_url, revista.metadata_prefix, revista.id)
-                exitos += 1
-            except Exception as e:
-                errores.append(f"Error al cosechar la revista '{revista.repository_name}': {str(e)}")
+            HarvestJob.encolar(revista)
+            encoladas += 1
     
-        # Mostrar mensajes en el admin
-        if exitos:
-            messages.success(request, f"Cosecha completada con éxito para {exitos} revista(s).")
-        if errores:
-            messages.error(request, "Ocurrieron errores:\n" + "\n".join(errores))
+        messages.success(request, f"Cosecha encolada para {encoladas} revista(s).")
     
     cosecha_seleccionados.short_description = "Cosechar datos de las revistas seleccionadas"
 
+    def actualizar_sets(self, request, queryset):
+        """
+        Vuelve a pedir con ListSets los sets de las revistas seleccionadas.
+        """
+        for revista in queryset:
+            try:
+                revista.fetch_sets()
+            except ValueError as e:
+                messages.error(request, str(e))
+                continue
+            revista.save(update_fields=['sets'])
+            messages.success(request, f"{revista.repository_name}: {len(revista.lista_sets())} set(s).")
+
+    actualizar_sets.short_description = "Actualizar los sets de las revistas seleccionadas"
+
 @admin.register(Articulo)
 class ArticuloAdmin(ImportExportMixin, admin.ModelAdmin):
     list_display = ('title_es', 'title_en', 'publisher', 'language', 'rights')
     search_fields = ('title_es', 'title_en', 'publisher', 'language')
     list_filter = ('language',)
-    ordering = ('-title_es',)
+    # Los más recientes primero, en el orden de la clave primaria: title_es es TEXT y no
+    # admite un índice que sirva para ordenar, así que cada página ordenaba toda la tabla.
+    ordering = ('-id',)
     resource_class = ArticuloResource
 
 
+@admin.register(HarvestRun)
+class HarvestRunAdmin(admin.ModelAdmin):
+    list_display = (
+        'revista', 'set_spec', 'estado', 'completa', 'inicio', 'fin', 'paginas',
+        'creados', 'actualizados', 'sin_cambios', 'eliminados',
+    )
+    list_filter = ('estado', 'completa')
+    search_fields = ('revista__repository_name',)
+    list_select_related = ('revista',)
+    readonly_fields = [field.name for field in HarvestRun._meta.fields]
+
+
+@admin.register(HarvestJob)
+class HarvestJobAdmin(admin.ModelAdmin):
+    list_display = ('revista', 'estado', 'completa', 'creado', 'inicio', 'fin', 'paginas', 'registros', 'worker', 'error')
+    list_filter = ('estado', 'completa', 'revista')
+    search_fields = ('revista__repository_name',)
+    list_select_related = ('revista', 'cosecha')
+    readonly_fields = [field.name for field in HarvestJob._meta.fields]
+    actions = ['reencolar']
+
+    def get_queryset(self, request):
+        # Suma los contadores de todas las cosechas del trabajo (una por set); los trabajos
+        # anteriores al enlace solo tienen `cosecha`.
+        cosechas = HarvestRun.objects.filter(trabajo=OuterRef('pk')).values('trabajo')
+        registros = F('creados') + F('actualizados') + F('sin_cambios') + F('eliminados')
+        return super().get_queryset(request).annotate(
+            total_paginas=Coalesce(
+                Subquery(cosechas.annotate(total=Sum('paginas')).values('total')),
+                F('cosecha__paginas'), 0,
+            ),
+            total_registros=Coalesce(
+                Subquery(cosechas.annotate(total=Sum(registros)).values('total')),
+                F('cosecha__creados') + F('cosecha__actualizados')
+                + F('cosecha__sin_cambios') + F('cosecha__eliminados'), 0,
+            ),
+        )
+
+    def paginas(self, obj):
+        return obj.total_paginas
+    paginas.short_description = "Páginas"
+    paginas.admin_order_field = 'total_paginas'
+
+    def registros(self, obj):
+        return obj.total_registros
+    registros.short_description = "Registros"
+    registros.admin_order_field = 'total_registros'
+
+    def reencolar(self, request, queryset):
+        trabajos = queryset.exclude(estado=HarvestJob.EN_COLA).select_related('revista')
+        for trabajo in trabajos:
+            HarvestJob.encolar(trabajo.revista, completa=trabajo.completa)
+        messages.success(request, f"{len(trabajos)} trabajo(s) encolado(s) de nuevo.")
+    reencolar.short_description = "Volver a encolar los trabajos seleccionados"
+
+
 # Formulario personalizado para crear revistas
 class RevistaCreateForm(forms.ModelForm):
     class Meta:
@@ -142,7 +225,7 @@ class RevistaCreateForm(forms.ModelForm):
 class RevistaEditForm(forms.ModelForm):
     class Meta:
         model = Revista
-        fields = ['repository_name', 'description', 'cover_image', 'base_url', 'official_url']
+        fields = ['repository_name', 'description', 'cover_image', 'base_url', 'official_url', 'cosechar_por_sets']
 
     def save(self, commit=True):
         instance = super().save(commit=False)
@@ -0,0 +1,105 @@
+import gzip
+import io
+import os
+import re
+from contextlib import contextmanager
+
+# Páginas guardadas como <directorio>/<revista>/<cosecha>/<página>.xml.gz
+PATRON_PAGINA = re.compile(r"^(\d+)\.xml\.gz$")
+
+
+class CopiaFlujo(io.RawIOBase):
+    """
+    Envuelve un flujo de lectura y copia en `destino` todo lo que se lee de él. Permite
+    archivar una página mientras se analiza en streaming, sin leerla dos veces.
+    """
+
+    def __init__(self, flujo, destino):
+        self.flujo = flujo
+        self.destino = destino
+        self.pendiente = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.pendiente:
+            # Con compresión, algunas versiones de urllib3 devuelven más bytes de los pedidos.
+            self.pendiente = self.flujo.read(len(buffer))
+            self.destino.write(self.pendiente)
+        n = min(len(buffer), len(self.pendiente))
+        buffer[:n] = self.pendiente[:n]
+        self.pendiente = self.pendiente[n:]
+        return n
+
+
+class ArchivoPaginas:
+    """
+    Archivo local de las páginas ListRecords tal como las envió el repositorio,
+    comprimidas con gzip e indexadas por revista, cosecha y número de página.
+    Permite volver a procesar el catálogo (comando `reprocesar`) sin volver a cosechar.
+    """
+
+    def __init__(self, directorio, revista_id, cosecha_id, primera_pagina=1):
+        self.carpeta = os.path.join(directorio, str(revista_id), str(cosecha_id))
+        self.siguiente = primera_pagina
+
+    @contextmanager
+    def escribir(self):
+        """
+        Abre el archivo de la página siguiente para escritura. El archivo solo aparece con
+        su nombre definitivo si el bloque termina sin errores, así que nunca quedan páginas a medias.
+        """
+        os.makedirs(self.carpeta, exist_ok=True)
+        ruta = os.path.join(self.carpeta, f"{self.siguiente:06d}.xml.gz")
+        temporal = f"{ruta}.tmp"
+        try:
+            with gzip.open(temporal, "wb", compresslevel=6) as destino:
+                yield destino
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        self.siguiente += 1
+
+    def guardar(self, contenido):
+        """
+        Archiva el cuerpo completo (bytes) de la página siguiente.
+        """
+        with self.escribir() as destino:
+            destino.write(contenido)
+
+
+def paginas_archivadas(directorio, revista_id=None, cosecha_id=None):
+    """
+    Recorre las páginas archivadas en orden de revista, cosecha y página, que es el orden
+    en que se cosecharon. Produce tuplas `(revista_id, cosecha_id, pagina, ruta)`.
+    """
+
+    def numericas(carpeta):
+        if not os.path.isdir(carpeta):
+            return []
+        return sorted(int(nombre) for nombre in os.listdir(carpeta) if nombre.isdigit())
+
+    revistas = [revista_id] if revista_id is not None else numericas(directorio)
+    for revista in revistas:
+        carpeta_revista = os.path.join(directorio, str(revista))
+        cosechas = [cosecha_id] if cosecha_id is not None else numericas(carpeta_revista)
+        for cosecha in cosechas:
+            carpeta = os.path.join(carpeta_revista, str(cosecha))
+            if not os.path.isdir(carpeta):
+                continue
+            paginas = sorted(
+                int(m.group(1)) for m in map(PATRON_PAGINA.match, os.listdir(carpeta)) if m
+            )
+            for pagina in paginas:
+                yield revista, cosecha, pagina, os.path.join(carpeta, f"{pagina:06d}.xml.gz")
+
+
+def leer_pagina(ruta):
+    """
+    Devuelve el contenido (bytes) de una página archivada.
+    """
+    with gzip.open(ruta, "rb") as origen:
+        return origen.read()
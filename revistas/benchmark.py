@@ -0,0 +1,230 @@
+import os
+import sys
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
+
+from django.db import connection
+
+from .models import Articulo, Revista
+from .oai_sintetico import ServidorOAISintetico
+from .utils import (
+    NAMESPACES,
+    Cronometro,
+    analizar_pagina,
+    cosechar_datos_directo,
+    crear_pool_analisis,
+    extraer_registro,
+    formatear_fecha,
+    limpiar_texto,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_maximo_mb():
+    """
+    Memoria residente máxima del proceso en MB, o None si la plataforma no la informa.
+    """
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB y macOS en bytes.
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+class ContadorConsultas:
+    """
+    Cuenta las consultas SQL ejecutadas sobre `connection` mientras está instalado
+    mediante `connection.execute_wrapper`.
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def ejecutar_benchmark(
+    registros=1000,
+    tamano_pagina=100,
+    latencia=0,
+    cada_503=None,
+    silencioso=True,
+    **opciones,
+):
+    """
+    Cosecha de principio a fin un `ServidorOAISintetico` con `cosechar_datos_directo` y
+    mide el rendimiento. Escribe en la base de datos activa, así que debe ejecutarse sobre
+    una base de pruebas. El resto de `opciones` (streaming, pipeline, batch_size...) se pasa
+    a `cosechar_datos_directo`.
+
+    Devuelve un diccionario con los registros, el tiempo total, registros por segundo,
+    consultas SQL por registro, peticiones HTTP, el pico de memoria residente y el tiempo
+    de cada etapa.
+    """
+    with ServidorOAISintetico(registros, tamano_pagina, latencia, cada_503) as servidor:
+        # Sin nombre, la revista toma sus metadatos del Identify del servidor sintético.
+        revista = Revista.objects.create(base_url=servidor.url, metadata_prefix="oai_dc")
+        cronometro = Cronometro()
+        consultas = ContadorConsultas()
+
+        # La cosecha informa de cada página por consola; se descarta para no medir la salida.
+        with open(os.devnull, "w") as nulo, redirect_stdout(nulo if silencioso else sys.stdout):
+            with connection.execute_wrapper(consultas):
+                inicio = time.perf_counter()
+                resumen = cosechar_datos_directo(
+                    revista.base_url, revista.metadata_prefix, revista.id, cronometro=cronometro, **opciones
+                )
+                total = time.perf_counter() - inicio
+
+        guardados = Articulo.objects.filter(fuente=revista).count()
+
+    return {
+        "registros": registros,
+        "guardados": guardados,
+        "resumen": resumen,
+        "segundos": total,
+        "registros_por_segundo": registros / total if total else 0,
+        "consultas": consultas.total,
+        "consultas_por_registro": consultas.total / registros if registros else 0,
+        "peticiones": servidor.peticiones,
+        "respuestas_503": servidor.respuestas_503,
+        "rss_maximo_mb": rss_maximo_mb(),
+        "etapas": dict(cronometro.tiempos),
+    }
+
+
+# Campos de texto que `construir_articulo` pasa por `limpiar_texto`.
+CAMPOS_LIMPIADOS = (
+    "set_spec", "title_es", "title_en", "creator", "publisher", "type", "format",
+    "language", "relation", "coverage", "rights",
+)
+
+
+def extraer_registro_referencia(record, namespaces=NAMESPACES):
+    """
+    Implementación anterior de `extraer_registro`, con una consulta findtext/findall por
+    campo. Se conserva solo como referencia para `benchmark_extraccion`.
+    """
+    header = record.find("oai:header", namespaces)
+    if header is not None and header.get("status") == "deleted":
+        return {
+            "identifier": header.findtext("oai:identifier", namespaces=namespaces),
+            "datestamp": formatear_fecha(header.findtext("oai:datestamp", namespaces=namespaces)),
+            "deleted": True,
+        }
+
+    metadata = record.find("oai:metadata/oai_dc:dc", namespaces)
+    if header is None or metadata is None:
+        return None
+
+    return {
+        "identifier": header.findtext("oai:identifier", namespaces=namespaces),
+        "datestamp": formatear_fecha(header.findtext("oai:datestamp", namespaces=namespaces)),
+        "set_spec": header.findtext("oai:setSpec", namespaces=namespaces),
+        "title_es": metadata.findtext("dc:title[@xml:lang='es-ES']", namespaces=namespaces),
+        "title_en": metadata.findtext("dc:title[@xml:lang='en-US']", namespaces=namespaces),
+        "creator": metadata.findtext("dc:creator", namespaces=namespaces),
+        "publisher": metadata.findtext("dc:publisher", namespaces=namespaces),
+        "type": metadata.findtext("dc:type", namespaces=namespaces),
+        "format": metadata.findtext("dc:format", namespaces=namespaces),
+        "identifier_url": metadata.findtext("dc:identifier", namespaces=namespaces),
+        "language": metadata.findtext("dc:language", namespaces=namespaces),
+        "relation": metadata.findtext("dc:relation", namespaces=namespaces),
+        "coverage": metadata.findtext("dc:coverage", namespaces=namespaces),
+        "rights": metadata.findtext("dc:rights", namespaces=namespaces),
+        "date": formatear_fecha(metadata.findtext("dc:date", namespaces=namespaces)),
+        "subjects_es": [s.text for s in metadata.findall("dc:subject[@xml:lang='es-ES']", namespaces) if s.text],
+        "subjects_en": [s.text for s in metadata.findall("dc:subject[@xml:lang='en-US']", namespaces) if s.text],
+        "descriptions_es": [d.text for d in metadata.findall("dc:description[@xml:lang='es-ES']", namespaces) if d.text],
+        "descriptions_en": [d.text for d in metadata.findall("dc:description[@xml:lang='en-US']", namespaces) if d.text],
+        "sources": [src.text for src in metadata.findall("dc:source", namespaces) if src.text],
+    }
+
+
+def limpiar_texto_referencia(texto, max_length=None):
+    """
+    Implementación anterior de `limpiar_texto`, carácter por carácter. Solo para comparar.
+    """
+    if texto:
+        texto_limpio = ''.join(c for c in texto if unicodedata.category(c) != 'Cs')
+        if max_length and len(texto_limpio) > max_length:
+            return texto_limpio[:max_length]
+        return texto_limpio
+    return "No disponible"
+
+
+def benchmark_extraccion(registros=2000, repeticiones=5):
+    """
+    Micro-benchmark de la extracción y limpieza de registros Dublin Core, sin red ni base
+    de datos: compara `extraer_registro` y `limpiar_texto` con sus implementaciones
+    anteriores sobre registros del servidor sintético. Toma el mejor de `repeticiones` pasadas.
+    Devuelve el coste por registro en microsegundos de cada versión y la aceleración.
+    """
+    xml = ServidorOAISintetico(registros=registros, tamano_pagina=registros).responder({"verb": "ListRecords"})
+    records = ET.fromstring(xml).findall("oai:ListRecords/oai:record", NAMESPACES)
+
+    def medir(extraer, limpiar):
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for record in records:
+                registro = extraer(record)
+                for campo in CAMPOS_LIMPIADOS:
+                    limpiar(registro[campo])
+            mejor = min(mejor, time.perf_counter() - inicio)
+        return mejor / len(records) * 1_000_000
+
+    with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+        actual = medir(extraer_registro, limpiar_texto)
+        referencia = medir(extraer_registro_referencia, limpiar_texto_referencia)
+
+    return {
+        "registros": len(records),
+        "us_por_registro": actual,
+        "us_por_registro_referencia": referencia,
+        "aceleracion": referencia / actual if actual else 0,
+    }
+
+
+def benchmark_procesos(registros=5000, tamano_pagina=100, procesos=None):
+    """
+    Mide cómo escala el análisis de páginas con el número de procesos del pool, sin red
+    ni base de datos. `procesos` es la lista de tamaños de pool a probar; por defecto
+    1, 2, 4... hasta el número de núcleos. El arranque de los procesos no se mide.
+    Devuelve, para cada tamaño, los registros por segundo y la aceleración respecto al primero.
+    """
+    servidor = ServidorOAISintetico(registros=registros, tamano_pagina=tamano_pagina)
+    paginas = [
+        servidor.responder({"verb": "ListRecords", "resumptionToken": f"|{inicio}"}).encode()
+        for inicio in range(0, registros, tamano_pagina)
+    ]
+    if procesos is None:
+        nucleos = os.cpu_count() or 1
+        procesos = sorted({2 ** i for i in range(nucleos.bit_length()) if 2 ** i <= nucleos} | {nucleos})
+
+    resultados = []
+    for tamano in procesos:
+        with crear_pool_analisis(tamano) as pool:
+            # Calentamiento: arranca los procesos antes de medir.
+            list(pool.map(analizar_pagina, paginas[:1] * tamano))
+            inicio = time.perf_counter()
+            analizados = sum(len(tuplas) for tuplas, _ in pool.map(analizar_pagina, paginas))
+            segundos = time.perf_counter() - inicio
+        resultados.append({
+            "procesos": tamano,
+            "segundos": segundos,
+            "registros_por_segundo": analizados / segundos if segundos else 0,
+        })
+
+    base = resultados[0]["registros_por_segundo"]
+    for resultado in resultados:
+        resultado["aceleracion"] = resultado["registros_por_segundo"] / base if base else 0
+    return resultados
@@ -0,0 +1,58 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from .models import Articulo
+
+# Columnas indexadas (migración 0008_busqueda): FULLTEXT en MySQL y FTS5 en SQLite.
+CAMPOS_BUSQUEDA = ["title_es", "title_en", "subjects_es", "subjects_en", "descriptions_es", "descriptions_en"]
+TABLA_FTS = "revistas_articulo_busqueda"
+PALABRAS = re.compile(r"\w+")
+
+
+def buscar_articulos(consulta, queryset=None):
+    """
+    Artículos de `queryset` (por defecto todos) que coinciden con el texto `consulta` en
+    títulos, temas y descripciones, anotados con `relevancia` y ordenados de mayor a menor.
+    Usa el índice FULLTEXT en MySQL y la tabla FTS5 en SQLite; en otros motores recurre
+    a búsquedas `icontains`, sin ranking.
+    """
+    queryset = Articulo.objects.all() if queryset is None else queryset
+    palabras = PALABRAS.findall(consulta)
+    if not palabras:
+        return queryset.none()
+
+    if connection.vendor == "mysql":
+        # Con MATCH en el WHERE, MySQL resuelve la búsqueda con el índice FULLTEXT.
+        relevancia = RawSQL(
+            f"MATCH ({', '.join(CAMPOS_BUSQUEDA)}) AGAINST (%s IN NATURAL LANGUAGE MODE)",
+            [" ".join(palabras)],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(relevancia=relevancia).filter(relevancia__gt=0).order_by("-relevancia", "-id")
+
+    if connection.vendor == "sqlite":
+        # Cada palabra entre comillas, para que la sintaxis de FTS5 no interprete la entrada.
+        # Basta con que aparezca una, como en el modo de lenguaje natural de MySQL.
+        expresion = " OR ".join(f'"{palabra}"' for palabra in palabras)
+        coincidencias = RawSQL(f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", [expresion])
+        # bm25 es menor cuanto más relevante; se invierte para ordenar igual que en MySQL.
+        relevancia = RawSQL(
+            f"SELECT -bm25({TABLA_FTS}) FROM {TABLA_FTS} "
+            f"WHERE {TABLA_FTS} MATCH %s AND {TABLA_FTS}.rowid = revistas_articulo.id",
+            [expresion],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(id__in=coincidencias)
+            .annotate(relevancia=relevancia)
+            .order_by("-relevancia", "-id")
+        )
+
+    filtro = reduce(
+        or_, (Q(**{f"{campo}__icontains": palabra}) for campo in CAMPOS_BUSQUEDA for palabra in palabras)
+    )
+    return queryset.filter(filtro).annotate(relevancia=Value(0.0)).order_by("-id")
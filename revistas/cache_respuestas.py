@@ -0,0 +1,90 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Ámbito de las respuestas que cambian con cualquier cosecha o edición (listados, totales).
+GLOBAL = "global"
+
+
+def _clave_generacion(ambito):
+    return f"revistas:generacion:{ambito}"
+
+
+def generacion(ambito):
+    """
+    Generación actual de `ambito` (GLOBAL o el id de una revista): la hora, en nanosegundos,
+    en que se invalidó por última vez. Si no está en la caché se inicializa con la hora
+    actual, para no repetir una generación anterior aunque la caché se haya vaciado.
+    """
+    clave = _clave_generacion(ambito)
+    cache.add(clave, time.time_ns(), timeout=None)
+    return cache.get(clave)
+
+
+def invalidar_respuestas(revista_id=None):
+    """
+    Avanza la generación global y, si se indica, la de la revista: las respuestas en
+    caché de la generación anterior dejan de usarse y sus ETag dejan de coincidir.
+    Se llama al terminar cada cosecha y al guardar o borrar una revista.
+
+    La nueva generación es la hora actual, que también da el `Last-Modified`, y nunca
+    menor que la anterior aunque los relojes de los servidores difieran. Se escribe con
+    `set` y no con `incr`: en `FileBasedCache` (y en la caché local) `incr` lee y escribe
+    en dos pasos, y dos invalidaciones simultáneas podían dejar una sola. Con `set`, cada
+    invalidación escribe un valor nuevo después de su cambio, así que el valor final
+    siempre es posterior a ambos.
+    """
+    for ambito in (GLOBAL, revista_id) if revista_id is not None else (GLOBAL,):
+        clave = _clave_generacion(ambito)
+        cache.set(clave, max(time.time_ns(), (cache.get(clave) or 0) + 1), timeout=None)
+
+
+def datos_en_cache(ambito, clave, construir):
+    """
+    Datos de `construir()` guardados en la caché bajo la generación actual de `ambito`,
+    para partes de una respuesta que no puede guardarse entera (p. ej. paginada por cursor).
+    """
+    clave_datos = f"revistas:datos:{ambito}:{generacion(ambito)}:{clave}"
+    datos = cache.get(clave_datos)
+    if datos is None:
+        datos = construir()
+        cache.set(clave_datos, datos, settings.API_CACHE_TIMEOUT)
+    return datos
+
+
+def respuesta_en_cache(request, ambito, construir, clase_respuesta):
+    """
+    Responde `request` con los datos de `construir()`, guardados en la caché bajo la
+    generación actual de `ambito`. La respuesta lleva un `ETag` derivado de la generación
+    y un `Last-Modified` con la hora de la generación (la última cosecha o edición que la
+    invalidó). Si la petición condicional coincide, se responde 304 sin consultar la base
+    de datos. `Last-Modified` tiene resolución de segundos: dos cambios en el mismo
+    segundo solo se distinguen por el `ETag`.
+    """
+    version = generacion(ambito)
+    etag = f'"{ambito}-{version}"'
+    prefijo = f"revistas:respuesta:{ambito}:{version}"
+    modificado = version // 10**9
+
+    no_modificada = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if no_modificada is not None:
+        no_modificada["ETag"] = etag
+        return no_modificada
+
+    ruta = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    clave_datos = f"{prefijo}:{ruta}"
+    datos = cache.get(clave_datos)
+    if datos is None:
+        datos = construir()
+        cache.set(clave_datos, datos, settings.API_CACHE_TIMEOUT)
+
+    respuesta = clase_respuesta(datos)
+    respuesta["ETag"] = etag
+    respuesta["Last-Modified"] = http_date(modificado)
+    # El cliente puede guardar la respuesta, pero debe revalidarla con el ETag antes de usarla.
+    respuesta["Cache-Control"] = "no-cache"
+    return respuesta
@@ -0,0 +1,163 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Compresiones que `requests` sabe decodificar por sí mismo.
+COMPRESIONES_SOPORTADAS = ("gzip", "deflate")
+
+# Códigos con los que el servidor indica un fallo pasajero. OAI-PMH usa 503 con
+# Retry-After para pedir al cosechador que espere antes de volver a intentarlo.
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# `requests.Session` no es segura entre hilos (cookies y estado de los adaptadores cambian
+# en cada petición): cada hilo tiene sus propias sesiones. Los hilos solo comparten los
+# semáforos de `LimitePorHost`.
+_local = threading.local()
+
+
+def obtener_sesion(url):
+    """
+    Devuelve la sesión HTTP del hilo actual para el host de `url`. Cada hilo tiene una
+    sesión por host, cuya conexión se reutiliza entre las páginas que el hilo descarga.
+    """
+    partes = urlparse(url)
+    clave = (partes.scheme, partes.netloc.lower())
+    sesiones = getattr(_local, "sesiones", None)
+    if sesiones is None:
+        sesiones = _local.sesiones = {}
+    if clave not in sesiones:
+        sesion = requests.Session()
+        # Un hilo hace una petición a la vez: basta una conexión persistente por host.
+        sesion.mount(f"{partes.scheme}://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        sesiones[clave] = sesion
+    return sesiones[clave]
+
+
+def accept_encoding(compresiones):
+    """
+    Construye la cabecera Accept-Encoding a partir de las compresiones declaradas por el
+    repositorio en Identify (por ejemplo "gzip; deflate"). Si no declara ninguna que
+    `requests` soporte, se pide la respuesta sin comprimir.
+    """
+    declaradas = {
+        c.strip().lower() for c in (compresiones or "").replace(",", ";").split(";") if c.strip()
+    }
+    aceptadas = [c for c in COMPRESIONES_SOPORTADAS if c in declaradas]
+    return ", ".join(aceptadas) or "identity"
+
+
+class LimitePorHost:
+    """
+    Limita el número de conexiones simultáneas contra un mismo host. Varias revistas
+    suelen compartir una instalación de OJS, así que el límite se aplica por host y no por revista.
+    """
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+    def _semaforo(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.maximo)
+            return self._semaforos[host]
+
+    @contextmanager
+    def conexion(self, url):
+        """
+        Ocupa una de las conexiones disponibles para el host de `url` mientras dura el bloque.
+        """
+        if not self.maximo:
+            yield
+            return
+        with self._semaforo(url):
+            yield
+
+
+SIN_LIMITE = LimitePorHost(None)
+
+
+class ClienteOAI:
+    """
+    Cliente HTTP para servidores OAI-PMH: reutiliza conexiones por host, negocia la
+    compresión declarada por el repositorio, aplica timeouts y reintenta los fallos
+    pasajeros con espera exponencial, respetando Retry-After.
+    """
+
+    def __init__(self, compresiones=None, limite_host=None, timeout=None, reintentos=None, espera_base=None):
+        self.headers = {"Accept-Encoding": accept_encoding(compresiones)}
+        self.limite_host = limite_host or SIN_LIMITE
+        self.timeout = timeout or (settings.COSECHA_TIMEOUT_CONEXION, settings.COSECHA_TIMEOUT_LECTURA)
+        self.reintentos = settings.COSECHA_REINTENTOS if reintentos is None else reintentos
+        self.espera_base = settings.COSECHA_ESPERA_BASE if espera_base is None else espera_base
+
+    @classmethod
+    def para_revista(cls, revista, **kwargs):
+        """
+        Crea un cliente con las compresiones que la revista declaró en Identify.
+        """
+        return cls(compresiones=revista.compressions, **kwargs)
+
+    def espera(self, intento, response=None):
+        """
+        Segundos a esperar antes del siguiente intento: el Retry-After del servidor si lo
+        envía, o una espera exponencial. Nunca más de COSECHA_ESPERA_MAXIMA.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        segundos = None
+        if retry_after:
+            try:
+                segundos = int(retry_after)
+            except ValueError:
+                try:
+                    fecha = parsedate_to_datetime(retry_after)
+                    segundos = (fecha - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    segundos = None
+        if segundos is None:
+            segundos = self.espera_base * 2 ** intento
+        return min(max(segundos, 0), settings.COSECHA_ESPERA_MAXIMA)
+
+    @contextmanager
+    def solicitar(self, url, stream=False):
+        """
+        Realiza una petición GET y entrega la respuesta mientras dura el bloque.
+        La conexión del host queda ocupada hasta cerrar el bloque, lo que permite leer el
+        cuerpo en streaming; durante las esperas entre reintentos se libera.
+        """
+        sesion = obtener_sesion(url)
+        for intento in range(self.reintentos + 1):
+            ultimo = intento == self.reintentos
+            with self.limite_host.conexion(url):
+                try:
+                    response = sesion.get(url, headers=self.headers, timeout=self.timeout, stream=stream)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if ultimo:
+                        raise
+                    espera = self.espera(intento)
+                    print(f"Error de conexión con {url}: {e}. Reintentando en {espera:.0f} s")
+                else:
+                    if response.status_code in CODIGOS_REINTENTABLES and not ultimo:
+                        espera = self.espera(intento, response)
+                        response.close()
+                        print(f"El servidor respondió {response.status_code}. Reintentando en {espera:.0f} s")
+                    else:
+                        try:
+                            if response.status_code != 200:
+                                raise Exception(
+                                    f"Error al conectar con {url}. Código de estado: {response.status_code}"
+                                )
+                            yield response
+                        finally:
+                            response.close()
+                        return
+            time.sleep(espera)
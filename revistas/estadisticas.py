@@ -0,0 +1,66 @@
+from django.db import connection
+from django.db.models import Count, Max, Min
+from .models import Articulo, AutorArticulo, EstadisticasPortal, EstadisticasRevista, Revista
+
+CAMPOS_ESTADISTICAS = ["total_articulos", "total_autores", "primer_anio", "ultimo_anio", "actualizado"]
+
+
+def recalcular_estadisticas(revistas=None):
+    """
+    Recalcula las estadísticas de `revistas` (por defecto, de todas) con una consulta
+    agrupada por revista, y luego los totales del portal. Se llama al terminar la cosecha
+    de cada revista; los listados y el detalle de revista solo leen estas tablas.
+    """
+    if revistas is None:
+        revistas = Revista.objects.all()
+    ids = [revista.pk for revista in revistas]
+
+    conteos = {
+        fila["fuente_id"]: fila
+        for fila in Articulo.objects.filter(fuente_id__in=ids)
+        .values("fuente_id")
+        .annotate(
+            total_articulos=Count("id"),
+            primera=Min("date"),
+            ultima=Max("date"),
+        )
+        .order_by()
+    }
+    # Autores distintos de cada revista, con el índice (fuente, autor) de las autorías.
+    autores = dict(
+        AutorArticulo.objects.filter(fuente_id__in=ids)
+        .values_list("fuente_id")
+        .annotate(total=Count("autor_id", distinct=True))
+        .order_by()
+    )
+    estadisticas = []
+    for revista_id in ids:
+        fila = conteos.get(revista_id, {})
+        estadisticas.append(EstadisticasRevista(
+            revista_id=revista_id,
+            total_articulos=fila.get("total_articulos", 0),
+            total_autores=autores.get(revista_id, 0),
+            primer_anio=fila["primera"].year if fila.get("primera") else None,
+            ultimo_anio=fila["ultima"].year if fila.get("ultima") else None,
+        ))
+
+    # MySQL resuelve el conflicto con ON DUPLICATE KEY UPDATE y no admite indicar la clave.
+    unique_fields = ["revista"] if connection.features.supports_update_conflicts_with_target else None
+    EstadisticasRevista.objects.bulk_create(
+        estadisticas, update_conflicts=True, update_fields=CAMPOS_ESTADISTICAS, unique_fields=unique_fields
+    )
+    return recalcular_estadisticas_portal()
+
+
+def recalcular_estadisticas_portal():
+    """
+    Recalcula los totales globales del portal y devuelve su `EstadisticasPortal`.
+    """
+    portal = EstadisticasPortal(
+        pk=1,
+        total_revistas=Revista.objects.count(),
+        total_articulos=Articulo.objects.count(),
+        total_autores=AutorArticulo.objects.aggregate(total=Count("autor_id", distinct=True))["total"],
+    )
+    portal.save()
+    return portal
@@ -0,0 +1,58 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Articulo
+
+# Columnas exportadas: las del API, con la revista como `fuente` (su id).
+CAMPOS_EXPORTACION = [
+    campo.attname for campo in Articulo._meta.concrete_fields if campo.name != "huella"
+]
+COLUMNAS_EXPORTACION = ["fuente" if campo == "fuente_id" else campo for campo in CAMPOS_EXPORTACION]
+
+
+def filas_por_bloques(queryset, campos, tamano_bloque):
+    """
+    Recorre `queryset` en bloques de `tamano_bloque` filas ordenadas por id, pidiendo cada
+    bloque con `id > último id` (paginación por clave). Cada consulta es una búsqueda por
+    índice y solo hay un bloque en memoria a la vez, en cualquier motor: el `iterator()`
+    de Django no ofrece cursores del lado del servidor con MySQL.
+    Produce tuplas con los valores de `campos`.
+    """
+    ultimo = 0
+    while True:
+        bloque = list(
+            queryset.filter(id__gt=ultimo).order_by("id").values_list("id", *campos)[:tamano_bloque]
+        )
+        for fila in bloque:
+            yield fila[1:]
+        if len(bloque) < tamano_bloque:
+            return
+        ultimo = bloque[-1][0]
+
+
+def exportar_ndjson(filas):
+    """
+    Un objeto JSON por línea y por artículo.
+    """
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    for fila in filas:
+        yield codificador.encode(dict(zip(COLUMNAS_EXPORTACION, fila))) + "\n"
+
+
+class _Eco:
+    """
+    Destino de `csv.writer` que devuelve cada línea en lugar de acumularla.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(filas):
+    """
+    CSV con una fila de encabezados y una línea por artículo.
+    """
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS_EXPORTACION)
+    for fila in filas:
+        yield escritor.writerow(fila)
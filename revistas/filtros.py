@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+from rest_framework.exceptions import ValidationError
+
+# Filtros de los listados de artículos: parámetro del query string -> campo de Articulo.
+# Cada uno se resuelve con un índice de la migración 0012_indices_facetas.
+FILTROS_ARTICULOS = {
+    "fuente": "fuente_id",
+    "anio": "date",
+    "idioma": "language",
+    "tipo": "type",
+}
+
+
+def filtros_de_parametros(parametros, disponibles=FILTROS_ARTICULOS):
+    """
+    Lee del query string los filtros de `disponibles` que vienen con valor. Devuelve un
+    diccionario parámetro -> valor; lanza ValidationError si `fuente` o `anio` no son números.
+    """
+    filtros = {}
+    for parametro in disponibles:
+        valor = parametros.get(parametro, "").strip()
+        if not valor:
+            continue
+        if parametro in ("fuente", "anio"):
+            if not valor.isdigit() or not 0 < int(valor) < 10000:
+                raise ValidationError({parametro: "Debe ser un número entero positivo."})
+            valor = int(valor)
+        filtros[parametro] = valor
+    return filtros
+
+
+def aplicar_filtros(queryset, filtros, excepto=None):
+    """
+    Filtra `queryset` con `filtros` (ver `filtros_de_parametros`), salvo el de `excepto`.
+    El año se filtra como un rango de fechas para que se use el índice (fuente, date).
+    """
+    for parametro, valor in filtros.items():
+        if parametro == excepto:
+            continue
+        if parametro == "anio":
+            queryset = queryset.filter(date__gte=date(valor, 1, 1), date__lt=date(valor + 1, 1, 1))
+        else:
+            queryset = queryset.filter(**{FILTROS_ARTICULOS[parametro]: valor})
+    return queryset
+
+
+def contar_facetas(queryset, filtros, facetas):
+    """
+    Cuenta los artículos de `queryset` por cada valor de `facetas`, con una consulta
+    agrupada por faceta. Cada faceta se cuenta con los demás filtros aplicados, pero no
+    con el suyo, para que el cliente pueda mostrar las alternativas al valor elegido.
+    Devuelve {faceta: [{"valor": ..., "total": ...}, ...]}, de mayor a menor total.
+    """
+    resultado = {}
+    for faceta in facetas:
+        articulos = aplicar_filtros(queryset, filtros, excepto=faceta)
+        if faceta == "anio":
+            campo = "valor"
+            articulos = articulos.exclude(date__isnull=True).annotate(valor=ExtractYear("date"))
+        else:
+            campo = FILTROS_ARTICULOS[faceta]
+            articulos = articulos.exclude(**{f"{campo}__isnull": True})
+        conteos = articulos.values_list(campo).annotate(total=Count("id")).order_by("-total", campo)
+        resultado[faceta] = [{"valor": valor, "total": total} for valor, total in conteos]
+    return resultado
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Case, Count, Q, Value, When
+from revistas.cache_respuestas import invalidar_respuestas
+from revistas.models import Articulo, Revista
+from revistas.utils import NO_DISPONIBLE
+
+class Command(BaseCommand):
+    help = (
+        "Asigna a cada revista el dc:publisher más frecuente entre sus artículos, "
+        "con una sola consulta agrupada. Por defecto solo completa las revistas sin editorial."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sobrescribir',
+            action='store_true',
+            help='Reemplaza también la editorial de las revistas que ya tienen una'
+        )
+
+    def handle(self, *args, **kwargs):
+        conteos = (
+            Articulo.objects.exclude(Q(publisher__isnull=True) | Q(publisher="") | Q(publisher=NO_DISPONIBLE))
+            .values_list("fuente_id", "publisher")
+            .annotate(total=Count("id"))
+            .order_by("fuente_id", "-total", "publisher")
+        )
+        # Las filas llegan ordenadas por frecuencia dentro de cada revista: la primera es la más frecuente.
+        editoriales = {}
+        for revista_id, publisher, _ in conteos:
+            editoriales.setdefault(revista_id, publisher)
+
+        revistas = Revista.objects.filter(pk__in=editoriales)
+        if not kwargs['sobrescribir']:
+            revistas = revistas.filter(Q(publisher__isnull=True) | Q(publisher=""))
+        # Un solo UPDATE para todas las revistas, sin pasar por Revista.save().
+        actualizadas = revistas.update(publisher=Case(
+            *[When(pk=revista_id, then=Value(publisher)) for revista_id, publisher in editoriales.items()],
+            default="publisher",
+        )) if editoriales else 0
+        for revista_id in editoriales:
+            invalidar_respuestas(revista_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Editorial asignada a {actualizadas} revista(s)."))
@@ -0,0 +1,143 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from revistas.benchmark import benchmark_extraccion, benchmark_procesos, ejecutar_benchmark
+
+class Command(BaseCommand):
+    help = (
+        "Mide el rendimiento de la cosecha contra un servidor OAI-PMH sintético local. "
+        "Se ejecuta sobre una base de datos de pruebas temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--registros',
+            type=int,
+            default=5000,
+            help='Número de registros del repositorio sintético (por defecto: 5000)'
+        )
+        parser.add_argument(
+            '--pagina',
+            type=int,
+            default=100,
+            help='Registros por página de ListRecords (por defecto: 100)'
+        )
+        parser.add_argument(
+            '--latencia',
+            type=float,
+            default=0,
+            help='Segundos de latencia por petición (por defecto: 0)'
+        )
+        parser.add_argument(
+            '--cada-503',
+            type=int,
+            help='Responde 503 con Retry-After a una de cada N peticiones'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Tamaño de lote de escritura (por defecto: COSECHA_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--streaming',
+            action='store_true',
+            help='Analiza las páginas en streaming'
+        )
+        parser.add_argument(
+            '--sin-pipeline',
+            action='store_true',
+            help='Descarga, analiza y escribe en secuencia'
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            help='Procesos de análisis durante la cosecha (por defecto: COSECHA_PROCESOS)'
+        )
+        parser.add_argument(
+            '--escalado',
+            action='store_true',
+            help='Solo mide cómo escala el análisis de páginas con el número de procesos'
+        )
+        parser.add_argument(
+            '--extraccion',
+            action='store_true',
+            help='Solo compara la extracción de registros con la implementación anterior (sin red ni base de datos)'
+        )
+        parser.add_argument(
+            '--max-consultas-por-registro',
+            type=float,
+            help='Falla si se supera este número de consultas SQL por registro'
+        )
+        parser.add_argument(
+            '--min-registros-por-segundo',
+            type=float,
+            help='Falla si el rendimiento queda por debajo de este valor'
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['extraccion']:
+            metricas = benchmark_extraccion(registros=kwargs['registros'])
+            self.stdout.write(f"Registros: {metricas['registros']}")
+            self.stdout.write(f"Extracción actual: {metricas['us_por_registro']:.1f} µs por registro")
+            self.stdout.write(f"Extracción anterior: {metricas['us_por_registro_referencia']:.1f} µs por registro")
+            self.stdout.write(self.style.SUCCESS(f"Aceleración: {metricas['aceleracion']:.2f}x"))
+            return
+
+        if kwargs['escalado']:
+            self.stdout.write(f"Análisis de {kwargs['registros']} registros en páginas de {kwargs['pagina']}")
+            for resultado in benchmark_procesos(kwargs['registros'], kwargs['pagina']):
+                self.stdout.write(
+                    f"  {resultado['procesos']} proceso(s): {resultado['registros_por_segundo']:.0f} registros/s "
+                    f"({resultado['aceleracion']:.2f}x)"
+                )
+            self.stdout.write(self.style.SUCCESS("Benchmark completado."))
+            return
+
+        # Nunca se escribe en la base de datos real: se crea una de pruebas y se destruye al terminar.
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            metricas = ejecutar_benchmark(
+                registros=kwargs['registros'],
+                tamano_pagina=kwargs['pagina'],
+                latencia=kwargs['latencia'],
+                cada_503=kwargs['cada_503'],
+                silencioso=kwargs['verbosity'] < 2,
+                batch_size=kwargs['batch_size'],
+                streaming=kwargs['streaming'],
+                pipeline=not kwargs['sin_pipeline'],
+                procesos=kwargs['procesos'],
+            )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        self.stdout.write(
+            f"Registros: {metricas['registros']} ({metricas['guardados']} guardados) "
+            f"en {metricas['peticiones']} peticiones ({metricas['respuestas_503']} respuestas 503)"
+        )
+        self.stdout.write(f"Tiempo total: {metricas['segundos']:.2f} s")
+        self.stdout.write(f"Registros por segundo: {metricas['registros_por_segundo']:.0f}")
+        self.stdout.write(
+            f"Consultas SQL: {metricas['consultas']} ({metricas['consultas_por_registro']:.3f} por registro)"
+        )
+        if metricas['rss_maximo_mb'] is not None:
+            self.stdout.write(f"Memoria residente máxima: {metricas['rss_maximo_mb']:.1f} MB")
+        self.stdout.write("Tiempo por etapa:")
+        for etapa, segundos in sorted(metricas['etapas'].items()):
+            porcentaje = 100 * segundos / metricas['segundos'] if metricas['segundos'] else 0
+            self.stdout.write(f"  {etapa}: {segundos:.2f} s ({porcentaje:.0f}%)")
+
+        if metricas['guardados'] != metricas['registros']:
+            raise CommandError(
+                f"Se esperaban {metricas['registros']} artículos y se guardaron {metricas['guardados']}."
+            )
+        maximo = kwargs['max_consultas_por_registro']
+        if maximo is not None and metricas['consultas_por_registro'] > maximo:
+            raise CommandError(
+                f"Consultas por registro ({metricas['consultas_por_registro']:.3f}) por encima de {maximo}."
+            )
+        minimo = kwargs['min_registros_por_segundo']
+        if minimo is not None and metricas['registros_por_segundo'] < minimo:
+            raise CommandError(
+                f"Registros por segundo ({metricas['registros_por_segundo']:.0f}) por debajo de {minimo}."
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark completado."))
@@ -1,5 +1,6 @@
-from django.core.management.base import BaseCommand
-from revistas.utils import cosechar_datos_directo
+from django.core.management.base import BaseCommand, CommandError
+from revistas.models import Revista
+from revistas.motor_cosecha import cosechar_revistas
 
 class Command(BaseCommand):
     help = "Cosecha datos desde un enlace OAI-PMH y guarda los registros en la base de datos."
@@ -8,20 +9,82 @@ class Command(BaseCommand):
         parser.add_argument(
             '--url',
             type=str,
-            help='URL del servidor OAI-PMH',
-            required=True
+            help='URL base de una revista registrada'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Cosecha todas las revistas registradas'
         )
         parser.add_argument(
             '--metadata_prefix',
             type=str,
-            help='Prefijo de metadatos (por defecto: oai_dc)',
-            default='oai_dc'
+            help='Prefijo de metadatos (por defecto: el de cada revista)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignora la última fecha de cosecha y vuelve a sincronizar todo el repositorio'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Número de revistas cosechadas en paralelo (por defecto: COSECHA_WORKERS)'
+        )
+        parser.add_argument(
+            '--max-por-host',
+            type=int,
+            help='Conexiones simultáneas por servidor (por defecto: COSECHA_MAX_POR_HOST)'
+        )
+        parser.add_argument(
+            '--por-sets',
+            action='store_true',
+            help='Cosecha cada revista como flujos paralelos por set (ListRecords&set=...)'
+        )
+        parser.add_argument(
+            '--sets-por-host',
+            type=int,
+            help='Flujos por set simultáneos por servidor (por defecto: COSECHA_SETS_POR_HOST)'
         )
 
     def handle(self, *args, **kwargs):
-        url = kwargs['url']
-        metadata_prefix = kwargs['metadata_prefix']
+        if kwargs['all'] == bool(kwargs['url']):
+            raise CommandError("Indique --url o --all.")
+
+        if kwargs['all']:
+            revistas = list(Revista.objects.all())
+        else:
+            revistas = list(Revista.objects.filter(base_url=kwargs['url']))
+            if not revistas:
+                raise CommandError(f"No hay ninguna revista registrada con la URL {kwargs['url']}.")
+
+        if kwargs['metadata_prefix']:
+            for revista in revistas:
+                revista.metadata_prefix = kwargs['metadata_prefix']
+
+        self.stdout.write(f"Iniciando cosecha de {len(revistas)} revista(s)")
+        resultados = cosechar_revistas(
+            revistas,
+            workers=kwargs['workers'],
+            max_por_host=kwargs['max_por_host'],
+            por_sets=kwargs['por_sets'],
+            sets_por_host=kwargs['sets_por_host'],
+            completa=kwargs['full'],
+        )
+
+        errores = [r for r in resultados if r['error']]
+        for resultado in resultados:
+            revista = resultado['revista']
+            if resultado['error']:
+                self.stderr.write(f"{revista.repository_name}: {resultado['error']}")
+            else:
+                resumen = resultado['resumen']
+                self.stdout.write(
+                    f"{revista.repository_name}: {resumen['creados']} creados, "
+                    f"{resumen['actualizados']} actualizados, {resumen['sin_cambios']} sin cambios, "
+                    f"{resumen['eliminados']} eliminados"
+                )
 
-        self.stdout.write(f"Iniciando cosecha desde: {url} con prefijo: {metadata_prefix}")
-        cosechar_datos_directo(url, metadata_prefix)
+        if errores:
+            raise CommandError(f"La cosecha falló para {len(errores)} revista(s).")
         self.stdout.write(self.style.SUCCESS("Cosecha completada."))
@@ -0,0 +1,116 @@
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from revistas.cliente_oai import LimitePorHost
+from revistas.models import HarvestJob
+from revistas.motor_cosecha import ejecutar_trabajo
+
+
+class Terminado(Exception):
+    """SIGTERM recibido en el hilo principal."""
+
+
+def al_recibir_sigterm(signum, frame):
+    raise Terminado()
+
+
+class Command(BaseCommand):
+    help = "Procesa los trabajos de cosecha encolados desde el admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Trabajos ejecutados en paralelo por este proceso (por defecto: COSECHA_WORKERS)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera cuando la cola está vacía (por defecto: 5)'
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Termina en cuanto la cola queda vacía'
+        )
+
+    def handle(self, *args, **kwargs):
+        workers = kwargs['workers'] or settings.COSECHA_WORKERS
+        limite_host = LimitePorHost(settings.COSECHA_MAX_POR_HOST)
+        limite_sets = LimitePorHost(settings.COSECHA_SETS_POR_HOST)
+        detener = threading.Event()
+        sin_latidos = threading.Event()
+        nombre = f"{socket.gethostname()}:{os.getpid()}"
+        # Trabajo que ejecuta cada hilo, para el latido y para devolverlo a la cola con SIGTERM.
+        en_curso = {}
+
+        def bucle(numero):
+            worker = f"{nombre}/{numero}"
+            try:
+                while not detener.is_set():
+                    trabajo = HarvestJob.reclamar(worker)
+                    if trabajo is None:
+                        if kwargs['una_vez']:
+                            return
+                        detener.wait(kwargs['intervalo'])
+                        continue
+                    self.stdout.write(f"[{worker}] Cosechando {trabajo.revista}")
+                    en_curso[numero] = trabajo
+                    try:
+                        ejecutar_trabajo(trabajo, limite_host, limite_sets)
+                    finally:
+                        del en_curso[numero]
+                    self.stdout.write(f"[{worker}] {trabajo}")
+            finally:
+                connections.close_all()
+
+        def latir():
+            # Varios latidos por plazo, para que un latido perdido no venza el trabajo.
+            try:
+                while not sin_latidos.wait(settings.COSECHA_VENCIMIENTO / 3):
+                    try:
+                        HarvestJob.renovar_latido([trabajo.pk for trabajo in list(en_curso.values())])
+                    except DatabaseError as e:
+                        self.stderr.write(f"No se pudo renovar el latido: {e}")
+            finally:
+                connections.close_all()
+
+        self.stdout.write(f"Worker {nombre} iniciado con {workers} hilo(s)")
+        # Hilos daemon: con SIGTERM el proceso termina sin esperar a las cosechas en curso.
+        hilos = [
+            threading.Thread(target=bucle, args=(i,), name=f"harvest-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        latido = threading.Thread(target=latir, name="harvest-worker-latido", daemon=True)
+        anterior = signal.signal(signal.SIGTERM, al_recibir_sigterm)
+        try:
+            latido.start()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                while hilo.is_alive():
+                    hilo.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Deteniendo: se terminan los trabajos en curso...")
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+        except Terminado:
+            # El gestor de servicios mata el proceso si no termina pronto: las cosechas en curso
+            # se interrumpen y sus trabajos vuelven a la cola. La página a medio escribir se
+            # descarta al morir su transacción; la siguiente cosecha reanuda desde la última confirmada.
+            detener.set()
+            trabajos = [trabajo.pk for trabajo in list(en_curso.values())]
+            HarvestJob.abandonar(trabajos, HarvestJob.EN_COLA, f"Worker {nombre} detenido con SIGTERM.")
+            connections.close_all()
+            self.stdout.write(f"SIGTERM: {len(trabajos)} trabajo(s) devuelto(s) a la cola.")
+        finally:
+            signal.signal(signal.SIGTERM, anterior)
+            sin_latidos.set()
+        self.stdout.write(self.style.SUCCESS("Worker detenido."))
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from revistas.cache_respuestas import invalidar_respuestas
+from revistas.estadisticas import recalcular_estadisticas
+from revistas.exportacion import filas_por_bloques
+from revistas.models import Articulo, Autor, Revista
+from revistas.utils import NO_DISPONIBLE, autores_de, en_lotes, enlazar_autores
+
+class Command(BaseCommand):
+    help = (
+        "Enlaza con su autor los artículos ya guardados que aún no tienen autorías, a partir "
+        "de `creator`, por bloques. La cosecha mantiene las autorías al día; este comando "
+        "sirve para completarlas por primera vez sin una cosecha completa. Como `creator` "
+        "guarda solo el primer dc:creator, los coautores llegan con la próxima cosecha "
+        "completa (`cosechar --all --full`)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--revista',
+            type=int,
+            help='Id de la revista a indexar (por defecto: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Artículos por bloque (por defecto: COSECHA_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **kwargs):
+        # Los artículos con autorías ya las recibieron de una cosecha, con todos sus coautores.
+        articulos = Articulo.objects.filter(autorias__isnull=True)
+        revistas = Revista.objects.all()
+        if kwargs['revista'] is not None:
+            articulos = articulos.filter(fuente_id=kwargs['revista'])
+            revistas = revistas.filter(pk=kwargs['revista'])
+        tamano = kwargs['batch_size'] or settings.COSECHA_BATCH_SIZE
+
+        total = 0
+        filas = filas_por_bloques(articulos, ["id", "fuente_id", "creator"], tamano)
+        for lote in en_lotes(filas, tamano):
+            bloque = []
+            for articulo_id, fuente_id, creator in lote:
+                articulo = Articulo(pk=articulo_id, fuente_id=fuente_id)
+                articulo.autores_normalizados = autores_de([creator] if creator != NO_DISPONIBLE else [])
+                bloque.append(articulo)
+            with transaction.atomic():
+                enlazar_autores(bloque)
+            total += len(bloque)
+
+        revistas = list(revistas)
+        recalcular_estadisticas(revistas)
+        for revista in revistas:
+            invalidar_respuestas(revista.pk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Autores indexados. Artículos: {total}, autores: {Autor.objects.count()}"
+        ))
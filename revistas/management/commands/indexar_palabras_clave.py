@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from revistas.cache_respuestas import invalidar_respuestas
+from revistas.exportacion import filas_por_bloques
+from revistas.models import Articulo, PalabraClave, Revista
+from revistas.utils import en_lotes, enlazar_palabras_clave, palabras_clave_de
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye las palabras clave de los artículos ya guardados a partir de subjects_es "
+        "y subjects_en, por bloques. La cosecha las mantiene al día; este comando sirve para "
+        "completarlas por primera vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--revista',
+            type=int,
+            help='Id de la revista a indexar (por defecto: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Artículos por bloque (por defecto: COSECHA_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **kwargs):
+        articulos = Articulo.objects.all()
+        if kwargs['revista'] is not None:
+            articulos = articulos.filter(fuente_id=kwargs['revista'])
+        tamano = kwargs['batch_size'] or settings.COSECHA_BATCH_SIZE
+
+        total = 0
+        filas = filas_por_bloques(articulos, ["id", "fuente_id", "subjects_es", "subjects_en"], tamano)
+        for lote in en_lotes(filas, tamano):
+            bloque = []
+            for articulo_id, fuente_id, subjects_es, subjects_en in lote:
+                articulo = Articulo(pk=articulo_id, fuente_id=fuente_id)
+                articulo.palabras_normalizadas = palabras_clave_de([subjects_es or "", subjects_en or ""])
+                bloque.append(articulo)
+            with transaction.atomic():
+                enlazar_palabras_clave(bloque, reemplazar=[articulo.pk for articulo in bloque])
+            total += len(bloque)
+
+        revistas = [kwargs['revista']] if kwargs['revista'] is not None else Revista.objects.values_list("pk", flat=True)
+        for revista_id in revistas:
+            invalidar_respuestas(revista_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Palabras clave indexadas. Artículos: {total}, palabras clave: {PalabraClave.objects.count()}"
+        ))
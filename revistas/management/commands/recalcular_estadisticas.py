@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from revistas.cache_respuestas import invalidar_respuestas
+from revistas.estadisticas import recalcular_estadisticas
+from revistas.models import Revista
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las estadísticas materializadas de las revistas y los totales del portal. "
+        "La cosecha las mantiene al día; este comando sirve para completarlas por primera vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--revista',
+            type=int,
+            help='Id de la revista a recalcular (por defecto: todas)'
+        )
+
+    def handle(self, *args, **kwargs):
+        revistas = Revista.objects.all()
+        if kwargs['revista'] is not None:
+            revistas = revistas.filter(pk=kwargs['revista'])
+        revistas = list(revistas)
+        portal = recalcular_estadisticas(revistas)
+        for revista in revistas:
+            invalidar_respuestas(revista.pk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas recalculadas. Revistas: {portal.total_revistas}, "
+            f"artículos: {portal.total_articulos}, autores: {portal.total_autores}"
+        ))
@@ -0,0 +1,111 @@
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from revistas.archivo import paginas_archivadas
+from revistas.cache_respuestas import invalidar_respuestas
+from revistas.estadisticas import recalcular_estadisticas
+from revistas.models import HarvestRun, Revista
+from revistas.utils import analizar_archivadas_en_procesos, guardar_registros
+
+
+def desde_la_ultima_completa(paginas):
+    """
+    Deja, de cada revista, las páginas de su última cosecha completa terminada y de las
+    cosechas posteriores. Los artículos que una cosecha completa borra por no recibirlos
+    (`eliminar_no_vistos`) no quedan en el archivo, así que reproducir las cosechas
+    anteriores los volvería a crear. Si ninguna cosecha completa de la revista tiene todas
+    sus páginas archivadas, se reproducen todas.
+    """
+    archivadas = Counter((revista_id, cosecha_id) for revista_id, cosecha_id, _, _ in paginas)
+    completas = (
+        HarvestRun.objects.filter(
+            revista__in={revista_id for revista_id, _ in archivadas},
+            estado=HarvestRun.COMPLETADA,
+            completa=True,
+            set_spec__isnull=True,
+        )
+        .order_by("-id")
+        .values_list("revista", "id", "paginas")
+    )
+    primera = {}
+    for revista_id, cosecha_id, total in completas:
+        if revista_id not in primera and archivadas[(revista_id, cosecha_id)] == total:
+            primera[revista_id] = cosecha_id
+    return [pagina for pagina in paginas if pagina[1] >= primera.get(pagina[0], 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve a procesar las páginas ListRecords archivadas (COSECHA_ARCHIVO_DIR) y reescribe "
+        "los artículos, sin volver a cosechar los repositorios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--revista',
+            type=int,
+            help='Id de la revista a reprocesar (por defecto: todas las archivadas)'
+        )
+        parser.add_argument(
+            '--cosecha',
+            type=int,
+            help=(
+                'Id de la cosecha a reprocesar (requiere --revista). Por defecto se reprocesan la '
+                'última cosecha completa de cada revista y las posteriores'
+            )
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            help='Procesos que analizan las páginas en paralelo (por defecto: número de núcleos)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Artículos por sentencia INSERT (por defecto: COSECHA_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **kwargs):
+        directorio = settings.COSECHA_ARCHIVO_DIR
+        if not directorio:
+            raise CommandError("COSECHA_ARCHIVO_DIR no está configurado: no hay páginas archivadas.")
+        if kwargs['cosecha'] is not None and kwargs['revista'] is None:
+            raise CommandError("--cosecha requiere --revista.")
+
+        paginas = list(paginas_archivadas(directorio, kwargs['revista'], kwargs['cosecha']))
+        if kwargs['cosecha'] is None:
+            paginas = desde_la_ultima_completa(paginas)
+        if not paginas:
+            raise CommandError(f"No hay páginas archivadas en {directorio}.")
+
+        revistas = Revista.objects.in_bulk({revista_id for revista_id, _, _, _ in paginas})
+        procesos = kwargs['procesos'] or os.cpu_count()
+        totales = {"creados": 0, "actualizados": 0, "sin_cambios": 0, "eliminados": 0}
+        omitidas = 0
+
+        self.stdout.write(f"Reprocesando {len(paginas)} página(s) con {procesos} proceso(s)")
+        # El análisis se reparte entre procesos; las escrituras se hacen aquí y en el orden
+        # original de las páginas, para que la versión más reciente de cada registro prevalezca.
+        resultados = analizar_archivadas_en_procesos([ruta for _, _, _, ruta in paginas], procesos)
+        for (revista_id, cosecha_id, pagina, ruta), registros in zip(paginas, resultados):
+            revista = revistas.get(revista_id)
+            if revista is None:
+                omitidas += 1
+                continue
+            resultado = guardar_registros(registros, revista, kwargs['batch_size'])
+            for clave in totales:
+                totales[clave] += resultado[clave]
+            if kwargs['verbosity'] > 1:
+                self.stdout.write(f"{ruta}: {len(registros)} registro(s)")
+
+        recalcular_estadisticas(list(revistas.values()))
+        for revista_id in revistas:
+            invalidar_respuestas(revista_id)
+        if omitidas:
+            self.stderr.write(f"{omitidas} página(s) omitidas: su revista ya no existe.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reproceso completado. Creados: {totales['creados']}, actualizados: {totales['actualizados']}, "
+            f"sin cambios: {totales['sin_cambios']}, eliminados: {totales['eliminados']}"
+        ))
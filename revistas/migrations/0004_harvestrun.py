@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0003_revista_metadata_prefix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HarvestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('running', 'En curso'), ('completed', 'Completada'), ('failed', 'Fallida')], default='running', max_length=20, verbose_name='Estado')),
+                ('completa', models.BooleanField(default=False, verbose_name='Cosecha Completa')),
+                ('desde', models.DateTimeField(blank=True, null=True, verbose_name='Desde (from)')),
+                ('hasta', models.DateTimeField(blank=True, null=True, verbose_name='Hasta (until)')),
+                ('inicio', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Inicio')),
+                ('fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('resumption_token', models.TextField(blank=True, null=True, verbose_name='Último resumptionToken Confirmado')),
+                ('paginas', models.PositiveIntegerField(default=0, verbose_name='Páginas')),
+                ('creados', models.PositiveIntegerField(default=0, verbose_name='Creados')),
+                ('actualizados', models.PositiveIntegerField(default=0, verbose_name='Actualizados')),
+                ('eliminados', models.PositiveIntegerField(default=0, verbose_name='Eliminados')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('revista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cosechas', to='revistas.revista', verbose_name='Revista')),
+            ],
+            options={
+                'verbose_name': 'Cosecha',
+                'verbose_name_plural': 'Cosechas',
+                'ordering': ['-inicio'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0004_harvestrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HarvestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completa', models.BooleanField(default=False, verbose_name='Cosecha Completa')),
+                ('estado', models.CharField(choices=[('queued', 'En cola'), ('running', 'En curso'), ('done', 'Terminado'), ('failed', 'Fallido')], default='queued', max_length=20, verbose_name='Estado')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='Encolado')),
+                ('inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('worker', models.CharField(blank=True, max_length=255, null=True, verbose_name='Worker')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('cosecha', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to='revistas.harvestrun', verbose_name='Cosecha')),
+                ('revista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos', to='revistas.revista', verbose_name='Revista')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Cosecha',
+                'verbose_name_plural': 'Trabajos de Cosecha',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'creado'], name='revistas_ha_estado_500677_idx')],
+            },
+        ),
+    ]
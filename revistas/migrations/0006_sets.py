@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0005_harvestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='harvestrun',
+            name='set_spec',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Set'),
+        ),
+        migrations.AddField(
+            model_name='revista',
+            name='cosechar_por_sets',
+            field=models.BooleanField(default=False, verbose_name='Cosechar por Sets en Paralelo'),
+        ),
+        migrations.AddField(
+            model_name='revista',
+            name='sets',
+            field=models.TextField(blank=True, null=True, verbose_name='Conjuntos (Sets)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0006_sets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articulo',
+            name='huella',
+            field=models.CharField(blank=True, max_length=32, null=True, verbose_name='Huella del Contenido'),
+        ),
+        migrations.AddField(
+            model_name='harvestrun',
+            name='sin_cambios',
+            field=models.PositiveIntegerField(default=0, verbose_name='Sin Cambios'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# Columnas del índice de texto completo de los artículos (ver revistas/busqueda.py).
+COLUMNAS = "title_es, title_en, subjects_es, subjects_en, descriptions_es, descriptions_en"
+NUEVAS = ", ".join(f"new.{c}" for c in COLUMNAS.split(", "))
+VIEJAS = ", ".join(f"old.{c}" for c in COLUMNAS.split(", "))
+
+# En SQLite (desarrollo y pruebas) se usa una tabla FTS5 de contenido externo, mantenida
+# por triggers sobre revistas_articulo; en MySQL, un índice FULLTEXT que InnoDB mantiene solo.
+SQLITE = [
+    f"""CREATE VIRTUAL TABLE revistas_articulo_busqueda USING fts5(
+        {COLUMNAS}, content='revistas_articulo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER revistas_articulo_busqueda_ai AFTER INSERT ON revistas_articulo BEGIN
+        INSERT INTO revistas_articulo_busqueda(rowid, {COLUMNAS}) VALUES (new.id, {NUEVAS});
+    END""",
+    f"""CREATE TRIGGER revistas_articulo_busqueda_ad AFTER DELETE ON revistas_articulo BEGIN
+        INSERT INTO revistas_articulo_busqueda(revistas_articulo_busqueda, rowid, {COLUMNAS})
+        VALUES ('delete', old.id, {VIEJAS});
+    END""",
+    f"""CREATE TRIGGER revistas_articulo_busqueda_au AFTER UPDATE ON revistas_articulo BEGIN
+        INSERT INTO revistas_articulo_busqueda(revistas_articulo_busqueda, rowid, {COLUMNAS})
+        VALUES ('delete', old.id, {VIEJAS});
+        INSERT INTO revistas_articulo_busqueda(rowid, {COLUMNAS}) VALUES (new.id, {NUEVAS});
+    END""",
+    "INSERT INTO revistas_articulo_busqueda(revistas_articulo_busqueda) VALUES ('rebuild')",
+]
+SQLITE_REVERSO = [
+    "DROP TRIGGER IF EXISTS revistas_articulo_busqueda_ai",
+    "DROP TRIGGER IF EXISTS revistas_articulo_busqueda_ad",
+    "DROP TRIGGER IF EXISTS revistas_articulo_busqueda_au",
+    "DROP TABLE IF EXISTS revistas_articulo_busqueda",
+]
+MYSQL = [f"ALTER TABLE revistas_articulo ADD FULLTEXT INDEX revistas_articulo_busqueda ({COLUMNAS})"]
+MYSQL_REVERSO = ["ALTER TABLE revistas_articulo DROP INDEX revistas_articulo_busqueda"]
+
+
+def ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        for sentencia in sentencias.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sentencia)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0007_huella'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            ejecutar({"sqlite": SQLITE, "mysql": MYSQL}),
+            ejecutar({"sqlite": SQLITE_REVERSO, "mysql": MYSQL_REVERSO}),
+        ),
+    ]
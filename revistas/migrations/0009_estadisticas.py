@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0008_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticasPortal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_revistas', models.PositiveIntegerField(default=0, verbose_name='Total de Revistas')),
+                ('total_articulos', models.PositiveIntegerField(default=0, verbose_name='Total de Artículos')),
+                ('total_autores', models.PositiveIntegerField(default=0, verbose_name='Total de Autores')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas del Portal',
+                'verbose_name_plural': 'Estadísticas del Portal',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadisticasRevista',
+            fields=[
+                ('revista', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to='revistas.revista', verbose_name='Revista')),
+                ('total_articulos', models.PositiveIntegerField(default=0, verbose_name='Total de Artículos')),
+                ('total_autores', models.PositiveIntegerField(default=0, verbose_name='Total de Autores')),
+                ('primer_anio', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Primer Año de Publicación')),
+                ('ultimo_anio', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Último Año de Publicación')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de Revista',
+                'verbose_name_plural': 'Estadísticas de Revistas',
+            },
+        ),
+    ]
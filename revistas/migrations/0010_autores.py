@@ -0,0 +1,65 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0009_estadisticas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Autor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('nombre_normalizado', models.CharField(max_length=255, unique=True, verbose_name='Nombre Normalizado')),
+            ],
+            options={
+                'verbose_name': 'Autor',
+                'verbose_name_plural': 'Autores',
+            },
+        ),
+        migrations.CreateModel(
+            name='AutorArticulo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveSmallIntegerField(default=0, verbose_name='Orden')),
+                ('articulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='autorias', to='revistas.articulo', verbose_name='Artículo')),
+                ('autor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='autorias', to='revistas.autor', verbose_name='Autor')),
+                ('fuente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='autorias', to='revistas.revista', verbose_name='Fuente')),
+            ],
+            options={
+                'verbose_name': 'Autoría',
+                'verbose_name_plural': 'Autorías',
+                'ordering': ['articulo', 'orden'],
+            },
+        ),
+        # La relación usa la tabla de AutorArticulo y no añade columnas a revistas_articulo.
+        # Solo se registra en el estado: en SQLite, AddField reconstruiría la tabla y
+        # eliminaría los triggers del índice de búsqueda (0008_busqueda).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='articulo',
+                    name='autores',
+                    field=models.ManyToManyField(blank=True, related_name='articulos', through='revistas.AutorArticulo', to='revistas.autor', verbose_name='Autores'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='autorarticulo',
+            index=models.Index(fields=['autor', 'articulo'], name='autoria_autor_articulo'),
+        ),
+        migrations.AddIndex(
+            model_name='autorarticulo',
+            index=models.Index(fields=['fuente', 'autor'], name='autoria_fuente_autor'),
+        ),
+        migrations.AddConstraint(
+            model_name='autorarticulo',
+            constraint=models.UniqueConstraint(fields=('articulo', 'autor'), name='autoria_unica'),
+        ),
+    ]
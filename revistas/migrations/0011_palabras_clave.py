@@ -0,0 +1,62 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0010_autores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PalabraClave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('nombre_normalizado', models.CharField(max_length=255, unique=True, verbose_name='Nombre Normalizado')),
+            ],
+            options={
+                'verbose_name': 'Palabra Clave',
+                'verbose_name_plural': 'Palabras Clave',
+            },
+        ),
+        migrations.CreateModel(
+            name='PalabraClaveArticulo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('articulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces_palabras', to='revistas.articulo', verbose_name='Artículo')),
+                ('fuente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces_palabras', to='revistas.revista', verbose_name='Fuente')),
+                ('palabra_clave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enlaces', to='revistas.palabraclave', verbose_name='Palabra Clave')),
+            ],
+            options={
+                'verbose_name': 'Palabra Clave de Artículo',
+                'verbose_name_plural': 'Palabras Clave de Artículos',
+            },
+        ),
+        # Como en 0010_autores: la relación no añade columnas y, en SQLite, AddField
+        # reconstruiría revistas_articulo y eliminaría los triggers de búsqueda.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='articulo',
+                    name='palabras_clave',
+                    field=models.ManyToManyField(blank=True, related_name='articulos', through='revistas.PalabraClaveArticulo', to='revistas.palabraclave', verbose_name='Palabras Clave'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='palabraclavearticulo',
+            index=models.Index(fields=['palabra_clave', 'articulo'], name='palabra_clave_articulo'),
+        ),
+        migrations.AddIndex(
+            model_name='palabraclavearticulo',
+            index=models.Index(fields=['fuente', 'palabra_clave'], name='palabra_clave_fuente'),
+        ),
+        migrations.AddConstraint(
+            model_name='palabraclavearticulo',
+            constraint=models.UniqueConstraint(fields=('articulo', 'palabra_clave'), name='palabra_articulo_unica'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0011_palabras_clave'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['fuente', 'date'], name='articulo_fuente_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['language'], name='articulo_idioma'),
+        ),
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['type'], name='articulo_tipo'),
+        ),
+    ]
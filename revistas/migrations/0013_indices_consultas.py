@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0012_indices_facetas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='harvestjob',
+            index=models.Index(fields=['creado'], name='trabajo_creado'),
+        ),
+        migrations.AddIndex(
+            model_name='harvestjob',
+            index=models.Index(fields=['revista', 'creado'], name='trabajo_revista_creado'),
+        ),
+        migrations.AddIndex(
+            model_name='harvestrun',
+            index=models.Index(fields=['inicio'], name='cosecha_inicio'),
+        ),
+        migrations.AddIndex(
+            model_name='harvestrun',
+            index=models.Index(fields=['revista', 'set_spec', 'inicio'], name='cosecha_revista_set_inicio'),
+        ),
+    ]
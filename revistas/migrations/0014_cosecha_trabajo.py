@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0013_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='harvestrun',
+            name='trabajo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cosechas', to='revistas.harvestjob', verbose_name='Trabajo'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revistas', '0014_cosecha_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='harvestjob',
+            name='latido',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último Latido'),
+        ),
+        migrations.AddField(
+            model_name='harvestrun',
+            name='latido',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Último Latido'),
+        ),
+    ]
@@ -1,8 +1,18 @@
-from django.db import models
-import requests
+from django.conf import settings
+from django.db import models, transaction
 from xml.etree import ElementTree as ET
+from .cliente_oai import ClienteOAI
 from django.utils.timezone import now
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+def _ancestros(set_spec):
+    """
+    Sets que contienen a `set_spec` en la jerarquía: los de "a:b:c" son "a:b" y "a".
+    """
+    partes = set_spec.split(":")
+    return [":".join(partes[:n]) for n in range(1, len(partes))]
+
 
 class Revista(models.Model):
     # Campos esenciales
@@ -29,6 +39,8 @@ class Revista(models.Model):
     publisher = models.CharField(max_length=255, blank=True, null=True, verbose_name="Editorial")
     description = models.TextField(blank=True, null=True, verbose_name="Descripción")
     metadata_prefix = models.CharField(max_length=50, default="oai_dc", verbose_name="Prefijo de Metadatos")
+    sets = models.TextField(blank=True, null=True, verbose_name="Conjuntos (Sets)")
+    cosechar_por_sets = models.BooleanField(default=False, verbose_name="Cosechar por Sets en Paralelo")
 
 
 
@@ -45,39 +57,62 @@ class Revista(models.Model):
 
     def fetch_sets(self):
         """
-        Obtiene los conjuntos disponibles del repositorio mediante el verbo ListSets.
+        Obtiene los conjuntos disponibles del repositorio mediante el verbo ListSets,
+        siguiendo los resumptionToken si la lista viene paginada.
         """
         try:
-            response = requests.get(f"{self.base_url}?verb=ListSets")
-            response.raise_for_status()
-
             namespaces = {"oai": "http://www.openarchives.org/OAI/2.0/"}
-            root = ET.fromstring(response.text)
+            cliente = ClienteOAI.para_revista(self)
+            request_url = f"{self.base_url}?verb=ListSets"
 
             sets = []
-            for set_element in root.findall(".//oai:set", namespaces):
-                set_name = set_element.find(".//oai:setSpec", namespaces).text
-                sets.append(set_name)
+            while request_url:
+                with cliente.solicitar(request_url) as response:
+                    root = ET.fromstring(response.text)
+
+                for set_element in root.findall(".//oai:set", namespaces):
+                    set_name = set_element.find(".//oai:setSpec", namespaces).text
+                    sets.append(set_name)
+
+                token = root.findtext(".//oai:resumptionToken", namespaces=namespaces)
+                request_url = None
+                if token:
+                    request_url = f"{self.base_url}?{urlencode({'verb': 'ListSets', 'resumptionToken': token})}"
 
             self.sets = "; ".join(sets)  # Almacena los conjuntos separados por ";"
         except Exception as e:
             raise ValueError(f"Error al obtener conjuntos de {self.base_url}: {e}")
 
+    def lista_sets(self):
+        """
+        Devuelve la lista de setSpec guardada en `sets`.
+        """
+        return [s.strip() for s in (self.sets or "").split(";") if s.strip()]
+
+    def sets_hoja(self):
+        """
+        Devuelve los sets de `lista_sets` que no tienen subsets. En OJS los sets son
+        jerárquicos: el set `revista` contiene todos los registros de sus secciones
+        `revista:SECCION`, así que cosecharlo junto a ellas descargaría todo dos veces.
+        """
+        sets = self.lista_sets()
+        padres = {ancestro for s in sets for ancestro in _ancestros(s)}
+        return [s for s in sets if s not in padres]
+
 
     def fetch_metadata(self):
         """
         Extrae metadatos de la URL OAI-PMH y asigna los campos relevantes.
         """
         try:
-            response = requests.get(f"{self.base_url}?verb=Identify")
-            response.raise_for_status()
+            with ClienteOAI.para_revista(self).solicitar(f"{self.base_url}?verb=Identify") as response:
+                root = ET.fromstring(response.text)
 
             namespaces = {
                 "oai": "http://www.openarchives.org/OAI/2.0/",
                 "oai-identifier": "http://www.openarchives.org/OAI/2.0/oai-identifier",
                 "toolkit": "http://oai.dlib.vt.edu/OAI/metadata/toolkit",
             }
-            root = ET.fromstring(response.text)
 
                 # Asignación de campos devueltos por Identify
             self.repository_name = root.find(".//oai:repositoryName", namespaces).text
@@ -173,10 +208,422 @@ class Articulo(models.Model):
     descriptions_en = models.TextField(blank=True, null=True, verbose_name="Descripciones en Inglés (Concatenadas)")
     sources = models.TextField(blank=True, null=True, verbose_name="Fuentes (Concatenadas)")
 
+    # Huella del datestamp y los campos normalizados; si no cambia, la cosecha no reescribe el artículo.
+    huella = models.CharField(max_length=32, blank=True, null=True, verbose_name="Huella del Contenido")
+
+    # Todos los dc:creator, en orden; `creator` conserva solo el primero.
+    autores = models.ManyToManyField(
+        "Autor", through="AutorArticulo", related_name="articulos", blank=True, verbose_name="Autores"
+    )
+
+    # Palabras clave de dc:subject en cualquier idioma; subjects_es/subjects_en conservan el texto original.
+    palabras_clave = models.ManyToManyField(
+        "PalabraClave", through="PalabraClaveArticulo", related_name="articulos", blank=True,
+        verbose_name="Palabras Clave"
+    )
+
     class Meta:
         verbose_name = "Artículo"
         verbose_name_plural = "Artículos"
+        # Filtros y facetas de los listados de la API (revistas/filtros.py)
+        indexes = [
+            models.Index(fields=["fuente", "date"], name="articulo_fuente_fecha"),
+            models.Index(fields=["language"], name="articulo_idioma"),
+            models.Index(fields=["type"], name="articulo_tipo"),
+        ]
 
     def __str__(self):
         return self.title_es or self.title_en or "Artículo sin título"
 
+
+class Autor(models.Model):
+    """
+    Autor normalizado. `nombre_normalizado` (sin mayúsculas ni tildes, en orden
+    "apellido, nombre") identifica al autor aunque los repositorios escriban su nombre
+    de formas distintas; `nombre` conserva la primera forma recibida.
+    """
+    nombre = models.CharField(max_length=255, verbose_name="Nombre")
+    nombre_normalizado = models.CharField(max_length=255, unique=True, verbose_name="Nombre Normalizado")
+
+    class Meta:
+        verbose_name = "Autor"
+        verbose_name_plural = "Autores"
+
+    def __str__(self):
+        return self.nombre
+
+
+class AutorArticulo(models.Model):
+    """
+    Autoría de un artículo, con la posición del autor en la lista de dc:creator.
+    Repite la revista del artículo para contar autores distintos por revista solo con el índice.
+    """
+    articulo = models.ForeignKey("Articulo", on_delete=models.CASCADE, related_name="autorias", verbose_name="Artículo")
+    autor = models.ForeignKey("Autor", on_delete=models.CASCADE, related_name="autorias", verbose_name="Autor")
+    fuente = models.ForeignKey("Revista", on_delete=models.CASCADE, related_name="autorias", verbose_name="Fuente")
+    orden = models.PositiveSmallIntegerField(default=0, verbose_name="Orden")
+
+    class Meta:
+        verbose_name = "Autoría"
+        verbose_name_plural = "Autorías"
+        ordering = ["articulo", "orden"]
+        constraints = [
+            models.UniqueConstraint(fields=["articulo", "autor"], name="autoria_unica"),
+        ]
+        indexes = [
+            models.Index(fields=["autor", "articulo"], name="autoria_autor_articulo"),
+            models.Index(fields=["fuente", "autor"], name="autoria_fuente_autor"),
+        ]
+
+    def __str__(self):
+        return f"{self.autor} ({self.orden + 1}) en {self.articulo_id}"
+
+
+class PalabraClave(models.Model):
+    """
+    Palabra clave normalizada de los dc:subject. `nombre_normalizado` (sin mayúsculas,
+    tildes ni puntos) agrupa las variantes de escritura; `nombre` conserva la primera
+    forma recibida.
+    """
+    nombre = models.CharField(max_length=255, verbose_name="Nombre")
+    nombre_normalizado = models.CharField(max_length=255, unique=True, verbose_name="Nombre Normalizado")
+
+    class Meta:
+        verbose_name = "Palabra Clave"
+        verbose_name_plural = "Palabras Clave"
+
+    def __str__(self):
+        return self.nombre
+
+
+class PalabraClaveArticulo(models.Model):
+    """
+    Enlace entre un artículo y una de sus palabras clave. Repite la revista del artículo
+    para contar las palabras clave de cada revista solo con el índice.
+    """
+    articulo = models.ForeignKey(
+        "Articulo", on_delete=models.CASCADE, related_name="enlaces_palabras", verbose_name="Artículo"
+    )
+    palabra_clave = models.ForeignKey(
+        "PalabraClave", on_delete=models.CASCADE, related_name="enlaces", verbose_name="Palabra Clave"
+    )
+    fuente = models.ForeignKey(
+        "Revista", on_delete=models.CASCADE, related_name="enlaces_palabras", verbose_name="Fuente"
+    )
+
+    class Meta:
+        verbose_name = "Palabra Clave de Artículo"
+        verbose_name_plural = "Palabras Clave de Artículos"
+        constraints = [
+            models.UniqueConstraint(fields=["articulo", "palabra_clave"], name="palabra_articulo_unica"),
+        ]
+        indexes = [
+            models.Index(fields=["palabra_clave", "articulo"], name="palabra_clave_articulo"),
+            models.Index(fields=["fuente", "palabra_clave"], name="palabra_clave_fuente"),
+        ]
+
+    def __str__(self):
+        return f"{self.palabra_clave} en {self.articulo_id}"
+
+
+class EstadisticasRevista(models.Model):
+    """
+    Estadísticas materializadas de una revista, recalculadas al terminar cada cosecha
+    (ver `revistas.estadisticas`), para no recorrer sus artículos en cada petición.
+    """
+    revista = models.OneToOneField(
+        "Revista", on_delete=models.CASCADE, primary_key=True, related_name="estadisticas", verbose_name="Revista"
+    )
+    total_articulos = models.PositiveIntegerField(default=0, verbose_name="Total de Artículos")
+    total_autores = models.PositiveIntegerField(default=0, verbose_name="Total de Autores")
+    primer_anio = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name="Primer Año de Publicación")
+    ultimo_anio = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name="Último Año de Publicación")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Actualizado")
+
+    class Meta:
+        verbose_name = "Estadísticas de Revista"
+        verbose_name_plural = "Estadísticas de Revistas"
+
+    def __str__(self):
+        return f"Estadísticas de {self.revista_id}"
+
+
+class EstadisticasPortal(models.Model):
+    """
+    Totales globales del portal, en una única fila (id 1).
+    """
+    total_revistas = models.PositiveIntegerField(default=0, verbose_name="Total de Revistas")
+    total_articulos = models.PositiveIntegerField(default=0, verbose_name="Total de Artículos")
+    total_autores = models.PositiveIntegerField(default=0, verbose_name="Total de Autores")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Actualizado")
+
+    class Meta:
+        verbose_name = "Estadísticas del Portal"
+        verbose_name_plural = "Estadísticas del Portal"
+
+    def __str__(self):
+        return "Estadísticas del portal"
+
+
+class HarvestRun(models.Model):
+    """
+    Ejecución de una cosecha de una revista. Guarda el último resumptionToken confirmado
+    para que una cosecha interrumpida pueda reanudarse desde esa página.
+    En una cosecha por sets cada set tiene su propia ejecución, identificada por `set_spec`.
+    """
+    EN_CURSO = "running"
+    COMPLETADA = "completed"
+    FALLIDA = "failed"
+    ESTADOS = [
+        (EN_CURSO, "En curso"),
+        (COMPLETADA, "Completada"),
+        (FALLIDA, "Fallida"),
+    ]
+
+    revista = models.ForeignKey(
+        "Revista", on_delete=models.CASCADE, related_name="cosechas", verbose_name="Revista"
+    )
+    # Trabajo de la cola que inició la cosecha; una revista cosechada por sets tiene una por set.
+    trabajo = models.ForeignKey(
+        "HarvestJob", on_delete=models.SET_NULL, blank=True, null=True, related_name="cosechas",
+        verbose_name="Trabajo"
+    )
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=EN_CURSO, verbose_name="Estado")
+    completa = models.BooleanField(default=False, verbose_name="Cosecha Completa")
+    set_spec = models.CharField(max_length=255, blank=True, null=True, verbose_name="Set")
+    desde = models.DateTimeField(blank=True, null=True, verbose_name="Desde (from)")
+    hasta = models.DateTimeField(blank=True, null=True, verbose_name="Hasta (until)")
+    inicio = models.DateTimeField(default=now, verbose_name="Inicio")
+    fin = models.DateTimeField(blank=True, null=True, verbose_name="Fin")
+    # Se renueva con cada página confirmada y con el latido del worker que la ejecuta.
+    latido = models.DateTimeField(default=now, verbose_name="Último Latido")
+    resumption_token = models.TextField(blank=True, null=True, verbose_name="Último resumptionToken Confirmado")
+    paginas = models.PositiveIntegerField(default=0, verbose_name="Páginas")
+    creados = models.PositiveIntegerField(default=0, verbose_name="Creados")
+    sin_cambios = models.PositiveIntegerField(default=0, verbose_name="Sin Cambios")
+    actualizados = models.PositiveIntegerField(default=0, verbose_name="Actualizados")
+    eliminados = models.PositiveIntegerField(default=0, verbose_name="Eliminados")
+    error = models.TextField(blank=True, null=True, verbose_name="Error")
+
+    class Meta:
+        verbose_name = "Cosecha"
+        verbose_name_plural = "Cosechas"
+        ordering = ["-inicio"]
+        # Historial de cosechas (admin) y última cosecha de cada revista y set al reanudar.
+        indexes = [
+            models.Index(fields=["inicio"], name="cosecha_inicio"),
+            models.Index(fields=["revista", "set_spec", "inicio"], name="cosecha_revista_set_inicio"),
+        ]
+
+    def __str__(self):
+        set_spec = f" [{self.set_spec}]" if self.set_spec else ""
+        return f"{self.revista}{set_spec} ({self.get_estado_display()}, {self.inicio:%Y-%m-%d %H:%M})"
+
+    @property
+    def activa(self):
+        """
+        En curso y con un latido dentro de COSECHA_VENCIMIENTO: hay un proceso ejecutándola.
+        """
+        vencimiento = now() - timedelta(seconds=settings.COSECHA_VENCIMIENTO)
+        return self.estado == self.EN_CURSO and self.latido >= vencimiento
+
+    @property
+    def reanudable(self):
+        # Una cosecha que otro proceso sigue ejecutando no se retoma en paralelo.
+        return self.estado != self.COMPLETADA and bool(self.resumption_token) and not self.activa
+
+    def registrar_pagina(self, resumption_token, resultado):
+        """
+        Guarda el avance tras confirmar una página. Debe llamarse dentro de la misma
+        transacción que escribe los artículos de la página.
+        """
+        self.resumption_token = resumption_token
+        self.paginas += 1
+        self.creados += resultado["creados"]
+        self.sin_cambios += resultado["sin_cambios"]
+        self.actualizados += resultado["actualizados"]
+        self.eliminados += resultado["eliminados"]
+        self.latido = now()
+        self.save(
+            update_fields=[
+                "resumption_token", "paginas", "creados", "sin_cambios", "actualizados", "eliminados", "latido"
+            ]
+        )
+
+    def reiniciar(self):
+        """
+        Descarta el punto de control cuando el repositorio ya no acepta el resumptionToken.
+        """
+        self.resumption_token = None
+        self.save(update_fields=["resumption_token"])
+
+    def finalizar(self, estado, error=None):
+        self.estado = estado
+        self.error = error
+        self.fin = now()
+        if estado == self.COMPLETADA:
+            self.resumption_token = None
+        self.save(update_fields=["estado", "error", "fin", "resumption_token"])
+
+
+class HarvestJob(models.Model):
+    """
+    Trabajo de cosecha en cola. El admin solo encola; el comando `harvest_worker`
+    reclama los trabajos con bloqueo de filas y ejecuta la cosecha fuera de la petición HTTP.
+    Mientras lo ejecuta, el worker renueva `latido`; un trabajo en curso sin latido durante
+    COSECHA_VENCIMIENTO se da por abandonado (worker caído) y se marca como fallido.
+    """
+    EN_COLA = "queued"
+    EN_CURSO = "running"
+    TERMINADO = "done"
+    FALLIDO = "failed"
+    ESTADOS = [
+        (EN_COLA, "En cola"),
+        (EN_CURSO, "En curso"),
+        (TERMINADO, "Terminado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    revista = models.ForeignKey(
+        "Revista", on_delete=models.CASCADE, related_name="trabajos", verbose_name="Revista"
+    )
+    completa = models.BooleanField(default=False, verbose_name="Cosecha Completa")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=EN_COLA, verbose_name="Estado")
+    creado = models.DateTimeField(auto_now_add=True, verbose_name="Encolado")
+    inicio = models.DateTimeField(blank=True, null=True, verbose_name="Inicio")
+    fin = models.DateTimeField(blank=True, null=True, verbose_name="Fin")
+    worker = models.CharField(max_length=255, blank=True, null=True, verbose_name="Worker")
+    latido = models.DateTimeField(blank=True, null=True, verbose_name="Último Latido")
+    cosecha = models.ForeignKey(
+        "HarvestRun", on_delete=models.SET_NULL, blank=True, null=True, related_name="trabajos", verbose_name="Cosecha"
+    )
+    error = models.TextField(blank=True, null=True, verbose_name="Error")
+
+    class Meta:
+        verbose_name = "Trabajo de Cosecha"
+        verbose_name_plural = "Trabajos de Cosecha"
+        ordering = ["-creado"]
+        indexes = [
+            models.Index(fields=["estado", "creado"]),
+            # Listado de trabajos (admin) y último trabajo de cada revista (RevistaAdmin).
+            models.Index(fields=["creado"], name="trabajo_creado"),
+            models.Index(fields=["revista", "creado"], name="trabajo_revista_creado"),
+        ]
+
+    def __str__(self):
+        return f"{self.revista} ({self.get_estado_display()})"
+
+    @classmethod
+    def encolar(cls, revista, completa=False):
+        """
+        Encola una cosecha de la revista, salvo que ya haya una esperando en la cola.
+        La fila de la revista se bloquea para que dos llamadas simultáneas no encolen dos.
+        """
+        with transaction.atomic():
+            Revista.objects.select_for_update().filter(pk=revista.pk).exists()
+            pendiente = cls.objects.filter(revista=revista, estado=cls.EN_COLA).first()
+            if pendiente:
+                return pendiente
+            return cls.objects.create(revista=revista, completa=completa)
+
+    @classmethod
+    def reclamar(cls, worker):
+        """
+        Toma el trabajo en cola más antiguo y lo marca como en curso. Con SKIP LOCKED
+        varios workers pueden reclamar a la vez sin esperarse ni tomar el mismo trabajo.
+        No se reclaman trabajos de revistas que ya se están cosechando; antes se liberan
+        los trabajos en curso cuyo worker dejó de renovar el latido.
+        Devuelve None si la cola está vacía.
+
+        El filtro de revistas en curso no ve las reclamaciones que otro worker aún no ha
+        confirmado, así que además se bloquea la fila de la revista (`_reservar_revista`).
+        """
+        with transaction.atomic():
+            vencimiento = now() - timedelta(seconds=settings.COSECHA_VENCIMIENTO)
+            vencidos = (
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(estado=cls.EN_CURSO)
+                .filter(models.Q(latido__lt=vencimiento) | models.Q(latido__isnull=True, inicio__lt=vencimiento))
+                .values_list("pk", flat=True)
+            )
+            cls.abandonar(
+                list(vencidos), cls.FALLIDO,
+                f"Sin latido del worker durante {settings.COSECHA_VENCIMIENTO} s: se da por caído."
+            )
+            en_curso = cls.objects.filter(estado=cls.EN_CURSO).values("revista")
+            candidatos = (
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(estado=cls.EN_COLA)
+                .exclude(revista__in=en_curso)
+                .order_by("creado")
+            )
+            ocupadas = []
+            while True:
+                trabajo = candidatos.exclude(revista__in=ocupadas).first()
+                if trabajo is None:
+                    return None
+                if cls._reservar_revista(trabajo.revista_id):
+                    break
+                ocupadas.append(trabajo.revista_id)
+            trabajo.estado = cls.EN_CURSO
+            trabajo.inicio = trabajo.latido = now()
+            trabajo.worker = worker
+            trabajo.save(update_fields=["estado", "inicio", "latido", "worker"])
+            return trabajo
+
+    @classmethod
+    def _reservar_revista(cls, revista_id):
+        """
+        Bloquea la fila de la revista hasta el final de la transacción, sin esperar si otro
+        worker la tiene, y comprueba que no tenga un trabajo en curso. La comprobación es
+        una lectura con bloqueo, que ve lo confirmado por otros workers aunque la transacción
+        haya empezado antes. Devuelve False si la revista está ocupada.
+        """
+        if not Revista.objects.select_for_update(skip_locked=True).filter(pk=revista_id).exists():
+            return False
+        return not cls.objects.select_for_update().filter(revista_id=revista_id, estado=cls.EN_CURSO).exists()
+
+    @classmethod
+    def renovar_latido(cls, ids):
+        """
+        Latido del worker: renueva los trabajos en curso `ids` y sus cosechas en curso.
+        """
+        momento = now()
+        cls.objects.filter(pk__in=ids, estado=cls.EN_CURSO).update(latido=momento)
+        HarvestRun.objects.filter(trabajo__in=ids, estado=HarvestRun.EN_CURSO).update(latido=momento)
+
+    @classmethod
+    def abandonar(cls, ids, estado, error):
+        """
+        Saca de la ejecución los trabajos en curso `ids`, que su worker ya no ejecuta:
+        vuelven a la cola (EN_COLA) o se dan por fallidos. Un trabajo no vuelve a la cola si
+        su revista ya tiene otro esperando: se da por fallido. Sus cosechas en curso se marcan
+        como fallidas para que la siguiente las reanude desde la última página confirmada.
+        """
+        if not ids:
+            return
+        momento = now()
+        with transaction.atomic():
+            # Mismo bloqueo que `encolar`, para no dejar dos trabajos en cola de una revista.
+            revistas = list(cls.objects.filter(pk__in=ids).values_list("revista", flat=True))
+            Revista.objects.select_for_update().filter(pk__in=revistas).exists()
+            trabajos = cls.objects.filter(pk__in=ids, estado=cls.EN_CURSO)
+            if estado == cls.EN_COLA:
+                # Se evalúa antes: MySQL no admite una subconsulta sobre la tabla que se actualiza.
+                en_cola = list(
+                    cls.objects.filter(revista__in=revistas, estado=cls.EN_COLA).values_list("revista", flat=True)
+                )
+                trabajos.exclude(revista__in=en_cola).update(
+                    estado=estado, error=error, inicio=None, latido=None, worker=None
+                )
+                estado = cls.FALLIDO
+            trabajos.update(estado=estado, error=error, fin=momento)
+            HarvestRun.objects.filter(trabajo__in=ids, estado=HarvestRun.EN_CURSO).update(
+                estado=HarvestRun.FALLIDA, error=error, fin=momento
+            )
+
+    def finalizar(self, estado, error=None):
+        self.estado = estado
+        self.error = error
+        self.fin = now()
+        self.save(update_fields=["estado", "error", "fin"])
@@ -0,0 +1,179 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connections
+from django.utils.timezone import now
+from .cliente_oai import LimitePorHost
+from .cache_respuestas import invalidar_respuestas
+from .estadisticas import recalcular_estadisticas
+from .models import HarvestJob
+from .utils import ConteoEditoriales, RegistrosCompartidos, asignar_editorial, cosechar_datos_directo
+
+
+def _cosechar_revista(revista, limite_host, opciones, por_sets=False, limite_sets=None):
+    """
+    Cosecha una revista dentro de un hilo del pool y cierra sus conexiones a la base de datos.
+    """
+    try:
+        if por_sets or revista.cosechar_por_sets:
+            return cosechar_por_sets(revista, limite_host=limite_host, limite_sets=limite_sets, **opciones)
+        return cosechar_datos_directo(
+            revista.base_url, revista.metadata_prefix, revista.id, limite_host=limite_host, **opciones
+        )
+    finally:
+        # Cada hilo abre su propia conexión; se cierra para no agotar las de MySQL.
+        connections.close_all()
+
+
+def cosechar_revistas(revistas, workers=None, max_por_host=None, por_sets=False, sets_por_host=None, **opciones):
+    """
+    Cosecha varias revistas en paralelo sobre un pool de hilos.
+
+    `workers` es el número de revistas que se cosechan a la vez y `max_por_host` el número
+    máximo de conexiones simultáneas contra un mismo servidor. Con `por_sets=True` (o si la
+    revista tiene activado `cosechar_por_sets`) cada revista se cosecha por sets, con como
+    máximo `sets_por_host` flujos simultáneos por servidor. El resto de `opciones` se
+    pasa a `cosechar_datos_directo`.
+    Devuelve una lista de diccionarios con la revista, su resumen y el error, si lo hubo.
+    """
+    workers = workers or settings.COSECHA_WORKERS
+    limite_host = LimitePorHost(max_por_host or settings.COSECHA_MAX_POR_HOST)
+    limite_sets = LimitePorHost(sets_por_host or settings.COSECHA_SETS_POR_HOST)
+    resultados = []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cosecha") as pool:
+        futuros = {
+            pool.submit(_cosechar_revista, revista, limite_host, opciones, por_sets, limite_sets): revista
+            for revista in revistas
+        }
+        for futuro in as_completed(futuros):
+            revista = futuros[futuro]
+            try:
+                resultados.append({"revista": revista, "resumen": futuro.result(), "error": None})
+            except Exception as e:
+                print(f"Error al cosechar la revista '{revista.repository_name}': {e}")
+                resultados.append({"revista": revista, "resumen": None, "error": str(e)})
+
+    return resultados
+
+
+def _cosechar_set(revista, set_spec, limite_host, limite_sets, compartidos, editoriales, opciones):
+    """
+    Cosecha un set de la revista dentro de un hilo del pool de `cosechar_por_sets`.
+    """
+    try:
+        with limite_sets.conexion(revista.base_url):
+            return cosechar_datos_directo(
+                revista.base_url,
+                revista.metadata_prefix,
+                revista.id,
+                limite_host=limite_host,
+                set_spec=set_spec,
+                compartidos=compartidos,
+                editoriales=editoriales,
+                **opciones,
+            )
+    finally:
+        connections.close_all()
+
+
+def cosechar_por_sets(revista, limite_host=None, limite_sets=None, **opciones):
+    """
+    Cosecha una revista como varios flujos ListRecords&set=... en paralelo, en lugar de
+    una sola cadena de resumptionToken. Útil en los repositorios más grandes.
+
+    Los sets se leen de `revista.sets`; si está vacío se piden con ListSets y se guardan.
+    Solo se cosechan los sets hoja (`Revista.sets_hoja`): un set padre repetiría los registros
+    de sus subsets en una única cadena secuencial. Si el repositorio no declara sets, se
+    cosecha de la forma habitual. `limite_sets`
+    (un `LimitePorHost`) acota los flujos simultáneos contra el mismo servidor, por
+    defecto COSECHA_SETS_POR_HOST. Los registros que pertenecen a varios sets se escriben
+    una sola vez. Un set no cubre todo el repositorio, así que una cosecha completa por
+    sets no borra los artículos ausentes; para eso hay que usar una cosecha completa normal.
+
+    `last_harvest_date` solo avanza si todos los sets se cosechan sin errores.
+    Devuelve un diccionario con el número de artículos creados, actualizados, sin cambios y eliminados.
+    """
+    if not revista.sets:
+        revista.fetch_sets()
+        revista.save(update_fields=["sets"])
+    sets = revista.sets_hoja()
+    if not sets:
+        print(f"La revista '{revista.repository_name}' no declara sets; se cosecha sin particionar.")
+        return cosechar_datos_directo(
+            revista.base_url, revista.metadata_prefix, revista.id, limite_host=limite_host, **opciones
+        )
+
+    limite_sets = limite_sets or LimitePorHost(settings.COSECHA_SETS_POR_HOST)
+    limite_host = limite_host or LimitePorHost(limite_sets.maximo)
+    compartidos = RegistrosCompartidos()
+    editoriales = ConteoEditoriales()
+    inicio = now()
+    totales = Counter(creados=0, actualizados=0, sin_cambios=0, eliminados=0)
+    errores = []
+
+    print(f"Cosechando {len(sets)} set(s) de '{revista.repository_name}' en paralelo")
+    with ThreadPoolExecutor(max_workers=min(limite_sets.maximo or len(sets), len(sets)), thread_name_prefix="cosecha-set") as pool:
+        futuros = {
+            pool.submit(
+                _cosechar_set, revista, set_spec, limite_host, limite_sets, compartidos, editoriales, opciones
+            ): set_spec
+            for set_spec in sets
+        }
+        for futuro in as_completed(futuros):
+            try:
+                totales.update(futuro.result())
+            except Exception as e:
+                errores.append(f"{futuros[futuro]}: {e}")
+
+    if errores:
+        raise Exception(f"Falló la cosecha de {len(errores)} set(s): {'; '.join(errores)}")
+
+    # Se toma la hora de inicio para que la próxima cosecha incluya lo modificado durante esta.
+    revista.last_harvest_date = inicio
+    revista.save(update_fields=["last_harvest_date"])
+    asignar_editorial(revista, editoriales.mas_frecuente())
+    recalcular_estadisticas([revista])
+    invalidar_respuestas(revista.id)
+    return dict(totales)
+
+
+def ejecutar_trabajo(trabajo, limite_host=None, limite_sets=None):
+    """
+    Ejecuta un `HarvestJob` ya reclamado y registra su resultado.
+    Cada `HarvestRun` iniciado (uno por set si la revista se cosecha por sets) queda
+    enlazado al trabajo, que suma sus contadores de progreso; `trabajo.cosecha` apunta
+    al último iniciado.
+    """
+    revista = trabajo.revista
+
+    def al_iniciar(cosecha):
+        cosecha.trabajo = trabajo
+        cosecha.save(update_fields=["trabajo"])
+        trabajo.cosecha = cosecha
+        trabajo.save(update_fields=["cosecha"])
+
+    try:
+        if revista.cosechar_por_sets:
+            cosechar_por_sets(
+                revista,
+                limite_host=limite_host,
+                limite_sets=limite_sets,
+                completa=trabajo.completa,
+                al_iniciar=al_iniciar,
+            )
+        else:
+            cosechar_datos_directo(
+                revista.base_url,
+                revista.metadata_prefix,
+                revista.id,
+                limite_host=limite_host,
+                completa=trabajo.completa,
+                al_iniciar=al_iniciar,
+            )
+    except Exception as e:
+        print(f"Error al cosechar la revista '{revista.repository_name}': {e}")
+        trabajo.finalizar(HarvestJob.FALLIDO, str(e))
+    else:
+        trabajo.finalizar(HarvestJob.TERMINADO)
+    return trabajo
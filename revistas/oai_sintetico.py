@@ -0,0 +1,225 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+PALABRAS = (
+    "ciencia educación salud ambiente sociedad historia derecho economía ingeniería "
+    "cultura tecnología agua energía biodiversidad política lenguaje arte"
+).split()
+KEYWORDS = (
+    "science education health environment society history law economics engineering "
+    "culture technology water energy biodiversity policy language art"
+).split()
+
+
+class ServidorOAISintetico:
+    """
+    Servidor OAI-PMH local que genera registros Dublin Core sintéticos bajo demanda.
+    Sirve para pruebas y benchmarks de la cosecha sin depender de repositorios remotos.
+
+    - `registros`: número total de registros del repositorio.
+    - `tamano_pagina`: registros por página de ListRecords (con resumptionToken).
+    - `latencia`: segundos de espera antes de cada respuesta.
+    - `cada_503`: si se indica, una de cada N peticiones responde 503 con Retry-After.
+    - `retry_after`: segundos indicados en Retry-After.
+    - `sets`: número de sets (ListSets y ListRecords&set=...). El registro `i` pertenece al
+      set `revista:{i % sets}`, y uno de cada diez también al siguiente, para probar los
+      duplicados. Como en OJS, ListSets declara además el set padre `revista`, con todos.
+
+    `sets_pedidos` guarda el set de cada ListRecords inicial recibido.
+
+    Se usa como gestor de contexto; `url` es la URL base OAI del servidor.
+    """
+
+    def __init__(self, registros=1000, tamano_pagina=100, latencia=0, cada_503=None, retry_after=0, sets=0):
+        self.registros = registros
+        self.sets = sets
+        self.tamano_pagina = tamano_pagina
+        self.latencia = latencia
+        self.cada_503 = cada_503
+        self.retry_after = retry_after
+        self.peticiones = 0
+        self.respuestas_503 = 0
+        self.sets_pedidos = []
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}/oai"
+
+    def __enter__(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                servidor._atender(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self._servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="oai-sintetico", daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._hilo.join()
+
+    def _atender(self, peticion):
+        with self._lock:
+            self.peticiones += 1
+            fallar = bool(self.cada_503) and self.peticiones % self.cada_503 == 0
+            if fallar:
+                self.respuestas_503 += 1
+
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        if fallar:
+            peticion.send_response(503)
+            peticion.send_header("Retry-After", str(self.retry_after))
+            peticion.send_header("Content-Length", "0")
+            peticion.end_headers()
+            return
+
+        argumentos = {clave: valores[0] for clave, valores in parse_qs(urlparse(peticion.path).query).items()}
+        cuerpo = self.responder(argumentos).encode("utf-8")
+
+        peticion.send_response(200)
+        peticion.send_header("Content-Type", "text/xml; charset=utf-8")
+        if "gzip" in peticion.headers.get("Accept-Encoding", ""):
+            cuerpo = gzip.compress(cuerpo, compresslevel=1)
+            peticion.send_header("Content-Encoding", "gzip")
+        peticion.send_header("Content-Length", str(len(cuerpo)))
+        peticion.end_headers()
+        peticion.wfile.write(cuerpo)
+
+    def responder(self, argumentos):
+        """
+        Devuelve el XML de respuesta para los argumentos OAI-PMH de la petición.
+        """
+        verbo = argumentos.get("verb")
+        if verbo == "Identify":
+            contenido = self.identify()
+        elif verbo == "ListRecords":
+            contenido = self.list_records(argumentos)
+        elif verbo == "ListSets":
+            contenido = self.list_sets()
+        else:
+            contenido = f'<error code="badVerb">Verbo no soportado: {escape(str(verbo))}</error>'
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+            "<responseDate>2024-01-01T00:00:00Z</responseDate>"
+            f"{contenido}</OAI-PMH>"
+        )
+
+    def identify(self):
+        return (
+            "<Identify>"
+            "<repositoryName>Repositorio Sintético</repositoryName>"
+            f"<baseURL>{self.url}</baseURL>"
+            "<protocolVersion>2.0</protocolVersion>"
+            "<adminEmail>admin@ejemplo.org</adminEmail>"
+            "<earliestDatestamp>2000-01-01T00:00:00Z</earliestDatestamp>"
+            "<deletedRecord>persistent</deletedRecord>"
+            "<granularity>YYYY-MM-DDThh:mm:ssZ</granularity>"
+            "<compression>gzip</compression>"
+            "</Identify>"
+        )
+
+    def list_sets(self):
+        if not self.sets:
+            return '<error code="noSetHierarchy">El repositorio no tiene sets</error>'
+        sets = "<set><setSpec>revista</setSpec><setName>Revista</setName></set>" + "".join(
+            f"<set><setSpec>revista:{n}</setSpec><setName>Sección {n}</setName></set>" for n in range(self.sets)
+        )
+        return f"<ListSets>{sets}</ListSets>"
+
+    def sets_de(self, i):
+        """
+        Sets a los que pertenece el registro número `i`.
+        """
+        if not self.sets:
+            return []
+        sets = [i % self.sets]
+        if i % 10 == 0 and self.sets > 1:
+            sets.append((i + 1) % self.sets)
+        return sets
+
+    def list_records(self, argumentos):
+        # El token lleva el set pedido y la posición dentro de él: "set|posición".
+        set_spec, _, posicion = argumentos.get("resumptionToken", "").rpartition("|")
+        if "resumptionToken" not in argumentos:
+            set_spec, posicion = argumentos.get("set", ""), 0
+            if set_spec:
+                self.sets_pedidos.append(set_spec)
+        inicio = int(posicion)
+
+        if set_spec and set_spec != "revista":
+            numero = int(set_spec.rpartition(":")[2])
+            indices = [i for i in range(self.registros) if numero in self.sets_de(i)]
+        else:
+            indices = range(self.registros)
+        if not indices:
+            return '<error code="noRecordsMatch">No hay registros</error>'
+        if inicio >= len(indices):
+            return '<error code="badResumptionToken">Token fuera de rango</error>'
+
+        fin = min(inicio + self.tamano_pagina, len(indices))
+        registros = "".join(self.registro(i) for i in indices[inicio:fin])
+        token = ""
+        if fin < len(indices):
+            token = (
+                f'<resumptionToken completeListSize="{len(indices)}" cursor="{inicio}">'
+                f"{set_spec}|{fin}</resumptionToken>"
+            )
+        elif inicio > 0:
+            token = f'<resumptionToken completeListSize="{len(indices)}" cursor="{inicio}"/>'
+        return f"<ListRecords>{registros}{token}</ListRecords>"
+
+    def registro(self, i):
+        """
+        Genera el registro número `i`, con campos Dublin Core multilingües.
+        """
+        palabras = [PALABRAS[(i + k) % len(PALABRAS)] for k in range(3)]
+        keywords = [KEYWORDS[(i + k) % len(KEYWORDS)] for k in range(3)]
+        resumen = " ".join(PALABRAS[(i * 7 + k) % len(PALABRAS)] for k in range(120))
+        abstract = " ".join(KEYWORDS[(i * 7 + k) % len(KEYWORDS)] for k in range(120))
+        return (
+            "<record><header>"
+            f"<identifier>oai:sintetico:{i}</identifier>"
+            f"<datestamp>2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:00:00Z</datestamp>"
+            + "".join(f"<setSpec>revista:{n}</setSpec>" for n in self.sets_de(i))
+            + "</header><metadata>"
+            '<oai_dc:dc xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:title xml:lang="es-ES">Estudio {i} sobre {" y ".join(palabras)}</dc:title>'
+            f'<dc:title xml:lang="en-US">Study {i} on {" and ".join(keywords)}</dc:title>'
+            f"<dc:creator>Autor{i % 997}, Nombre</dc:creator>"
+            f"<dc:creator>Coautor{i % 577}, Otro</dc:creator>"
+            + "".join(f'<dc:subject xml:lang="es-ES">{p}</dc:subject>' for p in palabras)
+            + "".join(f'<dc:subject xml:lang="en-US">{k}</dc:subject>' for k in keywords)
+            + f'<dc:description xml:lang="es-ES">{resumen}</dc:description>'
+            f'<dc:description xml:lang="en-US">{abstract}</dc:description>'
+            f"<dc:publisher>Universidad {i % 3}</dc:publisher>"
+            f"<dc:date>{2000 + i % 25}-06-01</dc:date>"
+            "<dc:type>info:eu-repo/semantics/article</dc:type>"
+            "<dc:format>application/pdf</dc:format>"
+            f"<dc:identifier>https://revistas.ejemplo.org/article/view/{i}</dc:identifier>"
+            f'<dc:language>{"spa" if i % 2 else "eng"}</dc:language>'
+            f"<dc:source>Revista Sintética; Vol. {i % 30}</dc:source>"
+            "<dc:rights>Creative Commons Attribution 4.0</dc:rights>"
+            "</oai_dc:dc></metadata></record>"
+        )
@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PaginacionArticulos(CursorPagination):
+    """
+    Paginación por cursor de los listados de artículos, del más reciente al más antiguo.
+    Ordena por la clave primaria, así que cada página es una búsqueda por índice
+    (`id < cursor`) y las páginas profundas cuestan lo mismo que la primera. Los cursores
+    son opacos y estables aunque se agreguen artículos durante el recorrido.
+    """
+    ordering = "-id"
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.API_ARTICULOS_POR_PAGINA
+        self.max_page_size = settings.API_ARTICULOS_MAX_POR_PAGINA
+
+
+class PaginacionBusqueda(PageNumberPagination):
+    """
+    Paginación por número de página de los resultados de búsqueda, que se ordenan por
+    relevancia y no por una clave única, así que no admiten cursor.
+    """
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.API_ARTICULOS_POR_PAGINA
+        self.max_page_size = settings.API_ARTICULOS_MAX_POR_PAGINA
+
+
+class PaginacionAutores(PaginacionArticulos):
+    """
+    Paginación por cursor del listado de autores, en orden alfabético. El nombre
+    normalizado es único e indexado, así que sirve de clave del cursor.
+    """
+    ordering = "nombre_normalizado"
@@ -1,13 +1,65 @@
 # serializers.py
 from rest_framework import serializers
-from .models import Revista, Articulo
+from .models import Revista, Articulo, Autor
 
-class RevistaSerializer(serializers.ModelSerializer):
+class CamposSolicitadosMixin:
+    """
+    Permite construir el serializador con solo algunos de sus campos (`campos=[...]`),
+    para los sparse fieldsets de `?fields=`.
+    """
+    def __init__(self, *args, campos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+class RevistaSerializer(CamposSolicitadosMixin, serializers.ModelSerializer):
     class Meta:
         model = Revista
         fields = '__all__'
 
-class ArticuloSerializer(serializers.ModelSerializer):
+class RevistaListaSerializer(RevistaSerializer):
+    # Sin los datos de Identify ni `sets` y `description`, que pueden ser largos.
+    class Meta(RevistaSerializer.Meta):
+        fields = ['id', 'repository_name', 'publisher', 'cover_image', 'official_url', 'last_harvest_date']
+
+class ArticuloSerializer(CamposSolicitadosMixin, serializers.ModelSerializer):
+    # Nombres de todos los autores, en el orden de dc:creator (ver con_autores en views.py)
+    autores = serializers.SerializerMethodField()
+
     class Meta:
         model = Articulo
-        fields = '__all__'
+        # La huella es de uso interno de la cosecha; las palabras clave ya están en subjects_es/subjects_en.
+        exclude = ['huella', 'palabras_clave']
+
+    def get_autores(self, articulo):
+        return [autoria.autor.nombre for autoria in articulo.autorias.all()]
+
+class ArticuloListaSerializer(ArticuloSerializer):
+    # Sin las columnas TEXT largas (descripciones, temas, derechos...), salvo los títulos.
+    class Meta(ArticuloSerializer.Meta):
+        exclude = None
+        fields = [
+            'id', 'fuente', 'identifier', 'datestamp', 'title_es', 'title_en', 'creator', 'autores',
+            'publisher', 'type', 'language', 'date', 'identifier_url',
+        ]
+
+class ArticuloBusquedaSerializer(ArticuloSerializer):
+    relevancia = serializers.FloatField(read_only=True)
+
+class ArticuloBusquedaListaSerializer(ArticuloListaSerializer):
+    relevancia = serializers.FloatField(read_only=True)
+
+    class Meta(ArticuloListaSerializer.Meta):
+        fields = ArticuloListaSerializer.Meta.fields + ['relevancia']
+
+class AutorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Autor
+        fields = ['id', 'nombre']
+
+class AutorDetalleSerializer(AutorSerializer):
+    total_articulos = serializers.IntegerField(read_only=True)
+
+    class Meta(AutorSerializer.Meta):
+        fields = AutorSerializer.Meta.fields + ['total_articulos']
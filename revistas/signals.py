@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache_respuestas import invalidar_respuestas
+from .estadisticas import recalcular_estadisticas_portal
+from .models import Revista
+
+
+@receiver(post_save, sender=Revista)
+def revista_guardada(sender, instance, created, **kwargs):
+    # Las estadísticas de cada revista cambian con sus cosechas; el total de revistas, al crear o borrar una.
+    if created:
+        recalcular_estadisticas_portal()
+    invalidar_respuestas(instance.pk)
+
+
+@receiver(post_delete, sender=Revista)
+def revista_eliminada(sender, instance, **kwargs):
+    recalcular_estadisticas_portal()
+    invalidar_respuestas(instance.pk)
@@ -1,3 +1,1591 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import pickle
+import os
+import signal
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from revistas.archivo import leer_pagina, paginas_archivadas
+from revistas.benchmark import benchmark_extraccion, ejecutar_benchmark, extraer_registro_referencia
+from revistas.cache_respuestas import GLOBAL, generacion, invalidar_respuestas
+from revistas.cliente_oai import ClienteOAI, LimitePorHost, accept_encoding, obtener_sesion
+from revistas.estadisticas import recalcular_estadisticas
+from revistas.models import Revista, Articulo, Autor, AutorArticulo, HarvestJob, HarvestRun, PalabraClave
+from revistas.motor_cosecha import cosechar_por_sets, cosechar_revistas, ejecutar_trabajo
+from revistas.oai_sintetico import ServidorOAISintetico
+from revistas import utils
+from revistas.utils import (
+    ErrorOAI,
+    LectorListRecords,
+    NAMESPACES,
+    cosechar_datos_directo,
+    en_segundo_plano,
+    extraer_registro,
+    formatear_fecha_oai,
+    guardar_registros,
+    limpiar_texto,
+    normalizar_autor,
+    palabras_clave_de,
+    normalizar_idioma,
+    procesar_respuesta,
+    token_de_cola,
+)
+
+
+def registro_xml(identifier, titulo="Título", publisher="Editorial"):
+    return f"""
+    <record>
+      <header>
+        <identifier>{identifier}</identifier>
+        <datestamp>2024-01-15T10:00:00Z</datestamp>
+        <setSpec>art</setSpec>
+      </header>
+      <metadata>
+        <oai_dc:dc xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/"
+                   xmlns:dc="http://purl.org/dc/elements/1.1/">
+          <dc:title xml:lang="es-ES">{titulo}</dc:title>
+          <dc:title xml:lang="en-US">Title</dc:title>
+          <dc:creator>Pérez, Ana</dc:creator>
+          <dc:publisher>{publisher}</dc:publisher>
+          <dc:subject xml:lang="es-ES">ciencia</dc:subject>
+          <dc:date>2023-05-01</dc:date>
+          <dc:identifier>https://ejemplo.org/{identifier}</dc:identifier>
+        </oai_dc:dc>
+      </metadata>
+    </record>"""
+
+
+def registro_eliminado_xml(identifier):
+    return f"""
+    <record>
+      <header status="deleted">
+        <identifier>{identifier}</identifier>
+        <datestamp>2024-02-01T10:00:00Z</datestamp>
+      </header>
+    </record>"""
+
+
+def pagina_xml(identificadores, token=None, eliminados=(), **kwargs):
+    registros = "".join(registro_xml(i, **kwargs) for i in identificadores)
+    registros += "".join(registro_eliminado_xml(i) for i in eliminados)
+    resumption = f"<resumptionToken>{token}</resumptionToken>" if token else ""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+    <OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+      <ListRecords>{registros}{resumption}</ListRecords>
+    </OAI-PMH>"""
+
+
+class PaginaSintetica(io.RawIOBase):
+    """
+    Cuerpo ListRecords generado bajo demanda, sin materializar la página completa en memoria.
+    """
+
+    def __init__(self, total, token=None):
+        self.partes = self._partes(total, token)
+        self.pendiente = b""
+
+    def _partes(self, total, token):
+        encabezado, _, cierre = pagina_xml([], token=token).partition("<ListRecords>")
+        yield (encabezado + "<ListRecords>").encode()
+        for i in range(total):
+            yield registro_xml(f"oai:{i}", titulo="Título " * 50).encode()
+        yield cierre.encode()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pendiente:
+            self.pendiente = next(self.partes, None)
+            if self.pendiente is None:
+                self.pendiente = b""
+                return 0
+        n = min(len(buffer), len(self.pendiente))
+        buffer[:n] = self.pendiente[:n]
+        self.pendiente = self.pendiente[n:]
+        return n
+
+
+def crear_revista(**kwargs):
+    datos = {
+        "repository_name": "Revista de Prueba",
+        "base_url": "https://revistas.ejemplo.org/index.php/prueba/oai",
+        "protocol_version": "2.0",
+        "admin_email": "admin@ejemplo.org",
+        "earliest_datestamp": now(),
+        "deleted_record_policy": "persistent",
+        "granularity": "YYYY-MM-DDThh:mm:ssZ",
+    }
+    datos.update(kwargs)
+    return Revista.objects.create(**datos)
+
+
+class GuardarRegistrosTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+
+    def test_upsert_masivo_cuenta_creados_y_actualizados(self):
+        registros, _ = procesar_respuesta(pagina_xml(["oai:1", "oai:2"]))
+        self.assertEqual(guardar_registros(registros, self.revista), {"creados": 2, "actualizados": 0, "sin_cambios": 0, "eliminados": 0})
+
+        registros, _ = procesar_respuesta(pagina_xml(["oai:2", "oai:3"], titulo="Nuevo"))
+        resultado = guardar_registros(registros, self.revista, batch_size=1)
+        self.assertEqual(resultado, {"creados": 1, "actualizados": 1, "sin_cambios": 0, "eliminados": 0})
+
+        self.assertEqual(Articulo.objects.count(), 3)
+        self.assertEqual(Articulo.objects.get(identifier="oai:2").title_es, "Nuevo")
+
+    def test_pagina_en_pocas_consultas(self):
+        registros, _ = procesar_respuesta(pagina_xml([f"oai:{i}" for i in range(20)]))
+        # SAVEPOINT, SELECT de existentes, INSERT masivo de artículos, INSERT de autores,
+        # SELECT de sus ids, INSERT de autorías, lo mismo para las palabras clave, RELEASE
+        with self.assertNumQueries(10):
+            guardar_registros(registros, self.revista)
+
+    def test_omite_articulos_sin_cambios(self):
+        registros, _ = procesar_respuesta(pagina_xml([f"oai:{i}" for i in range(20)]))
+        guardar_registros(registros, self.revista)
+        huella = Articulo.objects.get(identifier="oai:0").huella
+        self.assertEqual(len(huella), 32)
+
+        registros, _ = procesar_respuesta(pagina_xml([f"oai:{i}" for i in range(20)]))
+        with self.assertNumQueries(3):  # SAVEPOINT, SELECT de huellas, RELEASE: sin INSERT
+            resultado = guardar_registros(registros, self.revista)
+        self.assertEqual(resultado, {"creados": 0, "actualizados": 0, "sin_cambios": 20, "eliminados": 0})
+
+        registros, _ = procesar_respuesta(pagina_xml(["oai:0"], titulo="Corregido"))
+        resultado = guardar_registros(registros, self.revista)
+        self.assertEqual(resultado["actualizados"], 1)
+        self.assertNotEqual(Articulo.objects.get(identifier="oai:0").huella, huella)
+
+
+class CosecharDatosDirectoTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+
+    def respuesta(self, texto):
+        return mock.Mock(status_code=200, text=texto)
+
+    def test_recorre_resumption_tokens(self):
+        paginas = [
+            self.respuesta(pagina_xml(["oai:1", "oai:2"], token="pag2")),
+            self.respuesta(pagina_xml(["oai:3"])),
+        ]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=paginas) as get:
+            resumen = cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+
+        self.assertEqual(resumen, {"creados": 3, "actualizados": 0, "sin_cambios": 0, "eliminados": 0})
+        self.assertIn("resumptionToken=pag2", get.call_args_list[1].args[0])
+        self.revista.refresh_from_db()
+        self.assertIsNotNone(self.revista.last_harvest_date)
+        self.assertEqual(self.revista.publisher, "Editorial")
+
+    def test_editorial_mas_frecuente_solo_de_la_revista_cosechada(self):
+        otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+        paginas = [
+            self.respuesta(pagina_xml(["oai:1", "oai:2"], token="pag2", publisher="Mayoritaria")),
+            self.respuesta(pagina_xml(["oai:3"], publisher="Minoritaria")),
+        ]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=paginas), \
+                mock.patch.object(Revista, "fetch_metadata") as fetch_metadata:
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+
+        self.revista.refresh_from_db()
+        otra.refresh_from_db()
+        self.assertEqual(self.revista.publisher, "Mayoritaria")
+        self.assertIsNone(otra.publisher)
+        fetch_metadata.assert_not_called()
+
+    def test_ignora_los_registros_sin_editorial(self):
+        xml = pagina_xml(["oai:1", "oai:2", "oai:3"], token="pag2", publisher="")
+        paginas = [self.respuesta(xml), self.respuesta(pagina_xml(["oai:4"], publisher="Universidad"))]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=paginas):
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+
+        self.assertEqual(Articulo.objects.filter(publisher="No disponible").count(), 3)
+        self.revista.refresh_from_db()
+        self.assertEqual(self.revista.publisher, "Universidad")
+
+        Revista.objects.filter(pk=self.revista.pk).update(publisher=None)
+        call_command("asignar_editoriales", stdout=io.StringIO())
+        self.revista.refresh_from_db()
+        self.assertEqual(self.revista.publisher, "Universidad")
+
+    def test_no_reemplaza_la_editorial_definida(self):
+        self.revista.publisher = "Definida"
+        self.revista.save()
+        respuesta = self.respuesta(pagina_xml(["oai:1"], publisher="Otra"))
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=respuesta):
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+
+        self.revista.refresh_from_db()
+        self.assertEqual(self.revista.publisher, "Definida")
+
+
+class AsignarEditorialesTests(TestCase):
+    def test_asigna_la_editorial_mas_frecuente_con_una_consulta_agrupada(self):
+        revistas = [
+            crear_revista(repository_name=f"Revista {i}", base_url=f"https://r{i}.ejemplo.org/oai") for i in range(3)
+        ]
+        revistas[2].publisher = "Definida"
+        revistas[2].save()
+        for revista, editoriales in zip(revistas, (["A", "B", "B", ""], ["C"], ["D", "D"])):
+            for j, editorial in enumerate(editoriales):
+                Articulo.objects.create(fuente=revista, identifier=f"oai:{revista.id}:{j}", publisher=editorial)
+
+        salida = io.StringIO()
+        with self.assertNumQueries(2):  # SELECT agrupado y UPDATE
+            call_command("asignar_editoriales", stdout=salida)
+        self.assertIn("2 revista(s)", salida.getvalue())
+        self.assertEqual(
+            list(Revista.objects.order_by("id").values_list("publisher", flat=True)), ["B", "C", "Definida"]
+        )
+
+        call_command("asignar_editoriales", "--sobrescribir", stdout=io.StringIO())
+        self.assertEqual(Revista.objects.get(pk=revistas[2].pk).publisher, "D")
+
+
+class CosechaIncrementalTests(TestCase):
+    def cosechar(self, paginas, **kwargs):
+        respuestas = [mock.Mock(status_code=200, text=pagina) for pagina in paginas]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=respuestas) as get:
+            resumen = cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id, **kwargs)
+        return resumen, [llamada.args[0] for llamada in get.call_args_list]
+
+    def setUp(self):
+        self.revista = crear_revista(
+            granularity="YYYY-MM-DD",
+            last_harvest_date=datetime(2024, 3, 10, 23, 30, tzinfo=dt_timezone.utc),
+        )
+
+    def test_pide_desde_la_ultima_cosecha_con_la_granularidad_del_repositorio(self):
+        _, urls = self.cosechar([pagina_xml(["oai:1"])])
+        self.assertIn("from=2024-03-10", urls[0])
+        self.assertEqual(formatear_fecha_oai(self.revista.last_harvest_date, "YYYY-MM-DDThh:mm:ssZ"), "2024-03-10T23:30:00Z")
+
+        self.revista.refresh_from_db()
+        self.assertGreater(self.revista.last_harvest_date.year, 2024)
+
+    def test_no_pisa_las_ediciones_hechas_durante_la_cosecha(self):
+        def pagina_editada(url, **kwargs):
+            Revista.objects.filter(pk=self.revista.pk).update(description="Editada", cosechar_por_sets=True)
+            return mock.Mock(status_code=200, text=pagina_xml(["oai:1"]))
+
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=pagina_editada):
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id, pipeline=False)
+
+        self.revista.refresh_from_db()
+        self.assertEqual((self.revista.description, self.revista.cosechar_por_sets), ("Editada", True))
+        self.assertGreater(self.revista.last_harvest_date.year, 2024)
+        self.assertEqual(self.revista.publisher, "Editorial")
+
+    def test_sin_cambios(self):
+        sin_cambios = """<?xml version="1.0" encoding="UTF-8"?>
+        <OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+          <error code="noRecordsMatch">No hay registros</error>
+        </OAI-PMH>"""
+        resumen, _ = self.cosechar([sin_cambios])
+        self.assertEqual(resumen, {"creados": 0, "actualizados": 0, "sin_cambios": 0, "eliminados": 0})
+
+    def test_error_oai_no_avanza_la_fecha(self):
+        error = """<?xml version="1.0" encoding="UTF-8"?>
+        <OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+          <error code="badArgument">from inválido</error>
+        </OAI-PMH>"""
+        with self.assertRaises(ErrorOAI):
+            self.cosechar([error])
+        self.revista.refresh_from_db()
+        self.assertEqual(self.revista.last_harvest_date.year, 2024)
+
+    def test_registros_eliminados_se_borran(self):
+        self.cosechar([pagina_xml(["oai:1", "oai:2"])])
+        resumen, _ = self.cosechar([pagina_xml(["oai:3"], eliminados=["oai:1", "oai:9"])])
+
+        self.assertEqual(resumen["eliminados"], 1)
+        self.assertEqual(set(Articulo.objects.values_list("identifier", flat=True)), {"oai:2", "oai:3"})
+
+    def test_cosecha_completa_resincroniza(self):
+        self.cosechar([pagina_xml(["oai:1", "oai:2"])])
+        resumen, urls = self.cosechar([pagina_xml(["oai:2"], token="t"), pagina_xml(["oai:3"])], completa=True)
+
+        self.assertNotIn("from=", urls[0])
+        self.assertEqual(resumen, {"creados": 1, "actualizados": 0, "sin_cambios": 1, "eliminados": 1})
+        self.assertEqual(set(Articulo.objects.values_list("identifier", flat=True)), {"oai:2", "oai:3"})
+
+
+class PipelineCosechaTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+
+    def cosechar_lento(self, pipeline, paginas=4, espera=0.1):
+        def get_lento(url, **kwargs):
+            time.sleep(espera)
+            numero = int(url.rsplit("pag", 1)[1]) if "resumptionToken" in url else 0
+            token = f"pag{numero + 1}" if numero + 1 < paginas else None
+            return mock.Mock(status_code=200, text=pagina_xml([f"oai:{numero}"], token=token))
+
+        guardar_lote = utils._guardar_lote
+
+        def guardar_lento(*args, **kwargs):
+            time.sleep(espera)
+            return guardar_lote(*args, **kwargs)
+
+        inicio = time.monotonic()
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=get_lento), \
+                mock.patch("revistas.utils._guardar_lote", side_effect=guardar_lento):
+            resumen = cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id, pipeline=pipeline)
+        return resumen, time.monotonic() - inicio
+
+    def test_descarga_solapada_con_escritura(self):
+        resumen, secuencial = self.cosechar_lento(pipeline=False)
+        self.assertEqual(resumen["creados"], 4)
+        resumen, solapado = self.cosechar_lento(pipeline=True)
+        self.assertEqual(resumen["sin_cambios"], 4)
+
+        # Secuencial: 4 × (red + escritura) = 0,8 s; en pipeline: ~ red + 4 × escritura = 0,5 s.
+        self.assertGreater(secuencial, 0.75)
+        self.assertLess(solapado, 0.7)
+
+    def test_error_de_descarga_revierte_la_pagina_y_se_propaga(self):
+        respuestas = [
+            mock.Mock(status_code=200, raw=PaginaSintetica(10, token="pag2")),
+            mock.Mock(status_code=404),
+        ]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=respuestas):
+            with self.assertRaises(Exception):
+                cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id, streaming=True, pipeline=True)
+
+        self.assertEqual(Articulo.objects.count(), 10)
+        self.revista.refresh_from_db()
+        self.assertIsNone(self.revista.last_harvest_date)
+
+    def test_en_segundo_plano_se_detiene_si_el_consumidor_abandona(self):
+        producidos = []
+
+        def infinito():
+            i = 0
+            while True:
+                producidos.append(i)
+                yield i
+                i += 1
+
+        eventos = en_segundo_plano(infinito(), profundidad=2)
+        self.assertEqual(next(eventos), 0)
+        eventos.close()
+        self.assertLess(len(producidos), 10)
+
+
+class CosechaReanudableTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+
+    def cosechar(self, respuestas):
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=respuestas) as get:
+            try:
+                return cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id, pipeline=False)
+            finally:
+                self.urls = [llamada.args[0] for llamada in get.call_args_list]
+
+    def test_reanuda_desde_el_ultimo_token_confirmado(self):
+        with self.assertRaises(Exception):
+            self.cosechar([
+                mock.Mock(status_code=200, text=pagina_xml(["oai:1"], token="pag2")),
+                mock.Mock(status_code=404),
+            ])
+        cosecha = HarvestRun.objects.get()
+        self.assertEqual(cosecha.estado, HarvestRun.FALLIDA)
+        self.assertEqual((cosecha.resumption_token, cosecha.paginas, cosecha.creados), ("pag2", 1, 1))
+
+        resumen = self.cosechar([mock.Mock(status_code=200, text=pagina_xml(["oai:2"]))])
+
+        self.assertIn("resumptionToken=pag2", self.urls[0])
+        self.assertEqual(resumen["creados"], 2)
+        cosecha.refresh_from_db()
+        self.assertEqual((cosecha.estado, cosecha.paginas, cosecha.resumption_token), (HarvestRun.COMPLETADA, 2, None))
+        self.revista.refresh_from_db()
+        self.assertEqual(self.revista.last_harvest_date, cosecha.inicio)
+
+    def test_no_reanuda_una_cosecha_que_sigue_activa(self):
+        cosecha = HarvestRun.objects.create(revista=self.revista, resumption_token="pag2", paginas=1)
+        self.assertFalse(cosecha.reanudable)
+        self.cosechar([mock.Mock(status_code=200, text=pagina_xml(["oai:1"]))])
+        self.assertNotIn("resumptionToken", self.urls[0])
+
+        # Sin latido durante COSECHA_VENCIMIENTO: el proceso que la ejecutaba murió.
+        cosecha.latido = now() - timedelta(seconds=settings.COSECHA_VENCIMIENTO + 1)
+        cosecha.save()
+        HarvestRun.objects.exclude(pk=cosecha.pk).delete()
+        self.assertTrue(cosecha.reanudable)
+        self.cosechar([mock.Mock(status_code=200, text=pagina_xml(["oai:2"]))])
+        self.assertIn("resumptionToken=pag2", self.urls[0])
+
+    def test_token_expirado_reinicia_la_ventana(self):
+        HarvestRun.objects.create(
+            revista=self.revista,
+            estado=HarvestRun.FALLIDA,
+            desde=datetime(2024, 1, 1, tzinfo=dt_timezone.utc),
+            resumption_token="viejo",
+            paginas=3,
+        )
+        expirado = """<?xml version="1.0" encoding="UTF-8"?>
+        <OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+          <error code="badResumptionToken">Expirado</error>
+        </OAI-PMH>"""
+        self.cosechar([
+            mock.Mock(status_code=200, text=expirado),
+            mock.Mock(status_code=200, text=pagina_xml(["oai:1"])),
+        ])
+
+        self.assertIn("resumptionToken=viejo", self.urls[0])
+        self.assertIn("from=2024-01-01T00%3A00%3A00Z", self.urls[1])
+        self.assertEqual(HarvestRun.objects.get().estado, HarvestRun.COMPLETADA)
+
+
+class LectorListRecordsTests(TestCase):
+    def test_mismos_registros_que_procesar_respuesta(self):
+        xml = pagina_xml(["oai:1", "oai:2"], token="sig")
+        lector = LectorListRecords(io.BytesIO(xml.encode()))
+
+        self.assertEqual(list(lector), procesar_respuesta(xml)[0])
+        self.assertEqual(lector.resumption_token, "sig")
+
+    def test_memoria_constante_con_pagina_grande(self):
+        total = 5000  # ~3,5 MB de XML
+        tracemalloc.start()
+        try:
+            lector = LectorListRecords(PaginaSintetica(total, token="fin"))
+            leidos = sum(1 for _ in lector)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(leidos, total)
+        self.assertEqual(lector.resumption_token, "fin")
+        self.assertLess(pico, 512 * 1024)
+
+    def test_cosecha_en_streaming(self):
+        revista = crear_revista()
+        respuestas = [
+            mock.Mock(status_code=200, raw=PaginaSintetica(30, token="pag2")),
+            mock.Mock(status_code=200, raw=PaginaSintetica(5)),
+        ]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=respuestas) as get:
+            resumen = cosechar_datos_directo(revista.base_url, "oai_dc", revista.id, batch_size=7, streaming=True)
+
+        self.assertEqual(resumen, {"creados": 30, "actualizados": 0, "sin_cambios": 5, "eliminados": 0})
+        self.assertTrue(get.call_args_list[0].kwargs["stream"])
+        self.assertEqual(Articulo.objects.count(), 30)
+
+
+class MotorCosechaTests(SimpleTestCase):
+    def revistas(self, hosts):
+        return [
+            SimpleNamespace(
+                id=i,
+                base_url=f"https://{host}/index.php/r{i}/oai",
+                metadata_prefix="oai_dc",
+                repository_name=f"Revista {i}",
+                cosechar_por_sets=False,
+            )
+            for i, host in enumerate(hosts)
+        ]
+
+    def test_cosecha_en_paralelo_respetando_limite_por_host(self):
+        activos = {}
+        maximos = {}
+        lock = threading.Lock()
+
+        def cosecha_falsa(url, metadata_prefix, revista_id, limite_host, **opciones):
+            host = url.split("/")[2]
+            with limite_host.conexion(url):
+                with lock:
+                    activos[host] = activos.get(host, 0) + 1
+                    maximos[host] = max(maximos.get(host, 0), activos[host])
+                time.sleep(0.1)
+                with lock:
+                    activos[host] -= 1
+            return {"creados": 1, "actualizados": 0}
+
+        revistas = self.revistas(["ojs.a.org"] * 4 + ["ojs.b.org", "ojs.c.org"])
+        inicio = time.monotonic()
+        with mock.patch("revistas.motor_cosecha.cosechar_datos_directo", side_effect=cosecha_falsa):
+            resultados = cosechar_revistas(revistas, workers=6, max_por_host=2)
+        duracion = time.monotonic() - inicio
+
+        self.assertEqual(len(resultados), 6)
+        self.assertTrue(all(r["error"] is None for r in resultados))
+        self.assertEqual(maximos["ojs.a.org"], 2)
+        # Dos tandas en ojs.a.org, en paralelo con el resto; secuencialmente serían 0,6 s.
+        self.assertLess(duracion, 0.4)
+
+    def test_errores_por_revista(self):
+        revistas = self.revistas(["ojs.a.org", "ojs.b.org"])
+
+        def cosecha_falsa(url, metadata_prefix, revista_id, **opciones):
+            if revista_id == 1:
+                raise ValueError("sin conexión")
+            return {"creados": 0, "actualizados": 0}
+
+        with mock.patch("revistas.motor_cosecha.cosechar_datos_directo", side_effect=cosecha_falsa):
+            resultados = {r["revista"].id: r for r in cosechar_revistas(revistas, workers=2)}
+
+        self.assertIsNone(resultados[0]["error"])
+        self.assertEqual(resultados[1]["error"], "sin conexión")
+
+    def test_sin_limite(self):
+        with LimitePorHost(None).conexion("https://ojs.a.org/oai"):
+            pass
+
+
+class ComandoCosecharTests(TestCase):
+    def test_requiere_url_o_all(self):
+        with self.assertRaises(CommandError):
+            call_command("cosechar")
+
+    def test_all_usa_el_motor(self):
+        revista = crear_revista()
+        resumen = {"creados": 2, "actualizados": 0, "sin_cambios": 0, "eliminados": 0}
+        resultado = [{"revista": revista, "resumen": resumen, "error": None}]
+        salida = io.StringIO()
+        with mock.patch("revistas.management.commands.cosechar.cosechar_revistas", return_value=resultado) as motor:
+            call_command("cosechar", "--all", "--workers", "3", "--full", stdout=salida)
+
+        self.assertEqual(motor.call_args.kwargs["workers"], 3)
+        self.assertTrue(motor.call_args.kwargs["completa"])
+        self.assertEqual([r.id for r in motor.call_args.args[0]], [revista.id])
+        self.assertIn("2 creados", salida.getvalue())
+
+
+class ClienteOAITests(SimpleTestCase):
+    def respuesta(self, status_code, **headers):
+        return mock.Mock(status_code=status_code, headers=headers, text="<OAI-PMH/>")
+
+    def test_una_sesion_por_hilo_y_host(self):
+        sesion = obtener_sesion("https://revistas.ejemplo.org/index.php/a/oai")
+        self.assertIs(obtener_sesion("https://REVISTAS.ejemplo.org/index.php/b/oai"), sesion)
+        self.assertIsNot(obtener_sesion("https://otro.ejemplo.org/oai"), sesion)
+
+        en_otro_hilo = []
+        hilo = threading.Thread(target=lambda: en_otro_hilo.append(obtener_sesion("https://revistas.ejemplo.org/oai")))
+        hilo.start()
+        hilo.join()
+        self.assertIsNot(en_otro_hilo[0], sesion)
+
+    def test_accept_encoding_segun_compresiones_declaradas(self):
+        self.assertEqual(accept_encoding("gzip; deflate"), "gzip, deflate")
+        self.assertEqual(accept_encoding("deflate"), "deflate")
+        self.assertEqual(accept_encoding("compress"), "identity")
+        self.assertEqual(accept_encoding(None), "identity")
+
+    def test_reintenta_503_respetando_retry_after(self):
+        cliente = ClienteOAI(compresiones="gzip", reintentos=3, espera_base=1)
+        respuestas = [self.respuesta(503, **{"Retry-After": "7"}), self.respuesta(502), self.respuesta(200)]
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=respuestas) as get, \
+                mock.patch("revistas.cliente_oai.time.sleep") as sleep:
+            with cliente.solicitar("https://ojs.a.org/oai?verb=Identify") as response:
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual([llamada.args[0] for llamada in sleep.call_args_list], [7, 2])
+        self.assertEqual(get.call_args.kwargs["headers"], {"Accept-Encoding": "gzip"})
+        self.assertEqual(get.call_args.kwargs["timeout"], (10, 120))
+
+    def test_reintenta_errores_de_conexion_y_se_rinde(self):
+        cliente = ClienteOAI(reintentos=2, espera_base=1)
+        with mock.patch("revistas.cliente_oai.requests.Session.get", side_effect=requests.ConnectionError("caído")) as get, \
+                mock.patch("revistas.cliente_oai.time.sleep"):
+            with self.assertRaises(requests.ConnectionError):
+                with cliente.solicitar("https://ojs.a.org/oai"):
+                    pass
+        self.assertEqual(get.call_count, 3)
+
+    def test_error_definitivo(self):
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=self.respuesta(404)) as get:
+            with self.assertRaises(Exception):
+                with ClienteOAI().solicitar("https://ojs.a.org/oai"):
+                    pass
+        self.assertEqual(get.call_count, 1)
+
+
+class ColaCosechaTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra", base_url="https://otra.ejemplo.org/oai")
+
+    def test_encolar_no_duplica_trabajos_pendientes(self):
+        self.assertEqual(HarvestJob.encolar(self.revista), HarvestJob.encolar(self.revista))
+        self.assertEqual(HarvestJob.objects.count(), 1)
+
+    def test_reclamar_en_orden_y_sin_repetir_revista_en_curso(self):
+        primero = HarvestJob.encolar(self.revista)
+        HarvestJob.objects.create(revista=self.revista)
+        tercero = HarvestJob.encolar(self.otra)
+
+        self.assertEqual(HarvestJob.reclamar("w1"), primero)
+        # El segundo trabajo es de una revista que ya se está cosechando.
+        self.assertEqual(HarvestJob.reclamar("w2"), tercero)
+        self.assertIsNone(HarvestJob.reclamar("w3"))
+
+        primero.refresh_from_db()
+        self.assertEqual((primero.estado, primero.worker), (HarvestJob.EN_CURSO, "w1"))
+
+    def test_sigterm_no_duplica_el_trabajo_en_cola(self):
+        en_curso = HarvestJob.encolar(self.revista)
+        HarvestJob.reclamar("w1")
+        en_cola = HarvestJob.encolar(self.revista)
+        self.assertNotEqual(en_curso, en_cola)
+
+        HarvestJob.abandonar([en_curso.pk], HarvestJob.EN_COLA, "Worker detenido con SIGTERM.")
+
+        self.assertEqual(list(HarvestJob.objects.filter(estado=HarvestJob.EN_COLA)), [en_cola])
+        en_curso.refresh_from_db()
+        self.assertEqual(en_curso.estado, HarvestJob.FALLIDO)
+        self.assertEqual(HarvestJob.encolar(self.revista), en_cola)
+
+    def test_no_reclama_una_revista_reclamada_por_otro_worker(self):
+        HarvestJob.encolar(self.revista)
+        HarvestJob.reclamar("w1")
+        segundo = HarvestJob.objects.create(revista=self.revista)
+        otro = HarvestJob.encolar(self.otra)
+        HarvestJob.objects.filter(pk=otro.pk).update(creado=now() + timedelta(seconds=1))
+
+        # Simula una reclamación de otro worker aún sin confirmar: el filtro previo no la ve.
+        with mock.patch.object(HarvestJob.objects, "filter", wraps=HarvestJob.objects.filter) as filtrar:
+            filtrar.side_effect = lambda *args, **kwargs: (
+                HarvestJob.objects.none() if kwargs == {"estado": HarvestJob.EN_CURSO}
+                else mock.DEFAULT
+            )
+            self.assertEqual(HarvestJob.reclamar("w2"), otro)
+        segundo.refresh_from_db()
+        self.assertEqual(segundo.estado, HarvestJob.EN_COLA)
+
+    def test_reclamar_libera_los_trabajos_sin_latido(self):
+        caido = HarvestJob.encolar(self.revista)
+        HarvestJob.reclamar("w1")
+        cosecha = HarvestRun.objects.create(revista=self.revista, trabajo=caido, resumption_token="pag2")
+        siguiente = HarvestJob.objects.create(revista=self.revista)
+
+        HarvestJob.renovar_latido([caido.pk])
+        self.assertIsNone(HarvestJob.reclamar("w2"))
+
+        vencido = now() - timedelta(seconds=settings.COSECHA_VENCIMIENTO + 1)
+        HarvestJob.objects.filter(pk=caido.pk).update(latido=vencido)
+        HarvestRun.objects.filter(pk=cosecha.pk).update(latido=vencido)
+        self.assertEqual(HarvestJob.reclamar("w2"), siguiente)
+
+        caido.refresh_from_db()
+        cosecha.refresh_from_db()
+        self.assertEqual(caido.estado, HarvestJob.FALLIDO)
+        self.assertIn("latido", caido.error)
+        self.assertEqual(cosecha.estado, HarvestRun.FALLIDA)
+        self.assertTrue(cosecha.reanudable)
+
+    def test_admin_encola_en_lugar_de_cosechar(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@ejemplo.org", "clave"))
+        with mock.patch("revistas.utils.cosechar_datos_directo") as cosechar:
+            self.client.get(reverse("admin:cosechar-revista", args=[self.revista.pk]))
+        cosechar.assert_not_called()
+        self.assertEqual(HarvestJob.objects.get().estado, HarvestJob.EN_COLA)
+
+        respuesta = self.client.get(reverse("admin:revistas_revista_changelist"))
+        self.assertContains(respuesta, "En cola")
+        self.assertEqual(self.client.get(reverse("admin:revistas_harvestjob_changelist")).status_code, 200)
+
+    def test_trabajo_por_sets_suma_todas_sus_cosechas(self):
+        self.revista.cosechar_por_sets = True
+        self.revista.save()
+        HarvestJob.encolar(self.revista)
+        trabajo = HarvestJob.reclamar("w1")
+
+        def cosecha_falsa(revista, al_iniciar, **opciones):
+            for set_spec, paginas in (("revista:0", 2), ("revista:1", 5)):
+                al_iniciar(HarvestRun.objects.create(
+                    revista=revista, set_spec=set_spec, paginas=paginas, creados=10, actualizados=1
+                ))
+
+        with mock.patch("revistas.motor_cosecha.cosechar_por_sets", side_effect=cosecha_falsa):
+            ejecutar_trabajo(trabajo)
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, HarvestJob.TERMINADO)
+        self.assertEqual(trabajo.cosechas.count(), 2)
+        fila = admin.site._registry[HarvestJob].get_queryset(None).get(pk=trabajo.pk)
+        self.assertEqual((fila.total_paginas, fila.total_registros), (7, 22))
+
+
+class HarvestWorkerTests(TransactionTestCase):
+    # Los hilos del worker usan sus propias conexiones, así que los datos deben estar confirmados.
+    def setUp(self):
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra", base_url="https://otra.ejemplo.org/oai")
+
+    def test_worker_procesa_la_cola(self):
+        HarvestJob.encolar(self.revista)
+        HarvestJob.encolar(self.otra)
+
+        def cosecha_falsa(url, metadata_prefix, revista_id, al_iniciar, **opciones):
+            al_iniciar(HarvestRun.objects.create(revista_id=revista_id, paginas=3, creados=10))
+            if revista_id == self.otra.id:
+                raise ValueError("sin conexión")
+
+        with mock.patch("revistas.motor_cosecha.cosechar_datos_directo", side_effect=cosecha_falsa):
+            call_command("harvest_worker", "--una-vez", "--workers", "1", stdout=io.StringIO())
+
+        terminado = HarvestJob.objects.get(revista=self.revista)
+        fallido = HarvestJob.objects.get(revista=self.otra)
+        self.assertEqual((terminado.estado, terminado.cosecha.paginas), (HarvestJob.TERMINADO, 3))
+        self.assertEqual((fallido.estado, fallido.error), (HarvestJob.FALLIDO, "sin conexión"))
+
+    def test_sigterm_devuelve_los_trabajos_en_curso_a_la_cola(self):
+        trabajo = HarvestJob.encolar(self.revista)
+        manejador = signal.getsignal(signal.SIGTERM)
+        liberar, liberado = threading.Event(), threading.Event()
+
+        def trabajo_interrumpido(trabajo, limite_host, limite_sets):
+            HarvestRun.objects.create(revista=trabajo.revista, trabajo=trabajo, resumption_token="pag2", paginas=1)
+            os.kill(os.getpid(), signal.SIGTERM)
+            liberar.wait(5)
+            liberado.set()
+
+        with mock.patch(
+            "revistas.management.commands.harvest_worker.ejecutar_trabajo", side_effect=trabajo_interrumpido
+        ):
+            salida = io.StringIO()
+            call_command("harvest_worker", "--workers", "1", stdout=salida)
+            trabajo.refresh_from_db()
+            cosecha = trabajo.cosechas.get()
+            liberar.set()
+            liberado.wait(5)
+
+        self.assertIn("1 trabajo(s) devuelto(s) a la cola", salida.getvalue())
+        self.assertEqual((trabajo.estado, trabajo.worker), (HarvestJob.EN_COLA, None))
+        self.assertEqual(cosecha.estado, HarvestRun.FALLIDA)
+        self.assertTrue(cosecha.reanudable)
+        self.assertIs(signal.getsignal(signal.SIGTERM), manejador)
+
+
+class BenchmarkCosechaTests(TestCase):
+    def test_servidor_sintetico_pagina_con_resumption_token(self):
+        servidor = ServidorOAISintetico(registros=5, tamano_pagina=2)
+        registros, token = procesar_respuesta(servidor.responder({"verb": "ListRecords"}))
+        self.assertEqual([r["identifier"] for r in registros], ["oai:sintetico:0", "oai:sintetico:1"])
+        self.assertEqual(token, "|2")
+        self.assertTrue(registros[0]["title_es"].startswith("Estudio 0"))
+        self.assertEqual(len(registros[0]["subjects_en"]), 3)
+
+        registros, token = procesar_respuesta(servidor.responder({"verb": "ListRecords", "resumptionToken": "|4"}))
+        self.assertEqual((len(registros), token), (1, None))
+
+    def test_benchmark_de_principio_a_fin(self):
+        metricas = ejecutar_benchmark(registros=300, tamano_pagina=50, cada_503=3)
+
+        self.assertEqual(metricas["guardados"], 300)
+        self.assertEqual(metricas["resumen"]["creados"], 300)
+        self.assertGreater(metricas["respuestas_503"], 0)
+        # Presupuesto del camino crítico: unas pocas consultas por página, nunca por registro.
+        self.assertLess(metricas["consultas_por_registro"], 0.4)
+        self.assertGreater(metricas["registros_por_segundo"], 0)
+        self.assertLessEqual({"descarga", "analisis", "escritura"}, set(metricas["etapas"]))
+
+    def test_comando_benchmark_aplica_presupuestos(self):
+        with mock.patch(
+            "revistas.management.commands.benchmark_cosecha.ejecutar_benchmark",
+            return_value={
+                "registros": 10, "guardados": 10, "resumen": {}, "segundos": 1.0,
+                "registros_por_segundo": 10.0, "consultas": 50, "consultas_por_registro": 5.0,
+                "peticiones": 1, "respuestas_503": 0, "rss_maximo_mb": None, "etapas": {"escritura": 0.5},
+            },
+        ), mock.patch("revistas.management.commands.benchmark_cosecha.connection") as conexion:
+            with self.assertRaises(CommandError):
+                call_command("benchmark_cosecha", "--max-consultas-por-registro", "1", stdout=io.StringIO())
+            conexion.creation.destroy_test_db.assert_called_once()
+
+
+class CosechaPorSetsTests(TransactionTestCase):
+    # Los flujos de cada set corren en hilos con sus propias conexiones.
+    def test_cosecha_por_sets_sin_duplicados(self):
+        with ServidorOAISintetico(registros=60, tamano_pagina=7, sets=3) as servidor:
+            revista = Revista.objects.create(base_url=servidor.url, cosechar_por_sets=True)
+            [resultado] = cosechar_revistas([revista], sets_por_host=1)
+
+        revista.refresh_from_db()
+        self.assertIsNone(resultado["error"])
+        self.assertEqual(revista.lista_sets(), ["revista", "revista:0", "revista:1", "revista:2"])
+        # El set padre contiene todos los registros: solo se piden sus subsets.
+        self.assertEqual(sorted(servidor.sets_pedidos), ["revista:0", "revista:1", "revista:2"])
+        self.assertIsNotNone(revista.last_harvest_date)
+        # Las tres editoriales empatan: se elige la primera en orden alfabético.
+        self.assertEqual(revista.publisher, "Universidad 0")
+        # Los registros que están en dos sets se escriben una sola vez.
+        self.assertEqual(resultado["resumen"], {"creados": 60, "actualizados": 0, "sin_cambios": 0, "eliminados": 0})
+        self.assertEqual(Articulo.objects.count(), 60)
+        self.assertEqual(
+            sorted(HarvestRun.objects.values_list("set_spec", flat=True)), ["revista:0", "revista:1", "revista:2"]
+        )
+
+    def test_solo_se_cosechan_los_sets_hoja(self):
+        revista = Revista(sets="a; a:x; a:x:1; a:x:2; a:y; b; driver")
+        self.assertEqual(revista.sets_hoja(), ["a:x:1", "a:x:2", "a:y", "b", "driver"])
+
+    def test_fallo_de_un_set_no_avanza_la_fecha(self):
+        revista = crear_revista(sets="a; b")
+
+        def cosecha_falsa(url, metadata_prefix, revista_id, set_spec, **opciones):
+            if set_spec == "b":
+                raise ValueError("sin conexión")
+            return {"creados": 1, "actualizados": 0, "eliminados": 0}
+
+        with mock.patch("revistas.motor_cosecha.cosechar_datos_directo", side_effect=cosecha_falsa):
+            with self.assertRaisesMessage(Exception, "b: sin conexión"):
+                cosechar_por_sets(revista)
+
+        revista.refresh_from_db()
+        self.assertIsNone(revista.last_harvest_date)
+
+
+class ExtraerRegistroTests(SimpleTestCase):
+    def records(self, xml):
+        return utils.ET.fromstring(xml).findall("oai:ListRecords/oai:record", NAMESPACES)
+
+    def test_coincide_con_la_implementacion_anterior(self):
+        servidor = ServidorOAISintetico(registros=20, tamano_pagina=20, sets=3)
+        xml = servidor.responder({"verb": "ListRecords"})
+        xml = xml.replace("</ListRecords>", registro_eliminado_xml("oai:borrado") + registro_xml("oai:x") + "</ListRecords>")
+        with mock.patch("builtins.print"):
+            for record in self.records(xml):
+                registro = extraer_registro(record)
+                referencia = extraer_registro_referencia(record)
+                if registro is not None:
+                    # La implementación anterior solo conservaba el primer dc:creator.
+                    creators = registro.pop("creators", [])
+                    self.assertEqual(creators[:1], [referencia["creator"]] if "creator" in referencia else [])
+                self.assertEqual(registro, referencia)
+
+    def test_normaliza_variantes_de_idioma(self):
+        xml = pagina_xml(["oai:1"]).replace('xml:lang="es-ES"', 'xml:lang="spa"').replace(
+            "<dc:date>", '<dc:subject xml:lang="es_CO">salud</dc:subject><dc:subject xml:lang="fr">santé</dc:subject><dc:date>'
+        )
+        [registro] = [extraer_registro(r) for r in self.records(xml)]
+        self.assertEqual(registro["title_es"], "Título")
+        self.assertEqual(registro["subjects_es"], ["ciencia", "salud"])
+        self.assertEqual([normalizar_idioma(l) for l in ("es", "ES-es", "eng", "en-GB", "pt-BR", None)], ["es", "es", "en", "en", None, None])
+
+    def test_limpiar_texto_elimina_surrogados_y_trunca(self):
+        self.assertEqual(limpiar_texto("a\ud83db\ude00c", max_length=2), "ab")
+        self.assertEqual(limpiar_texto(""), "No disponible")
+
+    def test_micro_benchmark(self):
+        metricas = benchmark_extraccion(registros=50, repeticiones=1)
+        self.assertEqual(metricas["registros"], 50)
+        self.assertGreater(metricas["us_por_registro_referencia"], 0)
+
+
+class ArchivoPaginasTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.enterContext(override_settings(COSECHA_ARCHIVO_DIR=self.directorio.name))
+        self.enterContext(mock.patch("builtins.print"))
+
+    def cosechar(self, servidor, **opciones):
+        revista = Revista.objects.create(base_url=servidor.url)
+        cosechar_datos_directo(revista.base_url, "oai_dc", revista.id, **opciones)
+        return revista
+
+    def test_archiva_cada_pagina_y_reprocesa(self):
+        with ServidorOAISintetico(registros=25, tamano_pagina=10) as servidor:
+            revista = self.cosechar(servidor)
+            xml_primera = servidor.responder({"verb": "ListRecords"}).encode()
+
+        paginas = list(paginas_archivadas(self.directorio.name))
+        cosecha = revista.cosechas.get()
+        self.assertEqual([p[:3] for p in paginas], [(revista.id, cosecha.id, n) for n in (1, 2, 3)])
+        self.assertEqual(leer_pagina(paginas[0][3]), xml_primera)
+
+        Articulo.objects.all().delete()
+        call_command("reprocesar", "--procesos", "2", stdout=io.StringIO())
+        self.assertEqual(Articulo.objects.filter(fuente=revista).count(), 25)
+
+    def test_reprocesa_desde_la_ultima_cosecha_completa(self):
+        with ServidorOAISintetico(registros=25, tamano_pagina=10) as servidor:
+            revista = self.cosechar(servidor, completa=True)
+        with ServidorOAISintetico(registros=15, tamano_pagina=10) as servidor:
+            resumen = cosechar_datos_directo(servidor.url, "oai_dc", revista.id, completa=True)
+        # La segunda cosecha completa borra los 10 artículos que ya no recibe.
+        self.assertEqual(resumen["eliminados"], 10)
+
+        Articulo.objects.all().delete()
+        with mock.patch("revistas.utils.crear_pool_analisis", wraps=utils.crear_pool_analisis) as crear_pool:
+            call_command("reprocesar", "--procesos", "2", stdout=io.StringIO())
+        crear_pool.assert_called_once_with(2)
+        self.assertEqual(Articulo.objects.filter(fuente=revista).count(), 15)
+
+        # Una cosecha concreta se reprocesa aunque sea anterior.
+        call_command("reprocesar", "--revista", str(revista.id), "--cosecha", str(revista.cosechas.last().id),
+                     "--procesos", "1", stdout=io.StringIO())
+        self.assertEqual(Articulo.objects.filter(fuente=revista).count(), 25)
+
+    def test_archiva_en_streaming(self):
+        with ServidorOAISintetico(registros=15, tamano_pagina=10) as servidor:
+            revista = self.cosechar(servidor, streaming=True, batch_size=4)
+            xml_segunda = servidor.responder({"verb": "ListRecords", "resumptionToken": "|10"}).encode()
+
+        paginas = list(paginas_archivadas(self.directorio.name, revista.id))
+        self.assertEqual(len(paginas), 2)
+        self.assertEqual(leer_pagina(paginas[1][3]), xml_segunda)
+        self.assertFalse([n for n in os.listdir(os.path.dirname(paginas[0][3])) if n.endswith(".tmp")])
+
+
+class AnalisisEnProcesosTests(TestCase):
+    def test_token_de_cola_coincide_con_el_analisis_completo(self):
+        paginas = [
+            pagina_xml(["oai:1"], token="abc&amp;d=1"),
+            pagina_xml(["oai:1"]),
+            pagina_xml(["oai:1"]).replace("</ListRecords>", '<resumptionToken cursor="10"/></ListRecords>'),
+            pagina_xml([]).replace("<ListRecords>", "<ListRecords>" + "x" * 100_000),
+        ]
+        for pagina in paginas:
+            contenido = pagina.encode()
+            self.assertEqual(token_de_cola(contenido), procesar_respuesta(contenido)[1])
+        self.assertEqual(token_de_cola(paginas[0].encode()), "abc&d=1")
+
+    def test_error_oai_conserva_el_codigo_entre_procesos(self):
+        error = pickle.loads(pickle.dumps(ErrorOAI("badResumptionToken", "caducado")))
+        self.assertEqual((error.codigo, str(error)), ("badResumptionToken", "badResumptionToken: caducado"))
+
+    def test_cosecha_con_pool_de_procesos(self):
+        with mock.patch("builtins.print"), ServidorOAISintetico(registros=45, tamano_pagina=10) as servidor:
+            revista = Revista.objects.create(base_url=servidor.url)
+            resumen = cosechar_datos_directo(revista.base_url, "oai_dc", revista.id, procesos=2)
+
+        self.assertEqual(resumen, {"creados": 45, "actualizados": 0, "sin_cambios": 0, "eliminados": 0})
+        self.assertEqual(revista.cosechas.get().paginas, 5)
+        self.assertEqual(Articulo.objects.get(identifier="oai:sintetico:44").title_en[:8], "Study 44")
+
+
+class ApiArticulosTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+        for i in range(7):
+            Articulo.objects.create(fuente=self.revista, identifier=f"oai:{i}")
+        Articulo.objects.create(fuente=self.otra, identifier="oai:otra")
+
+    def recorrer(self, url):
+        ids = []
+        while url:
+            with self.assertNumQueries(2):  # Sin COUNT: la página por índice y los autores de la página
+                datos = self.client.get(url).json()
+            ids += [articulo["id"] for articulo in datos["results"]]
+            url = datos["next"]
+        return ids
+
+    def test_recorre_todos_los_articulos_por_cursor(self):
+        ids = self.recorrer(reverse("lista-todos-articulos") + "?page_size=3")
+        self.assertEqual(ids, sorted(Articulo.objects.values_list("id", flat=True), reverse=True))
+
+    def test_articulos_de_una_revista(self):
+        ids = self.recorrer(reverse("lista-articulos", args=[self.revista.id]) + "?page_size=2")
+        self.assertEqual(ids, sorted(self.revista.articulos.values_list("id", flat=True), reverse=True))
+
+    @override_settings(API_ARTICULOS_POR_PAGINA=4, API_ARTICULOS_MAX_POR_PAGINA=5)
+    def test_tamano_de_pagina_configurable(self):
+        url = reverse("lista-todos-articulos")
+        self.assertEqual(len(self.client.get(url).json()["results"]), 4)
+        self.assertEqual(len(self.client.get(url + "?page_size=100").json()["results"]), 5)
+
+
+class ExportarArticulosTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+        for dia in range(1, 6):
+            Articulo.objects.create(
+                fuente=self.revista,
+                identifier=f"oai:{dia}",
+                title_es=f"Título, «{dia}»",
+                datestamp=datetime(2024, 1, dia, tzinfo=dt_timezone.utc),
+            )
+        Articulo.objects.create(fuente=self.otra, identifier="oai:otra")
+
+    def exportar(self, **parametros):
+        respuesta = self.client.get(reverse("exportar-articulos"), parametros)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b"".join(respuesta.streaming_content).decode()
+
+    @override_settings(API_EXPORTACION_BLOQUE=2)
+    def test_ndjson_en_bloques_filtrado_por_revista_y_fecha(self):
+        with self.assertNumQueries(2):  # Bloques de 2 filas: uno completo y uno parcial
+            respuesta, contenido = self.exportar(fuente=self.revista.id, desde="2024-01-02", hasta="2024-01-05")
+        self.assertEqual(respuesta["Content-Type"], "application/x-ndjson")
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual([f["identifier"] for f in filas], ["oai:2", "oai:3", "oai:4"])
+        self.assertEqual(filas[0]["fuente"], self.revista.id)
+        self.assertEqual(filas[0]["title_es"], "Título, «2»")
+        self.assertNotIn("huella", filas[0])
+
+    def test_csv_completo(self):
+        respuesta, contenido = self.exportar(formato="csv")
+        filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(respuesta["Content-Disposition"], 'attachment; filename="articulos.csv"')
+        self.assertEqual(filas[0][:3], ["id", "fuente", "identifier"])
+        self.assertEqual(len(filas), 7)
+        self.assertIn("Título, «1»", filas[1])
+
+    def test_parametros_invalidos(self):
+        url = reverse("exportar-articulos")
+        self.assertEqual(self.client.get(url, {"formato": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"desde": "ayer"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"fuente": "x"}).status_code, 400)
+
+
+class BuscarArticulosTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+
+    def crear(self, identifier, fuente=None, **campos):
+        return Articulo.objects.create(fuente=fuente or self.revista, identifier=identifier, **campos)
+
+    def buscar(self, **parametros):
+        respuesta = self.client.get(reverse("buscar-articulos"), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_resultados_ordenados_por_relevancia(self):
+        self.crear("oai:1", title_es="Salud pública", descriptions_es="Estudio sobre salud y salud mental")
+        self.crear("oai:2", title_en="Education", subjects_en="health")
+        self.crear("oai:3", title_es="Economía", descriptions_es="Política fiscal en salud")
+        self.crear("oai:4", title_es="Física de partículas")
+
+        datos = self.buscar(q="salud")
+        self.assertEqual(datos["count"], 2)
+        self.assertEqual([a["identifier"] for a in datos["results"]], ["oai:1", "oai:3"])
+        self.assertGreater(datos["results"][0]["relevancia"], datos["results"][1]["relevancia"])
+
+    def test_el_indice_sigue_a_la_cosecha(self):
+        registros, _ = procesar_respuesta(pagina_xml(["oai:1"], titulo="Agricultura andina"))
+        guardar_registros(registros, self.revista)
+        self.assertEqual(self.buscar(q="andina")["count"], 1)
+
+        # El upsert de la cosecha actualiza el índice, y los borrados lo limpian.
+        registros, _ = procesar_respuesta(pagina_xml(["oai:1"], titulo="Pesca costera"))
+        guardar_registros(registros, self.revista)
+        self.assertEqual(self.buscar(q="andina")["count"], 0)
+        self.assertEqual(self.buscar(q="costera")["count"], 1)
+        Articulo.objects.all().delete()
+        self.assertEqual(self.buscar(q="costera")["count"], 0)
+
+    def test_filtra_por_revista_y_valida_parametros(self):
+        self.crear("oai:1", title_es="Biología marina")
+        self.crear("oai:2", fuente=self.otra, title_es="Biología celular")
+        self.assertEqual(self.buscar(q="biologia", fuente=self.otra.id)["results"][0]["identifier"], "oai:2")
+        # La entrada no se interpreta como sintaxis de búsqueda.
+        self.assertEqual(self.buscar(q='marina" OR -')["count"], 1)
+        self.assertEqual(self.client.get(reverse("buscar-articulos")).status_code, 400)
+
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class EstadisticasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.revista = crear_revista()
+
+    def test_la_cosecha_recalcula_las_estadisticas(self):
+        respuesta = mock.Mock(status_code=200, text=pagina_xml(["oai:1", "oai:2", "oai:3"]))
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=respuesta):
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+        Articulo.objects.filter(identifier="oai:3").update(date="2019-02-01")
+        AutorArticulo.objects.create(
+            articulo=Articulo.objects.get(identifier="oai:3"),
+            autor=Autor.objects.create(nombre="Gómez, Luis", nombre_normalizado="gomez, luis"),
+            fuente=self.revista,
+            orden=1,
+        )
+
+        with self.assertNumQueries(1):  # Revista y estadísticas materializadas
+            detalle = self.client.get(reverse("detalle-revista", args=[self.revista.id])).json()
+        self.assertEqual(
+            (detalle["total_articles"], detalle["total_authors"], detalle["start_year"], detalle["end_year"]),
+            (3, 1, 2023, 2023),
+        )
+        with self.assertNumQueries(1):  # Estadísticas materializadas del portal
+            stats = self.client.get(reverse("stats")).json()
+        self.assertEqual(stats, {"total_revistas": 1, "total_articulos": 3, "total_autores": 1})
+
+        call_command("recalcular_estadisticas", stdout=io.StringIO())
+        detalle = self.client.get(reverse("detalle-revista", args=[self.revista.id])).json()
+        self.assertEqual((detalle["total_authors"], detalle["start_year"]), (2, 2019))
+
+    def test_revista_sin_estadisticas_y_totales_al_borrar(self):
+        otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+        detalle = self.client.get(reverse("detalle-revista", args=[otra.id])).json()
+        self.assertEqual((detalle["total_articles"], detalle["start_year"]), (0, "Desconocido"))
+        self.assertEqual(self.client.get(reverse("stats")).json()["total_revistas"], 2)
+
+        otra.delete()
+        self.assertEqual(self.client.get(reverse("stats")).json()["total_revistas"], 1)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CacheRespuestasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.revista = crear_revista(publisher="Universidad", last_harvest_date=datetime(2024, 5, 1, tzinfo=dt_timezone.utc))
+
+    def test_respuestas_condicionales_sin_base_de_datos(self):
+        for url in (
+            reverse("lista-revistas"),
+            reverse("detalle-revista", args=[self.revista.id]),
+            reverse("stats"),
+            reverse("instituciones-unicas"),
+        ):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertIn("Last-Modified", respuesta)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(url).content, respuesta.content)
+                    condicional = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta["ETag"])
+                    self.assertEqual(condicional.status_code, 304)
+                    condicional = self.client.get(url, HTTP_IF_MODIFIED_SINCE=respuesta["Last-Modified"])
+                    self.assertEqual(condicional.status_code, 304)
+
+    def test_la_cosecha_y_las_ediciones_invalidan(self):
+        otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+        detalle = reverse("detalle-revista", args=[self.revista.id])
+        etag = self.client.get(detalle)["ETag"]
+        etag_otra = self.client.get(reverse("detalle-revista", args=[otra.id]))["ETag"]
+        etag_global = self.client.get(reverse("instituciones-unicas"))["ETag"]
+
+        respuesta = mock.Mock(status_code=200, text=pagina_xml(["oai:1"]))
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=respuesta):
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+        respuesta = self.client.get(detalle, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["total_articles"], 1)
+        # Las respuestas de las demás revistas siguen siendo válidas.
+        self.assertEqual(
+            self.client.get(reverse("detalle-revista", args=[otra.id]), HTTP_IF_NONE_MATCH=etag_otra).status_code, 304
+        )
+
+        otra.publisher = "Otra Universidad"
+        otra.save()
+        respuesta = self.client.get(reverse("instituciones-unicas"), HTTP_IF_NONE_MATCH=etag_global)
+        self.assertEqual(sorted(respuesta.json()), ["Otra Universidad", "Universidad"])
+
+    def test_last_modified_avanza_con_las_ediciones(self):
+        detalle = reverse("detalle-revista", args=[self.revista.id])
+        with mock.patch("revistas.cache_respuestas.time.time_ns", return_value=1_800_000_000 * 10**9):
+            modificado = self.client.get(detalle)["Last-Modified"]
+            # Una edición sin cosecha también cambia Last-Modified, no solo el ETag.
+            with mock.patch("revistas.cache_respuestas.time.time_ns", return_value=1_800_000_060 * 10**9):
+                self.revista.description = "Editada"
+                self.revista.save()
+        respuesta = self.client.get(detalle, HTTP_IF_MODIFIED_SINCE=modificado)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["description"], "Editada")
+        self.assertEqual(
+            self.client.get(detalle, HTTP_IF_MODIFIED_SINCE=respuesta["Last-Modified"]).status_code, 304
+        )
+
+    def test_la_generacion_no_retrocede_con_el_reloj(self):
+        anterior = generacion(GLOBAL)
+        with mock.patch("revistas.cache_respuestas.time.time_ns", return_value=anterior - 10**9):
+            invalidar_respuestas()
+        self.assertGreater(generacion(GLOBAL), anterior)
+
+
+class AutoresTests(TestCase):
+    def setUp(self):
+        self.revista = crear_revista()
+
+    def cosechar(self, creadores, identificadores=("oai:1", "oai:2")):
+        xml = pagina_xml(identificadores).replace(
+            "<dc:creator>Pérez, Ana</dc:creator>", "".join(f"<dc:creator>{c}</dc:creator>" for c in creadores)
+        )
+        respuesta = mock.Mock(status_code=200, text=xml)
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=respuesta):
+            return cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+
+    def test_normaliza_variantes_del_nombre(self):
+        self.assertEqual(normalizar_autor("  Pérez,  Ana M. "), ("Pérez, Ana M.", "perez, ana m"))
+        self.assertEqual(normalizar_autor("Ana M. Pérez")[1], "perez, ana m")
+        self.assertEqual(normalizar_autor("PEREZ, Ana M")[1], "perez, ana m")
+        self.assertIsNone(normalizar_autor(" , "))
+
+    def test_la_cosecha_enlaza_coautores_en_orden(self):
+        self.cosechar(["Pérez, Ana", "Luis Gómez", "PEREZ, ANA"])
+
+        articulo = Articulo.objects.get(identifier="oai:1")
+        self.assertEqual(articulo.creator, "Pérez, Ana")
+        self.assertEqual(
+            [a.autor.nombre for a in articulo.autorias.select_related("autor")], ["Pérez, Ana", "Gómez, Luis"]
+        )
+        self.assertEqual(Autor.objects.count(), 2)
+        self.assertEqual(self.revista.estadisticas.total_autores, 2)
+
+        # Si cambian los autores, la nueva cosecha reemplaza las autorías.
+        self.assertEqual(self.cosechar(["Gómez, Luis"])["actualizados"], 2)
+        self.assertEqual(list(articulo.autores.values_list("nombre", flat=True)), ["Gómez, Luis"])
+        self.assertEqual(AutorArticulo.objects.count(), 2)
+
+    def test_comando_indexa_articulos_existentes(self):
+        self.cosechar(["Pérez, Ana", "Gómez, Luis"], identificadores=["oai:1"])
+        for i, creator in enumerate(["Ana Pérez", "Peña, Rosa", "No disponible"], start=2):
+            Articulo.objects.create(fuente=self.revista, identifier=f"oai:{i}", creator=creator)
+
+        call_command("indexar_autores", "--batch-size", "1", stdout=io.StringIO())
+        self.assertEqual(
+            [list(Articulo.objects.get(identifier=f"oai:{i}").autores.values_list("nombre", flat=True)) for i in range(1, 5)],
+            [["Pérez, Ana", "Gómez, Luis"], ["Pérez, Ana"], ["Peña, Rosa"], []],
+        )
+        self.revista.estadisticas.refresh_from_db()
+        self.assertEqual(self.revista.estadisticas.total_autores, 3)
+
+    def test_api_de_autores(self):
+        self.cosechar(["Pérez, Ana", "Gómez, Luis"])
+        self.cosechar(["Peña, Rosa"], identificadores=["oai:3"])
+
+        datos = self.client.get(reverse("lista-autores")).json()
+        self.assertEqual([a["nombre"] for a in datos["results"]], ["Gómez, Luis", "Peña, Rosa", "Pérez, Ana"])
+        datos = self.client.get(reverse("lista-autores") + "?nombre=PE").json()
+        self.assertEqual([a["nombre"] for a in datos["results"]], ["Peña, Rosa", "Pérez, Ana"])
+
+        autor = Autor.objects.get(nombre_normalizado="perez, ana")
+        detalle = self.client.get(reverse("detalle-autor", args=[autor.id])).json()
+        self.assertEqual(detalle, {"id": autor.id, "nombre": "Pérez, Ana", "total_articulos": 2})
+        with self.assertNumQueries(3):  # Autor, página de artículos y sus autores
+            datos = self.client.get(reverse("articulos-autor", args=[autor.id])).json()
+        self.assertEqual(
+            [(a["identifier"], a["autores"]) for a in datos["results"]],
+            [("oai:2", ["Pérez, Ana", "Gómez, Luis"]), ("oai:1", ["Pérez, Ana", "Gómez, Luis"])],
+        )
+        self.assertEqual(self.client.get(reverse("detalle-autor", args=[0])).status_code, 404)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PalabrasClaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+
+    def cosechar(self, revista, identificadores, temas):
+        xml = pagina_xml(identificadores).replace(
+            '<dc:subject xml:lang="es-ES">ciencia</dc:subject>',
+            "".join(f'<dc:subject xml:lang="{idioma}">{tema}</dc:subject>' for idioma, tema in temas),
+        )
+        respuesta = mock.Mock(status_code=200, text=xml)
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=respuesta):
+            cosechar_datos_directo(revista.base_url, "oai_dc", revista.id)
+
+    def test_separa_y_normaliza_los_temas(self):
+        self.assertEqual(
+            palabras_clave_de(["Salud mental; Educación.", "salud  MENTAL", " ; "]),
+            [("Salud mental", "salud mental"), ("Educación", "educacion")],
+        )
+
+    def test_facetas_y_articulos_por_palabra_clave(self):
+        self.cosechar(self.revista, ["oai:1", "oai:2"], [("es-ES", "Salud; Educación"), ("en-US", "health")])
+        self.cosechar(self.otra, ["oai:3"], [("es-ES", "educacion")])
+
+        with self.assertNumQueries(2):  # Conteo agrupado y nombres
+            facetas = self.client.get(reverse("palabras-clave") + "?limite=2").json()
+        educacion = PalabraClave.objects.get(nombre_normalizado="educacion")
+        self.assertEqual(facetas[0], {"id": educacion.id, "nombre": "Educación", "total_articulos": 3})
+        self.assertEqual(len(facetas), 2)
+
+        facetas = self.client.get(reverse("palabras-clave") + f"?fuente={self.otra.id}").json()
+        self.assertEqual([(f["nombre"], f["total_articulos"]) for f in facetas], [("Educación", 1)])
+        self.assertEqual(self.client.get(reverse("palabras-clave") + "?limite=0").status_code, 400)
+
+        url = reverse("articulos-palabra-clave", args=[educacion.id])
+        datos = self.client.get(url).json()
+        self.assertEqual([a["identifier"] for a in datos["results"]], ["oai:3", "oai:2", "oai:1"])
+        datos = self.client.get(url + f"?fuente={self.revista.id}").json()
+        self.assertEqual([a["identifier"] for a in datos["results"]], ["oai:2", "oai:1"])
+
+        # Una nueva versión del registro reemplaza sus palabras clave.
+        self.cosechar(self.otra, ["oai:3"], [("es-ES", "Biología")])
+        facetas = self.client.get(reverse("palabras-clave") + f"?fuente={self.otra.id}").json()
+        self.assertEqual([f["nombre"] for f in facetas], ["Biología"])
+
+    def test_comando_indexa_articulos_existentes(self):
+        Articulo.objects.create(fuente=self.revista, identifier="oai:1", subjects_es="Salud; Agua", subjects_en="Water")
+        call_command("indexar_palabras_clave", "--batch-size", "1", stdout=io.StringIO())
+        self.assertEqual(
+            sorted(Articulo.objects.get().palabras_clave.values_list("nombre", flat=True)), ["Agua", "Salud", "Water"]
+        )
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class FacetasArticulosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.revista = crear_revista()
+        self.otra = crear_revista(repository_name="Otra Revista", base_url="https://otra.ejemplo.org/oai")
+        for i, (fuente, anio, idioma, tipo) in enumerate([
+            (self.revista, 2020, "es", "article"),
+            (self.revista, 2020, "en", "article"),
+            (self.revista, 2021, "es", "review"),
+            (self.otra, 2021, "es", "article"),
+            (self.otra, None, None, "article"),
+        ]):
+            Articulo.objects.create(
+                fuente=fuente, identifier=f"oai:{i}", date=date(anio, 6, 1) if anio else None, language=idioma, type=tipo
+            )
+
+    def identificadores(self, datos):
+        return [articulo["identifier"] for articulo in datos["results"]]
+
+    def test_filtros_combinados(self):
+        url = reverse("lista-todos-articulos")
+        self.assertEqual(self.identificadores(self.client.get(url + "?idioma=es&tipo=article").json()), ["oai:3", "oai:0"])
+        datos = self.client.get(url + f"?fuente={self.revista.id}&anio=2020").json()
+        self.assertEqual(self.identificadores(datos), ["oai:1", "oai:0"])
+        self.assertNotIn("facetas", datos)
+        self.assertEqual(self.client.get(url + "?anio=dos mil").status_code, 400)
+
+        url = reverse("lista-articulos", args=[self.otra.id])
+        self.assertEqual(self.identificadores(self.client.get(url + "?anio=2021").json()), ["oai:3"])
+
+    def test_facetas_junto_a_la_pagina(self):
+        url = reverse("lista-todos-articulos") + "?idioma=es&facetas=1"
+        # Página, autores de la página y una consulta agrupada por faceta
+        with self.assertNumQueries(6):
+            datos = self.client.get(url).json()
+        self.assertEqual(self.identificadores(datos), ["oai:3", "oai:2", "oai:0"])
+        facetas = datos["facetas"]
+        # Cada faceta se cuenta sin su propio filtro.
+        self.assertEqual(facetas["idioma"], [{"valor": "es", "total": 3}, {"valor": "en", "total": 1}])
+        self.assertEqual(facetas["anio"], [{"valor": 2021, "total": 2}, {"valor": 2020, "total": 1}])
+        self.assertEqual(facetas["tipo"], [{"valor": "article", "total": 2}, {"valor": "review", "total": 1}])
+        self.assertEqual(facetas["fuente"], [{"valor": self.revista.id, "total": 2}, {"valor": self.otra.id, "total": 1}])
+
+        with self.assertNumQueries(2):  # Los conteos quedan en caché hasta la próxima cosecha
+            self.assertEqual(self.client.get(url).json()["facetas"], facetas)
+
+        facetas = self.client.get(reverse("lista-articulos", args=[self.otra.id]) + "?facetas=1").json()["facetas"]
+        self.assertNotIn("fuente", facetas)
+        self.assertEqual(facetas["tipo"], [{"valor": "article", "total": 2}])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CamposSolicitadosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.revista = crear_revista(description="Descripción " * 200)
+        for i in range(3):
+            Articulo.objects.create(
+                fuente=self.revista, identifier=f"oai:{i}", title_es=f"Título {i}",
+                descriptions_es="Resumen largo. " * 400, rights="CC BY 4.0 " * 50,
+            )
+
+    def test_listado_compacto_sin_columnas_largas(self):
+        url = reverse("lista-todos-articulos")
+        with CaptureQueriesContext(connection) as consultas:
+            compacto = self.client.get(url)
+        self.assertNotIn("descriptions_es", consultas[0]["sql"])
+        articulo = compacto.json()["results"][0]
+        self.assertEqual(
+            set(articulo),
+            {"id", "fuente", "identifier", "datestamp", "title_es", "title_en", "creator", "autores",
+             "publisher", "type", "language", "date", "identifier_url"},
+        )
+        completo = self.client.get(reverse("detalle-articulo", args=[articulo["id"]]))
+        self.assertIn("descriptions_es", completo.json())
+        self.assertLess(len(compacto.content) * 10, len(completo.content) * 3)
+
+    def test_campos_solicitados(self):
+        url = reverse("lista-articulos", args=[self.revista.id]) + "?fields=id,descriptions_es"
+        with self.assertNumQueries(1):  # Sin autores: no se cargan
+            with CaptureQueriesContext(connection) as consultas:
+                datos = self.client.get(url).json()
+        self.assertNotIn("rights", consultas[0]["sql"])
+        self.assertNotIn("title_es", consultas[0]["sql"])
+        self.assertEqual(set(datos["results"][0]), {"id", "descriptions_es"})
+
+        respuesta = self.client.get(reverse("lista-todos-articulos") + "?fields=id,huella,nada")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn("huella, nada", respuesta.json()["fields"])
+
+        articulo = Articulo.objects.first()
+        detalle = self.client.get(reverse("detalle-articulo", args=[articulo.id]) + "?fields=title_es,autores").json()
+        self.assertEqual(detalle, {"title_es": articulo.title_es, "autores": []})
+
+    def test_listado_de_revistas(self):
+        [revista] = self.client.get(reverse("lista-revistas")).json()
+        self.assertNotIn("description", revista)
+        self.assertEqual(revista["repository_name"], self.revista.repository_name)
+        [revista] = self.client.get(reverse("lista-revistas") + "?fields=id,description").json()
+        self.assertEqual(revista, {"id": self.revista.id, "description": self.revista.description})
+
+
+def fuera_de_parentesis(sql):
+    """`sql` sin el contenido de sus paréntesis (subconsultas, llamadas a funciones)."""
+    nivel, partes = 0, []
+    for caracter in sql:
+        if caracter == "(":
+            nivel += 1
+        elif caracter == ")":
+            nivel -= 1
+        elif nivel == 0:
+            partes.append(caracter)
+    return "".join(partes)
+
+
+def recorridos_completos(consultas):
+    """
+    Consultas SELECT de `consultas` (de CaptureQueriesContext) cuyo plan (EXPLAIN en la
+    base de pruebas) recorre una tabla completa, con el detalle del plan de cada una.
+    No cuentan como recorridos completos los de índices que cubren la consulta, ni los
+    recorridos sin filtros en el orden de un índice que se detienen en el LIMIT, ni los de la tabla
+    de revistas, que es pequeña y se lista entera a propósito.
+    """
+    completos = []
+    with connection.cursor() as cursor:
+        for consulta in consultas:
+            sql = consulta["sql"]
+            if not sql.startswith("SELECT"):
+                continue
+            # Recorrido de una página sin filtros (listados, changelists): se detiene en el LIMIT.
+            # Los filtros de las subconsultas correlacionadas no cuentan.
+            externa = fuera_de_parentesis(sql)
+            pagina = " LIMIT " in externa and " WHERE " not in externa
+            if connection.vendor == "mysql":
+                cursor.execute("EXPLAIN " + sql)
+                columnas = [columna[0] for columna in cursor.description]
+                filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+                plan = [f"{fila['table']}: {fila['type']} {fila['key']} {fila['Extra']}" for fila in filas]
+                completo = any(
+                    fila["type"] == "ALL" and fila["table"] != "revistas_revista"
+                    and not (pagina and "filesort" not in (fila["Extra"] or ""))
+                    for fila in filas
+                )
+            else:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = [fila[-1] for fila in cursor.fetchall()]
+                ordenado = not any("TEMP B-TREE FOR ORDER BY" in paso for paso in plan)
+                completo = any(
+                    paso.startswith("SCAN ")
+                    and "COVERING INDEX" not in paso
+                    and "VIRTUAL TABLE" not in paso
+                    and paso.split()[1] != "revistas_revista"
+                    and not (pagina and ordenado)
+                    for paso in plan
+                )
+            if completo:
+                completos.append((sql, plan))
+    return completos
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PlanesDeConsultaTests(TestCase):
+    """
+    Regresiones de rendimiento de las consultas más frecuentes: cada endpoint y cada
+    changelist del admin se ejecuta con su presupuesto de consultas y ninguna de sus
+    consultas puede recorrer una tabla completa.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.revista = crear_revista(publisher="Universidad")
+        xml = pagina_xml(["oai:1", "oai:2", "oai:3"]).replace(
+            "<dc:creator>Pérez, Ana</dc:creator>", "<dc:creator>Pérez, Ana</dc:creator><dc:creator>Gómez, Luis</dc:creator>"
+        ).replace("<dc:date>", "<dc:language>es</dc:language><dc:type>article</dc:type><dc:date>")
+        respuesta = mock.Mock(status_code=200, text=xml)
+        with mock.patch("revistas.cliente_oai.requests.Session.get", return_value=respuesta), mock.patch("builtins.print"):
+            cosechar_datos_directo(self.revista.base_url, "oai_dc", self.revista.id)
+        self.articulo = Articulo.objects.first()
+        self.autor = Autor.objects.first()
+        self.palabra = PalabraClave.objects.first()
+        cache.clear()
+
+    def comprobar(self, url, presupuesto):
+        with self.subTest(url=url):
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertLessEqual(len(consultas), presupuesto, [c["sql"] for c in consultas])
+            self.sin_recorridos_completos(consultas)
+
+    def sin_recorridos_completos(self, consultas):
+        completos = recorridos_completos(consultas)
+        self.assertFalse(completos, "\n\n".join(f"{sql}\n  -> {' | '.join(plan)}" for sql, plan in completos))
+
+    def test_endpoints_de_la_api(self):
+        fuente = self.revista.id
+        for url, presupuesto in [
+            (reverse("lista-todos-articulos"), 2),
+            (reverse("lista-todos-articulos") + "?facetas=1", 6),
+            (reverse("lista-todos-articulos") + f"?fuente={fuente}&anio=2023&idioma=es&tipo=article&facetas=1", 6),
+            (reverse("lista-articulos", args=[fuente]), 2),
+            (reverse("lista-articulos", args=[fuente]) + "?anio=2023&fields=id,title_es", 1),
+            (reverse("detalle-articulo", args=[self.articulo.id]), 2),
+            (reverse("buscar-articulos") + "?q=titulo", 3),
+            (reverse("exportar-articulos") + f"?fuente={fuente}", 1),
+            (reverse("lista-revistas"), 2),
+            (reverse("detalle-revista", args=[fuente]), 2),
+            (reverse("stats"), 2),
+            (reverse("instituciones-unicas"), 2),
+            (reverse("lista-autores") + "?nombre=per", 1),
+            (reverse("detalle-autor", args=[self.autor.id]), 1),
+            (reverse("articulos-autor", args=[self.autor.id]), 3),
+            (reverse("palabras-clave"), 3),
+            (reverse("palabras-clave") + f"?fuente={fuente}", 3),
+            (reverse("articulos-palabra-clave", args=[self.palabra.id]), 3),
+        ]:
+            self.comprobar(url, presupuesto)
+
+    def test_changelists_del_admin(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@ejemplo.org", "clave"))
+        HarvestRun.objects.create(revista=self.revista, estado=HarvestRun.COMPLETADA)
+        for _ in range(2):
+            HarvestJob.objects.create(revista=self.revista)
+        # Con varias páginas, como en producción: cada changelist pide solo su página (LIMIT).
+        with mock.patch.object(admin.ModelAdmin, "list_per_page", 1):
+            self.changelists()
+
+    def changelists(self):
+        for url, presupuesto in [
+            (reverse("admin:revistas_revista_changelist"), 8),
+            (reverse("admin:revistas_articulo_changelist"), 8),
+            (reverse("admin:revistas_articulo_changelist") + "?language__exact=es", 8),
+            (reverse("admin:revistas_harvestrun_changelist"), 8),
+            (reverse("admin:revistas_harvestjob_changelist"), 8),
+        ]:
+            self.comprobar(url, presupuesto)
+
+    def test_detecta_recorridos_completos(self):
+        with CaptureQueriesContext(connection) as consultas:
+            list(Articulo.objects.filter(title_es__icontains="título").order_by("-id")[:10])
+            list(Articulo.objects.order_by("-id")[:10])
+        self.assertEqual(len(recorridos_completos(consultas)), 1)
+
+    def test_estadisticas_al_terminar_la_cosecha(self):
+        with CaptureQueriesContext(connection) as consultas:
+            recalcular_estadisticas([self.revista])
+        self.assertLessEqual(len(consultas), 7)
+        self.sin_recorridos_completos(consultas)
@@ -8,6 +8,13 @@ from .views import (
     ArticuloListView,
     ArticuloDetailView,
     AllArticlesView,
+    BuscarArticulosView,
+    ExportarArticulosView,
+    AutorListView,
+    AutorDetailView,
+    ArticulosPorAutorView,
+    PalabrasClaveView,
+    ArticulosPorPalabraClaveView,
     StatsView
 )
 
@@ -19,6 +26,15 @@ urlpatterns = [
 
     path('articulos/<int:pk>/', ArticuloDetailView.as_view(), name='detalle-articulo'),
     path('articulos/', AllArticlesView.as_view(), name='lista-todos-articulos'),
+    path('articulos/buscar/', BuscarArticulosView.as_view(), name='buscar-articulos'),
+    path('articulos/exportar/', ExportarArticulosView.as_view(), name='exportar-articulos'),
+
+    path('autores/', AutorListView.as_view(), name='lista-autores'),
+    path('autores/<int:pk>/', AutorDetailView.as_view(), name='detalle-autor'),
+    path('autores/<int:pk>/articulos/', ArticulosPorAutorView.as_view(), name='articulos-autor'),
+
+    path('palabras-clave/', PalabrasClaveView.as_view(), name='palabras-clave'),
+    path('palabras-clave/<int:pk>/articulos/', ArticulosPorPalabraClaveView.as_view(), name='articulos-palabra-clave'),
 
     path('instituciones/', instituciones_unicas, name='instituciones-unicas'),
     
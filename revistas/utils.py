@@ -1,10 +1,58 @@
-import requests
 import xml.etree.ElementTree as ET
-from .models import Articulo, Revista
+from .archivo import ArchivoPaginas, CopiaFlujo, leer_pagina
+from .cache_respuestas import invalidar_respuestas
+from .estadisticas import recalcular_estadisticas
+from .cliente_oai import ClienteOAI
+from .models import Articulo, Autor, AutorArticulo, HarvestRun, PalabraClave, PalabraClaveArticulo, Revista
+import hashlib
+import html
+import multiprocessing
+import queue
+import re
+import threading
+import time
 import unicodedata
-from django.utils.timezone import now
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, closing, contextmanager
+from functools import lru_cache
+from urllib.parse import urlencode
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
 from .models import Revista, Articulo
-from datetime import datetime, date
+from datetime import datetime, date, timezone as dt_timezone
+
+# Campos que se sobrescriben cuando un registro ya existe en la base de datos.
+CAMPOS_ACTUALIZABLES = [
+    "fuente",
+    "datestamp",
+    "set_spec",
+    "title_es",
+    "title_en",
+    "creator",
+    "publisher",
+    "type",
+    "format",
+    "identifier_url",
+    "language",
+    "relation",
+    "coverage",
+    "rights",
+    "date",
+    "subjects_es",
+    "subjects_en",
+    "descriptions_es",
+    "descriptions_en",
+    "sources",
+]
+
+# Sustitutos UTF-16 sueltos (categoría Unicode "Cs"), que MySQL no puede almacenar.
+SURROGADOS = re.compile('[\ud800-\udfff]')
+# Valor que limpiar_texto guarda en los campos vacíos.
+NO_DISPONIBLE = "No disponible"
 
 def formatear_fecha(fecha):
     """
@@ -25,161 +73,1147 @@ def formatear_fecha(fecha):
     print(f"Tipo no esperado para la fecha: {type(fecha)}")
     return None
 
-def transfer_publisher_to_revista():
+def asignar_editorial(revista, editorial):
     """
-    Transfiere el valor del campo publisher del primer artículo
-    relacionado a la revista correspondiente.
+    Asigna `editorial` a la revista si todavía no tiene una definida. Usa un UPDATE
+    directo en lugar de `save()`, que podría volver a pedir los metadatos al repositorio.
     """
-    revistas = Revista.objects.all()
-
-    for revista in revistas:
-        # Cambia 'revista' por 'fuente' en el filtro
-        articulo = Articulo.objects.filter(fuente=revista).exclude(publisher__isnull=True).first()
-
-        if articulo and articulo.publisher:
-            # Actualizar el campo publisher en la revista si no está definido
-            if not revista.publisher:
-                revista.publisher = articulo.publisher
-                revista.save()
-                print(f"Actualizado publisher de la revista '{revista.repository_name}' a '{articulo.publisher}'")
-            else:
-                print(f"La revista '{revista.repository_name}' ya tiene un publisher definido: '{revista.publisher}'")
+    if not editorial or revista.publisher:
+        return
+    actualizadas = Revista.objects.filter(
+        Q(publisher__isnull=True) | Q(publisher=""), pk=revista.pk
+    ).update(publisher=editorial)
+    if actualizadas:
+        revista.publisher = editorial
+        print(f"Actualizado publisher de la revista '{revista.repository_name}' a '{editorial}'")
 
 def limpiar_texto(texto, max_length=None):
     """
     Limpia caracteres especiales no válidos (como emojis) para evitar errores al guardar en MySQL.
     """
     if texto:
-        texto_limpio = ''.join(c for c in texto if unicodedata.category(c) != 'Cs')  # Elimina caracteres no válidos
+        texto_limpio = SURROGADOS.sub('', texto)  # Elimina caracteres no válidos
         if max_length and len(texto_limpio) > max_length:
             return texto_limpio[:max_length]
         return texto_limpio
-    return "No disponible"
+    return NO_DISPONIBLE
+
+
+def normalizar_autor(nombre):
+    """
+    Normaliza un dc:creator. Devuelve `(nombre, clave)`: el nombre en orden
+    "Apellido, Nombre" (los nombres sin coma, como "Ana Pérez", se invierten tomando la
+    última palabra como apellido) y la clave que identifica al autor, sin mayúsculas,
+    tildes ni puntos. Devuelve None si el nombre está vacío.
+    """
+    nombre = " ".join(SURROGADOS.sub("", nombre or "").split()).strip(" ,;")
+    if not nombre:
+        return None
+    if "," in nombre:
+        apellido, _, nombres = nombre.partition(",")
+        nombre = f"{apellido.strip()}, {nombres.strip()}" if nombres.strip() else apellido.strip()
+    elif " " in nombre:
+        nombres, _, apellido = nombre.rpartition(" ")
+        nombre = f"{apellido}, {nombres}"
+
+    return nombre[:255], clave_normalizada(nombre)[:255]
+
+
+def palabras_clave_de(temas):
+    """
+    Palabras clave normalizadas de una lista de dc:subject, como pares `(nombre, clave)`
+    sin repetir. Un mismo dc:subject puede traer varias palabras separadas por ";".
+    """
+    palabras = {}
+    for tema in temas:
+        for palabra in SURROGADOS.sub("", tema or "").split(";"):
+            nombre = " ".join(palabra.split()).strip(" .,")[:255]
+            if nombre:
+                palabras.setdefault(clave_normalizada(nombre)[:255], nombre)
+    return [(nombre, clave) for clave, nombre in palabras.items()]
+
 
+def autores_de(creadores):
+    """
+    Autores normalizados (`normalizar_autor`) de una lista de dc:creator, como pares
+    `(nombre, clave)` en su orden y sin repetir.
+    """
+    autores = {}
+    for creador in creadores:
+        normalizado = normalizar_autor(creador)
+        if normalizado:
+            autores.setdefault(normalizado[1], normalizado[0])
+    return [(nombre, clave) for clave, nombre in autores.items()]
+
+
+def clave_normalizada(texto):
+    """
+    Texto sin mayúsculas, tildes ni puntos, como `Autor.nombre_normalizado` y
+    `PalabraClave.nombre_normalizado`. Sirve también para buscar autores por prefijo.
+    """
+    clave = "".join(
+        c for c in unicodedata.normalize("NFKD", texto.casefold()) if not unicodedata.combining(c)
+    )
+    return " ".join(clave.replace(".", " ").split()).replace(" ,", ",")
 
-def cosechar_datos_directo(url, metadata_prefix, revista_id):
+
+def formatear_fecha_oai(fecha, granularidad):
     """
-    Descarga y almacena todos los artículos desde un servidor OAI-PMH.
+    Formatea una fecha para los argumentos `from`/`until` según la granularidad declarada
+    por el repositorio en Identify (`YYYY-MM-DD` o `YYYY-MM-DDThh:mm:ssZ`).
     """
+    if isinstance(fecha, datetime):
+        if timezone.is_aware(fecha):
+            fecha = fecha.astimezone(dt_timezone.utc)
+        if granularidad and "hh" in granularidad:
+            return fecha.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return fecha.strftime("%Y-%m-%d")
+    return fecha.strftime("%Y-%m-%d")
+
+
+class RegistrosCompartidos:
+    """
+    Identificadores ya escritos por alguno de los flujos paralelos de una misma cosecha.
+    Un registro puede pertenecer a varios sets; solo el primer flujo que lo recibe lo escribe.
+    """
+
+    def __init__(self):
+        self._identificadores = set()
+        self._lock = threading.Lock()
+
+    def reclamar(self, identificadores):
+        """
+        Marca como escritos los `identificadores` y devuelve los que nadie había reclamado antes.
+        """
+        with self._lock:
+            nuevos = {i for i in identificadores if i not in self._identificadores}
+            self._identificadores.update(nuevos)
+        return nuevos
+
+
+class ConteoEditoriales:
+    """
+    Cuenta los `dc:publisher` no vacíos de los artículos escritos en una cosecha, para
+    asignar a la revista el más frecuente. Los flujos por set de una revista comparten uno.
+    Los artículos sin editorial (`NO_DISPONIBLE` tras limpiar_texto) no se cuentan.
+    """
+
+    def __init__(self):
+        self.conteo = Counter()
+        self._lock = threading.Lock()
+
+    def contar(self, articulos):
+        editoriales = Counter(a.publisher for a in articulos if a.publisher and a.publisher != NO_DISPONIBLE)
+        with self._lock:
+            self.conteo.update(editoriales)
+
+    def mas_frecuente(self):
+        with self._lock:
+            # Ante un empate se elige la primera en orden alfabético, para que el resultado sea estable.
+            return min(self.conteo.items(), key=lambda par: (-par[1], par[0]), default=(None, 0))[0]
+
+
+class Cronometro:
+    """
+    Acumula el tiempo dedicado a cada etapa de una cosecha: "descarga", "analisis" y
+    "escritura" ("descarga_analisis" en modo streaming, donde ambas se intercalan).
+    Con el pipeline activo las etapas se solapan y su suma puede superar el tiempo total.
+    """
+
+    def __init__(self):
+        self.tiempos = Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.tiempos[etapa] += time.perf_counter() - inicio
+
+
+def cosechar_datos_directo(
+    url,
+    metadata_prefix,
+    revista_id,
+    batch_size=None,
+    streaming=None,
+    limite_host=None,
+    completa=False,
+    desde=None,
+    hasta=None,
+    pipeline=None,
+    al_iniciar=None,
+    cronometro=None,
+    set_spec=None,
+    compartidos=None,
+    procesos=None,
+    editoriales=None,
+):
+    """
+    Descarga y almacena los artículos desde un servidor OAI-PMH.
+    Cada página de ListRecords se guarda en una transacción con un upsert masivo.
+    Con `streaming=True` cada página se analiza de forma incremental mientras se descarga,
+    con memoria acotada por `batch_size` en lugar del tamaño de la página.
+    Las peticiones pasan por `ClienteOAI`, que reutiliza conexiones, negocia la compresión
+    declarada por la revista y reintenta los fallos pasajeros.
+    `limite_host` (un `LimitePorHost`) acota las conexiones simultáneas contra el mismo
+    servidor cuando varias cosechas se ejecutan en paralelo.
+
+    La cosecha es incremental: si la revista ya fue cosechada, solo se piden los registros
+    modificados desde `last_harvest_date` (o desde `desde`, si se indica). Los registros
+    marcados como eliminados se borran. Con `completa=True` se descarga todo el repositorio
+    y, al terminar, se borran los artículos de la revista que ya no aparecen en él.
+
+    Cada cosecha queda registrada en un `HarvestRun` con el último resumptionToken confirmado.
+    Si la última cosecha de la revista se interrumpió, se reanuda desde esa página; si el
+    repositorio ya no acepta el token, se vuelve a pedir la misma ventana desde el principio.
+    `al_iniciar`, si se indica, recibe el `HarvestRun` antes de pedir la primera página.
+    Con `pipeline=True` la descarga y el análisis corren en un hilo aparte, conectados
+    con la escritura en la base de datos mediante una cola acotada.
+    Con `procesos` mayor que cero, el análisis de las páginas se reparte entre ese número
+    de procesos (ver `leer_paginas_en_procesos`) y se ignora `streaming`.
+    Si se pasa un `Cronometro`, acumula en él el tiempo de cada etapa.
+    Si COSECHA_ARCHIVO_DIR está configurado, cada página recibida se archiva comprimida
+    para poder volver a procesarla con el comando `reprocesar`.
+
+    Con `set_spec` solo se cosecha ese set, con su propio `HarvestRun`; es una parte de una
+    cosecha por sets (ver `motor_cosecha.cosechar_por_sets`), que es quien actualiza
+    `last_harvest_date` cuando terminan todos los sets. Los flujos paralelos comparten
+    `compartidos` (un `RegistrosCompartidos`) para no escribir dos veces el mismo registro.
+    Los registros cuya huella (`calcular_huella`) no cambió no se reescriben.
+    Al terminar se recalculan las estadísticas materializadas de la revista y, si no tiene
+    editorial, se le asigna el `dc:publisher` más frecuente entre los artículos cosechados.
+    Con `set_spec` las editoriales solo se cuentan en `editoriales` (un `ConteoEditoriales`)
+    y ambas tareas quedan a cargo de `cosechar_por_sets`.
+    Devuelve un diccionario con el número de artículos creados, actualizados, sin cambios y eliminados.
+    """
+    if streaming is None:
+        streaming = settings.COSECHA_STREAMING
+    if pipeline is None:
+        pipeline = settings.COSECHA_PIPELINE
+    if procesos is None:
+        procesos = settings.COSECHA_PROCESOS
+
     try:
         revista = Revista.objects.get(id=revista_id)
     except Revista.DoesNotExist:
         raise ValueError(f"La revista con id {revista_id} no existe.")
 
+    cosecha = revista.cosechas.filter(set_spec=set_spec).first()
+    if cosecha and cosecha.reanudable and cosecha.completa == completa and desde is None and hasta is None:
+        # Se retoma la ventana de la cosecha interrumpida desde la última página confirmada.
+        print(f"Reanudando la cosecha interrumpida desde la página {cosecha.paginas + 1}")
+        desde, hasta = cosecha.desde, cosecha.hasta
+        cosecha.estado = HarvestRun.EN_CURSO
+        cosecha.latido = timezone.now()
+        cosecha.save(update_fields=["estado", "latido"])
+    else:
+        if completa:
+            desde = None
+        elif desde is None:
+            desde = revista.last_harvest_date
+        # La hora de inicio se guarda para que la próxima cosecha incluya lo modificado durante esta.
+        cosecha = HarvestRun.objects.create(
+            revista=revista, completa=completa, set_spec=set_spec, desde=desde, hasta=hasta
+        )
+
+    if al_iniciar:
+        al_iniciar(cosecha)
+
+    params = {"metadataPrefix": metadata_prefix}
+    if desde:
+        params["from"] = formatear_fecha_oai(desde, revista.granularity)
+    if hasta:
+        params["until"] = formatear_fecha_oai(hasta, revista.granularity)
+    if set_spec:
+        params["set"] = set_spec
+
     print(f"Iniciando la cosecha desde: {url} con prefijo: {metadata_prefix}")
+    # En una cosecha completa se recuerdan los identificadores vistos para detectar los borrados.
+    # Si se reanuda no se conocen los de las páginas anteriores y no se borra nada. Un set
+    # no cubre todo el repositorio, así que tampoco se borra nada al cosechar por sets.
+    vistos = set() if completa and not cosecha.paginas and not set_spec else None
+    editoriales = editoriales or ConteoEditoriales()
+    opciones = {
+        "cliente": ClienteOAI.para_revista(revista, limite_host=limite_host),
+        "url": url,
+        "params": params,
+        "streaming": streaming,
+        "batch_size": batch_size or settings.COSECHA_BATCH_SIZE,
+        "pipeline": pipeline,
+        "vistos": vistos,
+        "cronometro": cronometro or Cronometro(),
+        "compartidos": compartidos,
+        "archivo_dir": settings.COSECHA_ARCHIVO_DIR,
+        "procesos": procesos,
+        "editoriales": editoriales,
+    }
+
+    try:
+        try:
+            _cosechar_paginas(cosecha, cosecha.resumption_token, **opciones)
+        except ErrorOAI as e:
+            if e.codigo != "badResumptionToken" or not cosecha.resumption_token:
+                raise
+            print("El repositorio ya no acepta el resumptionToken guardado; se reinicia la ventana de la cosecha.")
+            cosecha.reiniciar()
+            _cosechar_paginas(cosecha, None, **opciones)
+
+        eliminados = eliminar_no_vistos(revista, vistos) if vistos is not None else 0
+    except Exception as e:
+        cosecha.finalizar(HarvestRun.FALLIDA, str(e))
+        raise
+
+    cosecha.eliminados += eliminados
+    cosecha.finalizar(HarvestRun.COMPLETADA)
+    if not set_spec:
+        # Solo la fecha: la revista pudo editarse en el admin mientras duraba la cosecha.
+        revista.last_harvest_date = cosecha.inicio
+        revista.save(update_fields=["last_harvest_date"])
+
+    totales = {
+        "creados": cosecha.creados,
+        "actualizados": cosecha.actualizados,
+        "sin_cambios": cosecha.sin_cambios,
+        "eliminados": cosecha.eliminados,
+    }
+    print(
+        f"Cosecha completada. Creados: {totales['creados']}, actualizados: {totales['actualizados']}, "
+        f"sin cambios: {totales['sin_cambios']}, eliminados: {totales['eliminados']}"
+    )
+    if not set_spec:
+        asignar_editorial(revista, editoriales.mas_frecuente())
+        recalcular_estadisticas([revista])
+        invalidar_respuestas(revista.id)
+    return totales
+
+
+def _cosechar_paginas(
+    cosecha,
+    resumption_token,
+    cliente,
+    url,
+    params,
+    streaming,
+    batch_size,
+    pipeline,
+    vistos,
+    cronometro,
+    compartidos,
+    archivo_dir,
+    procesos,
+    editoriales,
+):
+    """
+    Descarga y guarda las páginas a partir de `resumption_token` (o desde la primera).
+    Cada página y el punto de control de `cosecha` se confirman en la misma transacción.
+    Con `archivo_dir` las páginas se archivan numeradas a continuación de las ya confirmadas.
+    """
+    archivo = ArchivoPaginas(archivo_dir, cosecha.revista_id, cosecha.id, cosecha.paginas + 1) if archivo_dir else None
+    if procesos:
+        eventos = leer_paginas_en_procesos(cliente, url, params, procesos, resumption_token, cronometro, archivo)
+    else:
+        eventos = leer_paginas(cliente, url, params, streaming, batch_size, resumption_token, cronometro, archivo)
+    if pipeline:
+        # La descarga y el análisis de la página siguiente avanzan mientras se guarda la actual.
+        eventos = en_segundo_plano(eventos, settings.COSECHA_PIPELINE_PROFUNDIDAD)
+
+    with closing(eventos):
+        while True:
+            # Si la descarga o el análisis fallan a mitad de página, la página se revierte completa.
+            pagina = {}
+            with transaction.atomic():
+                resultado = guardar_registros(
+                    registros_de_pagina(eventos, pagina),
+                    cosecha.revista,
+                    batch_size,
+                    vistos,
+                    cronometro,
+                    compartidos,
+                    editoriales,
+                )
+                with cronometro.medir("escritura"):
+                    cosecha.registrar_pagina(pagina.get("resumption_token"), resultado)
+            print(
+                f"Artículos creados: {resultado['creados']}, actualizados: {resultado['actualizados']}, "
+                f"sin cambios: {resultado['sin_cambios']}, eliminados: {resultado['eliminados']}"
+            )
+            if not pagina.get("resumption_token"):
+                break
+
+
+def leer_paginas(
+    cliente, url, params, streaming=False, batch_size=None, resumption_token=None, cronometro=None, archivo=None
+):
+    """
+    Descarga con `cliente` (un `ClienteOAI`) y analiza las páginas de ListRecords
+    siguiendo los resumptionToken, empezando por `resumption_token` si se indica.
+
+    Es un generador de eventos: `("registros", lote)` con listas de registros procesados y,
+    al terminar cada página, `("pagina", resumption_token)`, con `None` en la última.
+    En modo streaming cada página se entrega en lotes de `batch_size` registros.
+    Si se pasa un `Cronometro`, mide la descarga y el análisis de cada página.
+    Si se pasa un `ArchivoPaginas`, guarda en él el cuerpo de cada página recibida.
+    """
+    batch_size = batch_size or settings.COSECHA_BATCH_SIZE
+    cronometro = cronometro or Cronometro()
     base_url = f"{url}?verb=ListRecords"
-    next_token = None
+    next_token = resumption_token
 
     while True:
         # Construcción de la URL de solicitud
         if next_token:
-            request_url = f"{base_url}&resumptionToken={next_token}"
+            request_url = f"{base_url}&{urlencode({'resumptionToken': next_token})}"
         else:
-            request_url = f"{base_url}&metadataPrefix={metadata_prefix}"
+            request_url = f"{base_url}&{urlencode(params)}"
 
         print(f"Realizando solicitud a: {request_url}")
-        response = requests.get(request_url)
+        with ExitStack() as conexion:
+            # La espera de la respuesta cuenta como descarga, incluidos los reintentos.
+            with cronometro.medir("descarga_analisis" if streaming else "descarga"):
+                response = conexion.enter_context(cliente.solicitar(request_url, stream=streaming))
+            if streaming:
+                # La conexión sigue ocupada mientras los registros se leen por lotes.
+                response.raw.decode_content = True
+                flujo = response.raw
+                if archivo is not None:
+                    # La página se copia al archivo a medida que se lee.
+                    flujo = CopiaFlujo(flujo, conexion.enter_context(archivo.escribir()))
+                lector = LectorListRecords(flujo)
+                lotes = en_lotes(lector, batch_size)
+                while True:
+                    # Solo se mide la lectura: el generador queda suspendido mientras se guarda el lote.
+                    with cronometro.medir("descarga_analisis"):
+                        lote = next(lotes, None)
+                    if lote is None:
+                        break
+                    yield "registros", lote
+                next_token = lector.resumption_token
+            else:
+                with cronometro.medir("descarga"):
+                    texto = response.text
+                contenido = response.content
 
-        if response.status_code != 200:
-            raise Exception(f"Error al conectar con {url}. Código de estado: {response.status_code}")
+        if not streaming:
+            print(f"Respuesta XML recibida:\n{texto[:500]}... [truncado]")
+            with cronometro.medir("analisis"):
+                registros, next_token = procesar_respuesta(texto)
+            if archivo is not None:
+                # Solo se archivan las páginas válidas, no las respuestas de error.
+                archivo.guardar(contenido)
+            print(f"Registros cosechados en este lote: {len(registros)}")
+            yield "registros", registros
 
-        print(f"Respuesta XML recibida:\n{response.text[:500]}... [truncado]")
+        yield "pagina", next_token
 
-        try:
-            registros, next_token = procesar_respuesta(response.text)
-        except Exception as e:
-            print(f"Error al procesar la respuesta: {e}")
-            break
-
-        print(f"Registros cosechados en este lote: {len(registros)}")
-
-        for registro in registros:
-            # Crear o actualizar un artículo
-            articulo, created = Articulo.objects.update_or_create(
-                identifier=registro['identifier'],
-                defaults={
-                    "fuente": revista,  # Relación con la revista
-                    "datestamp": formatear_fecha(registro['datestamp']),
-                    "set_spec": limpiar_texto(registro.get('set_spec')),
-                    "title_es": limpiar_texto(registro.get('title_es')),
-                    "title_en": limpiar_texto(registro.get('title_en')),
-                    "creator": limpiar_texto(registro.get('creator')),
-                    "publisher": limpiar_texto(registro.get('publisher')),
-                    "type": limpiar_texto(registro.get('type')),
-                    "format": limpiar_texto(registro.get('format')),
-                    "identifier_url": registro.get('identifier_url'),
-                    "language": limpiar_texto(registro.get('language')),
-                    "relation": limpiar_texto(registro.get('relation')),
-                    "coverage": limpiar_texto(registro.get('coverage')),
-                    "rights": limpiar_texto(registro.get('rights')),
-                    "date": formatear_fecha(registro.get('date')),
-                    "subjects_es": "; ".join(registro.get('subjects_es', [])),
-                    "subjects_en": "; ".join(registro.get('subjects_en', [])),
-                    "descriptions_es": "; ".join(registro.get('descriptions_es', [])),
-                    "descriptions_en": "; ".join(registro.get('descriptions_en', [])),
-                    "sources": "; ".join(registro.get('sources', [])),
-                }
+        if not next_token:
+            print("No hay más registros para cosechar.")
+            return
+
+
+def leer_paginas_en_procesos(cliente, url, params, procesos, resumption_token=None, cronometro=None, archivo=None):
+    """
+    Variante de `leer_paginas` que reparte el análisis XML entre `procesos` procesos, para
+    aprovechar todos los núcleos: el análisis es CPU y en un solo proceso lo limita el GIL.
+
+    Para pedir la página siguiente sin esperar al análisis, el resumptionToken se toma de
+    los últimos bytes de la página (`token_de_cola`); al recibir el análisis se comprueba
+    que coincida. Los procesos devuelven tuplas (`registro_a_tupla`) y los eventos se
+    producen en el orden de las páginas, así que la escritura sigue siendo secuencial.
+    """
+    cronometro = cronometro or Cronometro()
+    base_url = f"{url}?verb=ListRecords"
+    next_token = resumption_token
+    pendientes = deque()
+
+    def entregar(futuro, contenido, token):
+        with cronometro.medir("analisis"):
+            tuplas, token_analizado = futuro.result()
+        if token_analizado != token:
+            raise ValueError(
+                f"El resumptionToken de la página ({token_analizado!r}) no coincide con el leído al final ({token!r})."
             )
-            print(f"Artículo {'creado' if created else 'actualizado'}: {registro.get('title_es')}")
+        if archivo is not None:
+            archivo.guardar(contenido)
+        print(f"Registros cosechados en este lote: {len(tuplas)}")
+        yield "registros", [tupla_a_registro(tupla) for tupla in tuplas]
+        yield "pagina", token
 
-        if not next_token:
+    with crear_pool_analisis(procesos) as pool:
+        try:
+            while True:
+                if next_token:
+                    request_url = f"{base_url}&{urlencode({'resumptionToken': next_token})}"
+                else:
+                    request_url = f"{base_url}&{urlencode(params)}"
+
+                print(f"Realizando solicitud a: {request_url}")
+                with cronometro.medir("descarga"):
+                    with cliente.solicitar(request_url) as response:
+                        contenido = response.content
+
+                # Una página de error no trae token: se termina y el error llega con su análisis.
+                next_token = token_de_cola(contenido)
+                pendientes.append((pool.submit(analizar_pagina, contenido), contenido, next_token))
+                if len(pendientes) >= procesos:
+                    yield from entregar(*pendientes.popleft())
+                if not next_token:
+                    break
+
+            while pendientes:
+                yield from entregar(*pendientes.popleft())
             print("No hay más registros para cosechar.")
-            break
+        finally:
+            for futuro, _, _ in pendientes:
+                futuro.cancel()
 
-    revista.last_harvest_date = now()
-    revista.save()
 
-    print("Cosecha completada.")
-    transfer_publisher_to_revista()
+def crear_pool_analisis(procesos):
+    """
+    Crea el pool de procesos que analiza páginas. Se usa "spawn" porque el proceso que
+    cosecha tiene otros hilos en marcha; cada proceso nuevo inicializa Django al arrancar.
+    """
+    return ProcessPoolExecutor(
+        max_workers=procesos, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+    )
 
 
-def procesar_respuesta(xml_response):
+def analizar_archivadas_en_procesos(rutas, procesos):
     """
-    Procesa la respuesta XML y devuelve los registros en un formato limpio utilizando Dublin Core.
+    Analiza las páginas archivadas `rutas` en el pool de `crear_pool_analisis` y produce sus
+    registros en el orden de `rutas`. Como en `leer_paginas_en_procesos`, nunca hay más de
+    `procesos` páginas en análisis o en espera, así que la memoria no crece con el archivo.
     """
-    registros = []
-    namespaces = {
+    pendientes = deque()
+    with crear_pool_analisis(procesos) as pool:
+        try:
+            for ruta in rutas:
+                pendientes.append(pool.submit(procesar_pagina_archivada, ruta))
+                if len(pendientes) >= procesos:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+        finally:
+            for futuro in pendientes:
+                futuro.cancel()
+
+
+def registros_de_pagina(eventos, pagina):
+    """
+    Consume los eventos de `leer_paginas` hasta el final de la página actual y produce sus
+    registros. Al terminar deja el resumptionToken de la página siguiente en `pagina`.
+    """
+    for tipo, valor in eventos:
+        if tipo == "pagina":
+            pagina["resumption_token"] = valor
+            return
+        yield from valor
+
+
+class _Fin:
+    """
+    Marca el final de la cola de `en_segundo_plano`, con la excepción del productor si la hubo.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+def en_segundo_plano(eventos, profundidad):
+    """
+    Ejecuta el generador `eventos` en un hilo aparte y entrega sus elementos a través de
+    una cola de como máximo `profundidad` elementos, que acota la memoria ocupada.
+    Las excepciones del hilo se relanzan en quien consume. Si quien consume se detiene
+    antes de tiempo, el hilo termina en cuanto intenta encolar el siguiente elemento.
+    """
+    cola = queue.Queue(maxsize=profundidad)
+    detener = threading.Event()
+
+    def encolar(elemento):
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def productor():
+        try:
+            for evento in eventos:
+                if not encolar(evento):
+                    return
+        except BaseException as e:
+            encolar(_Fin(e))
+        else:
+            encolar(_Fin())
+        finally:
+            eventos.close()
+
+    hilo = threading.Thread(target=productor, name="cosecha-descarga", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            elemento = cola.get()
+            if isinstance(elemento, _Fin):
+                if elemento.error is not None:
+                    raise elemento.error
+                return
+            yield elemento
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def eliminar_no_vistos(revista, vistos):
+    """
+    Borra los artículos de la revista cuyo identificador no apareció en una cosecha completa.
+    Cubre los repositorios que no conservan los registros eliminados (deletedRecord `no` o `transient`).
+    """
+    existentes = Articulo.objects.filter(fuente=revista).values_list("identifier", flat=True)
+    sobrantes = [identifier for identifier in existentes.iterator() if identifier not in vistos]
+    eliminados = 0
+    for lote in en_lotes(sobrantes, settings.COSECHA_BATCH_SIZE):
+        eliminados += Articulo.objects.filter(fuente=revista, identifier__in=lote).delete()[1].get(
+            Articulo._meta.label, 0
+        )
+    return eliminados
+
+
+def construir_articulo(registro, revista):
+    """
+    Construye una instancia (sin guardar) de `Articulo` a partir de un registro procesado.
+    Sus autores normalizados (`autores_de`) quedan en `autores_normalizados` y sus
+    palabras clave (`palabras_clave_de`) en `palabras_normalizadas`, sin repetir, para
+    enlazarlos tras guardar el artículo.
+    """
+    articulo = Articulo(
+        fuente=revista,
+        identifier=registro['identifier'],
+        datestamp=formatear_fecha(registro['datestamp']),
+        set_spec=limpiar_texto(registro.get('set_spec')),
+        title_es=limpiar_texto(registro.get('title_es')),
+        title_en=limpiar_texto(registro.get('title_en')),
+        creator=limpiar_texto(registro.get('creator')),
+        publisher=limpiar_texto(registro.get('publisher')),
+        type=limpiar_texto(registro.get('type')),
+        format=limpiar_texto(registro.get('format')),
+        identifier_url=registro.get('identifier_url'),
+        language=limpiar_texto(registro.get('language')),
+        relation=limpiar_texto(registro.get('relation')),
+        coverage=limpiar_texto(registro.get('coverage')),
+        rights=limpiar_texto(registro.get('rights')),
+        date=formatear_fecha(registro.get('date')),
+        subjects_es="; ".join(registro.get('subjects_es', [])),
+        subjects_en="; ".join(registro.get('subjects_en', [])),
+        descriptions_es="; ".join(registro.get('descriptions_es', [])),
+        descriptions_en="; ".join(registro.get('descriptions_en', [])),
+        sources="; ".join(registro.get('sources', [])),
+    )
+    articulo.autores_normalizados = autores_de(registro.get('creators') or [])
+    articulo.palabras_normalizadas = palabras_clave_de(
+        [*registro.get('subjects_es', []), *registro.get('subjects_en', [])]
+    )
+    return articulo
+
+
+def en_lotes(iterable, tamano):
+    """
+    Agrupa un iterable (posiblemente un generador) en listas de como máximo `tamano` elementos.
+    """
+    lote = []
+    for elemento in iterable:
+        lote.append(elemento)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def guardar_registros(
+    registros, revista, batch_size=None, vistos=None, cronometro=None, compartidos=None, editoriales=None
+):
+    """
+    Guarda una página de registros en una sola transacción mediante upserts masivos
+    por `identifier`, de `batch_size` registros cada uno. `registros` puede ser una
+    lista o un generador, que se consume por lotes sin materializar la página completa.
+    Los registros marcados como eliminados se borran en bloque. Si se pasa `vistos`,
+    se le agregan los identificadores recibidos. Si se pasa un `Cronometro`, mide en
+    "escritura" solo el tiempo de las consultas, no el de producir los registros.
+    Con `compartidos` (un `RegistrosCompartidos`) se omiten los registros que otro flujo
+    de la misma cosecha ya escribió. Con `editoriales` (un `ConteoEditoriales`) se cuentan
+    las editoriales de los artículos recibidos.
+    Devuelve un diccionario con el número de artículos creados, actualizados, sin cambios y eliminados.
+    """
+    batch_size = batch_size or settings.COSECHA_BATCH_SIZE
+    cronometro = cronometro or Cronometro()
+    resultado = Counter(creados=0, actualizados=0, sin_cambios=0, eliminados=0)
+
+    with transaction.atomic():
+        for lote in en_lotes(registros, batch_size):
+            with cronometro.medir("escritura"):
+                resultado.update(_guardar_lote(lote, revista, vistos, compartidos, editoriales))
+
+    return dict(resultado)
+
+
+def _guardar_lote(registros, revista, vistos=None, compartidos=None, editoriales=None):
+    """
+    Inserta o actualiza un lote de registros con una consulta que carga las huellas
+    existentes y un INSERT masivo, y borra con una sola consulta los que el repositorio
+    marca como eliminados. Los artículos cuya huella no cambió no se escriben.
+    """
+    # Si un identificador se repite dentro del lote, prevalece la última aparición.
+    articulos = {}
+    eliminados = set()
+    for registro in registros:
+        identifier = registro.get('identifier')
+        if not identifier:
+            continue
+        if registro.get('deleted'):
+            articulos.pop(identifier, None)
+            eliminados.add(identifier)
+        else:
+            eliminados.discard(identifier)
+            articulos[identifier] = construir_articulo(registro, revista)
+
+    if compartidos is not None:
+        nuevos = compartidos.reclamar([*articulos, *eliminados])
+        articulos = {identifier: a for identifier, a in articulos.items() if identifier in nuevos}
+        eliminados &= nuevos
+
+    if vistos is not None:
+        vistos.update(articulos)
+    if editoriales is not None:
+        editoriales.contar(articulos.values())
+
+    resultado = {"creados": 0, "actualizados": 0, "sin_cambios": 0, "eliminados": 0}
+    if eliminados:
+        borrados = Articulo.objects.filter(fuente=revista, identifier__in=eliminados).delete()[1]
+        resultado["eliminados"] = borrados.get(Articulo._meta.label, 0)
+
+    if not articulos:
+        return resultado
+
+    # MySQL resuelve el conflicto con ON DUPLICATE KEY UPDATE y no admite indicar la clave.
+    unique_fields = ["identifier"] if connection.features.supports_update_conflicts_with_target else None
+
+    existentes = {
+        identifier: (id_, huella)
+        for identifier, id_, huella in Articulo.objects.filter(identifier__in=list(articulos)).values_list(
+            "identifier", "id", "huella"
+        )
+    }
+    cambiados = []
+    actualizados = []
+    for identifier, articulo in articulos.items():
+        articulo.huella = calcular_huella(articulo)
+        if identifier not in existentes:
+            resultado["creados"] += 1
+        elif existentes[identifier][1] == articulo.huella:
+            resultado["sin_cambios"] += 1
+            continue
+        else:
+            resultado["actualizados"] += 1
+            actualizados.append(existentes[identifier][0])
+        cambiados.append(articulo)
+
+    if cambiados:
+        Articulo.objects.bulk_create(
+            cambiados,
+            update_conflicts=True,
+            update_fields=CAMPOS_ACTUALIZABLES + ["huella"],
+            unique_fields=unique_fields,
+        )
+        _asignar_ids(cambiados)
+        enlazar_autores(cambiados, actualizados)
+        enlazar_palabras_clave(cambiados, actualizados)
+    return resultado
+
+
+def _asignar_ids(articulos):
+    """
+    Completa el id de los artículos recién escritos que no lo tienen: MySQL no devuelve
+    los id de un INSERT masivo con ON DUPLICATE KEY UPDATE.
+    """
+    sin_id = [articulo.identifier for articulo in articulos if articulo.pk is None]
+    if sin_id:
+        ids = dict(Articulo.objects.filter(identifier__in=sin_id).values_list("identifier", "id"))
+        for articulo in articulos:
+            if articulo.pk is None:
+                articulo.pk = ids[articulo.identifier]
+
+
+def enlazar_autores(articulos, reemplazar=()):
+    """
+    Enlaza en bloque artículos ya guardados con sus `autores_normalizados`, en el orden de
+    los dc:creator: crea los autores que faltan con un INSERT masivo que ignora los ya
+    existentes, lee sus id con una consulta y crea las autorías con otro INSERT masivo.
+    Antes se borran las autorías de los artículos de `reemplazar` (ids).
+    """
+    if reemplazar:
+        AutorArticulo.objects.filter(articulo_id__in=list(reemplazar)).delete()
+
+    nombres = {}
+    for articulo in articulos:
+        for nombre, clave in articulo.autores_normalizados:
+            nombres.setdefault(clave, nombre)
+    if not nombres:
+        return
+
+    # Otro flujo de la cosecha puede crear el mismo autor a la vez: los conflictos se ignoran.
+    Autor.objects.bulk_create(
+        [Autor(nombre=nombre, nombre_normalizado=clave) for clave, nombre in nombres.items()],
+        ignore_conflicts=True,
+    )
+    autores = dict(Autor.objects.filter(nombre_normalizado__in=list(nombres)).values_list("nombre_normalizado", "id"))
+    AutorArticulo.objects.bulk_create([
+        AutorArticulo(articulo_id=articulo.pk, autor_id=autores[clave], fuente_id=articulo.fuente_id, orden=orden)
+        for articulo in articulos
+        for orden, (_, clave) in enumerate(articulo.autores_normalizados)
+    ])
+
+
+def enlazar_palabras_clave(articulos, reemplazar=()):
+    """
+    Enlaza en bloque artículos ya guardados con sus `palabras_normalizadas`, igual que
+    `enlazar_autores`: un INSERT masivo de las palabras clave que faltan, una consulta
+    de sus id y un INSERT masivo de los enlaces. Antes se borran los enlaces de los
+    artículos de `reemplazar` (ids).
+    """
+    if reemplazar:
+        PalabraClaveArticulo.objects.filter(articulo_id__in=list(reemplazar)).delete()
+
+    nombres = {}
+    for articulo in articulos:
+        for nombre, clave in articulo.palabras_normalizadas:
+            nombres.setdefault(clave, nombre)
+    if not nombres:
+        return
+
+    PalabraClave.objects.bulk_create(
+        [PalabraClave(nombre=nombre, nombre_normalizado=clave) for clave, nombre in nombres.items()],
+        ignore_conflicts=True,
+    )
+    palabras = dict(
+        PalabraClave.objects.filter(nombre_normalizado__in=list(nombres)).values_list("nombre_normalizado", "id")
+    )
+    PalabraClaveArticulo.objects.bulk_create([
+        PalabraClaveArticulo(articulo_id=articulo.pk, palabra_clave_id=palabras[clave], fuente_id=articulo.fuente_id)
+        for articulo in articulos
+        for _, clave in articulo.palabras_normalizadas
+    ])
+
+
+def calcular_huella(articulo):
+    """
+    Huella del contenido de un artículo sin guardar: un hash del datestamp OAI y de los
+    campos ya normalizados de `CAMPOS_ACTUALIZABLES`. Si coincide con la guardada, el
+    registro no cambió desde la última cosecha.
+    """
+    huella = hashlib.blake2b(digest_size=16)
+    for campo in CAMPOS_ACTUALIZABLES:
+        valor = articulo.fuente_id if campo == "fuente" else getattr(articulo, campo)
+        huella.update(str(valor).encode("utf-8", "surrogatepass"))
+        huella.update(b"\x1f")
+    # Los coautores no tienen columna propia en el artículo, pero también forman parte del contenido.
+    for nombre, _ in getattr(articulo, "autores_normalizados", ()):
+        huella.update(nombre.encode("utf-8", "surrogatepass"))
+        huella.update(b"\x1e")
+    return huella.hexdigest()
+
+
+NAMESPACES = {
     "oai": "http://www.openarchives.org/OAI/2.0/",
     "dc": "http://purl.org/dc/elements/1.1/",
     "oai_dc": "http://www.openarchives.org/OAI/2.0/oai_dc/",
     "xml": "http://www.w3.org/XML/1998/namespace",  # Agregamos el prefijo xml
 }
 
+TAG_RECORD = f"{{{NAMESPACES['oai']}}}record"
+TAG_ERROR = f"{{{NAMESPACES['oai']}}}error"
+TAG_RESUMPTION_TOKEN = f"{{{NAMESPACES['oai']}}}resumptionToken"
+TAG_HEADER = f"{{{NAMESPACES['oai']}}}header"
+TAG_IDENTIFIER = f"{{{NAMESPACES['oai']}}}identifier"
+TAG_DATESTAMP = f"{{{NAMESPACES['oai']}}}datestamp"
+TAG_SET_SPEC = f"{{{NAMESPACES['oai']}}}setSpec"
+RUTA_DC = f"{{{NAMESPACES['oai']}}}metadata/{{{NAMESPACES['oai_dc']}}}dc"
+ATRIBUTO_LANG = f"{{{NAMESPACES['xml']}}}lang"
+
+DC = f"{{{NAMESPACES['dc']}}}"
+
+# Elementos Dublin Core sin idioma y el campo del registro al que van.
+CAMPOS_DC = {
+    DC + "creator": "creators",
+    DC + "publisher": "publisher",
+    DC + "type": "type",
+    DC + "format": "format",
+    DC + "identifier": "identifier_url",
+    DC + "language": "language",
+    DC + "relation": "relation",
+    DC + "coverage": "coverage",
+    DC + "rights": "rights",
+    DC + "date": "date",
+    DC + "source": "sources",
+}
+
+# Elementos Dublin Core que se separan por idioma (xml:lang ya normalizado).
+CAMPOS_DC_POR_IDIOMA = {
+    DC + "title": {"es": "title_es", "en": "title_en"},
+    DC + "subject": {"es": "subjects_es", "en": "subjects_en"},
+    DC + "description": {"es": "descriptions_es", "en": "descriptions_en"},
+}
+
+# Campos que admiten varios valores; el resto conserva la primera aparición.
+CAMPOS_MULTIVALOR = ("creators", "subjects_es", "subjects_en", "descriptions_es", "descriptions_en", "sources")
+
+# Variantes de xml:lang (ISO 639-1, ISO 639-2 y etiquetas regionales) de los idiomas que se guardan.
+IDIOMAS = {
+    "es": "es",
+    "es-es": "es",
+    "spa": "es",
+    "esp": "es",
+    "en": "en",
+    "en-us": "en",
+    "en-gb": "en",
+    "eng": "en",
+}
+
+
+class ErrorOAI(Exception):
+    """
+    Error devuelto por el repositorio en el elemento <error> de una respuesta OAI-PMH.
+    """
+
+    def __init__(self, codigo, mensaje=""):
+        self.codigo = codigo
+        self.mensaje = mensaje
+        super().__init__(f"{codigo}: {mensaje}" if mensaje else codigo)
+
+    def __reduce__(self):
+        # Conserva el código al pasar la excepción desde un proceso de análisis.
+        return self.__class__, (self.codigo, self.mensaje)
+
+
+def comprobar_error_oai(elemento):
+    """
+    Lanza `ErrorOAI` para un elemento <error>, salvo `noRecordsMatch`, que en una
+    cosecha incremental solo indica que no hubo cambios.
+    """
+    codigo = elemento.get("code")
+    if codigo != "noRecordsMatch":
+        raise ErrorOAI(codigo, (elemento.text or "").strip())
+
+
+@lru_cache(maxsize=256)
+def normalizar_idioma(lang):
+    """
+    Normaliza un valor de xml:lang ("es-ES", "spa", "es_CO"...) a "es" o "en", o None si
+    el idioma no se guarda. Las variantes regionales no listadas se resuelven por su prefijo.
+    """
+    if not lang:
+        return None
+    lang = lang.strip().lower().replace("_", "-")
+    return IDIOMAS.get(lang) or IDIOMAS.get(lang.split("-", 1)[0])
+
+
+def extraer_registro(record):
+    """
+    Extrae los campos Dublin Core de un elemento <record>. Los registros con
+    `status="deleted"` en la cabecera se devuelven solo con su identificador y `deleted=True`.
+    Devuelve None si el registro no tiene cabecera o metadatos.
+
+    Recorre una sola vez los hijos de la cabecera y de <oai_dc:dc>, y decide el campo de
+    cada elemento por su etiqueta y su xml:lang con las tablas `CAMPOS_DC` y `CAMPOS_DC_POR_IDIOMA`.
+    Todos los dc:creator quedan en `creators`, en orden; el primero también en `creator`.
+    """
+    header = record.find(TAG_HEADER)
+    if header is None:
+        return None
+
+    cabecera = {TAG_IDENTIFIER: None, TAG_DATESTAMP: None, TAG_SET_SPEC: None}
+    for elemento in header:
+        # Solo cuenta la primera aparición de cada elemento de la cabecera.
+        if cabecera.get(elemento.tag, "") is None:
+            cabecera[elemento.tag] = elemento.text or ""
+
+    if header.get("status") == "deleted":
+        return {
+            "identifier": cabecera[TAG_IDENTIFIER],
+            "datestamp": formatear_fecha(cabecera[TAG_DATESTAMP]),
+            "deleted": True,
+        }
+
+    metadata = record.find(RUTA_DC)
+    if metadata is None:
+        return None
+
+    registro = dict.fromkeys(CAMPOS_DC.values())
+    registro.update(title_es=None, title_en=None)
+    for campo in CAMPOS_MULTIVALOR:
+        registro[campo] = []
+
+    for elemento in metadata:
+        campo = CAMPOS_DC.get(elemento.tag)
+        if campo is None:
+            por_idioma = CAMPOS_DC_POR_IDIOMA.get(elemento.tag)
+            if por_idioma is None:
+                continue
+            campo = por_idioma.get(normalizar_idioma(elemento.get(ATRIBUTO_LANG)))
+            if campo is None:
+                continue
+
+        valor = registro[campo]
+        if valor is None:
+            registro[campo] = elemento.text or ""
+        elif isinstance(valor, list) and elemento.text:
+            valor.append(elemento.text)
+
+    registro["identifier"] = cabecera[TAG_IDENTIFIER]
+    registro["datestamp"] = formatear_fecha(cabecera[TAG_DATESTAMP])
+    registro["set_spec"] = cabecera[TAG_SET_SPEC]
+    registro["date"] = formatear_fecha(registro["date"])
+    registro["creator"] = registro["creators"][0] if registro["creators"] else None
+    return registro
+
+
+def procesar_respuesta(xml_response):
+    """
+    Procesa la respuesta XML y devuelve los registros en un formato limpio utilizando Dublin Core.
+    """
+    registros = []
+
     try:
         root = ET.fromstring(xml_response)
     except ET.ParseError as e:
         raise ValueError(f"Error al analizar el XML: {e}")
 
-    for record in root.findall("oai:ListRecords/oai:record", namespaces):
-        header = record.find("oai:header", namespaces)
-        metadata = record.find("oai:metadata/oai_dc:dc", namespaces)
+    for error in root.findall("oai:error", NAMESPACES):
+        comprobar_error_oai(error)
 
-        if header is None or metadata is None:
+    for record in root.findall("oai:ListRecords/oai:record", NAMESPACES):
+        registro = extraer_registro(record)
+        if registro is None:
             print("Registro inválido encontrado. Saltando...")
             continue
+        registros.append(registro)
 
-        registros.append({
-            "identifier": header.findtext("oai:identifier", namespaces=namespaces),
-            "datestamp": formatear_fecha(header.findtext("oai:datestamp", namespaces=namespaces)),
-            "set_spec": header.findtext("oai:setSpec", namespaces=namespaces),
-            "title_es": metadata.findtext("dc:title[@xml:lang='es-ES']", namespaces=namespaces),
-            "title_en": metadata.findtext("dc:title[@xml:lang='en-US']", namespaces=namespaces),
-            "creator": metadata.findtext("dc:creator", namespaces=namespaces),
-            "publisher": metadata.findtext("dc:publisher", namespaces=namespaces),
-            "type": metadata.findtext("dc:type", namespaces=namespaces),
-            "format": metadata.findtext("dc:format", namespaces=namespaces),
-            "identifier_url": metadata.findtext("dc:identifier", namespaces=namespaces),
-            "language": metadata.findtext("dc:language", namespaces=namespaces),
-            "relation": metadata.findtext("dc:relation", namespaces=namespaces),
-            "coverage": metadata.findtext("dc:coverage", namespaces=namespaces),
-            "rights": metadata.findtext("dc:rights", namespaces=namespaces),
-            "date": formatear_fecha(metadata.findtext("dc:date", namespaces=namespaces)),
-            "subjects_es": [s.text for s in metadata.findall("dc:subject[@xml:lang='es-ES']", namespaces) if s.text],
-            "subjects_en": [s.text for s in metadata.findall("dc:subject[@xml:lang='en-US']", namespaces) if s.text],
-            "descriptions_es": [d.text for d in metadata.findall("dc:description[@xml:lang='es-ES']", namespaces) if d.text],
-            "descriptions_en": [d.text for d in metadata.findall("dc:description[@xml:lang='en-US']", namespaces) if d.text],
-            "sources": [src.text for src in metadata.findall("dc:source", namespaces) if src.text],
-        })
-
-    next_token = root.findtext("oai:ListRecords/oai:resumptionToken", namespaces=namespaces)
+    next_token = root.findtext("oai:ListRecords/oai:resumptionToken", namespaces=NAMESPACES)
     return registros, next_token.strip() if next_token else None
+
+
+# Orden de los campos en las tuplas que devuelven los procesos de análisis.
+CAMPOS_REGISTRO = (
+    "identifier",
+    "datestamp",
+    "deleted",
+    "set_spec",
+    "title_es",
+    "title_en",
+    "creator",
+    "creators",
+    "publisher",
+    "type",
+    "format",
+    "identifier_url",
+    "language",
+    "relation",
+    "coverage",
+    "rights",
+    "date",
+    "subjects_es",
+    "subjects_en",
+    "descriptions_es",
+    "descriptions_en",
+    "sources",
+)
+
+# resumptionToken (con o sin prefijo de espacio de nombres, vacío o con contenido).
+PATRON_RESUMPTION_TOKEN = re.compile(
+    rb"<(?:[\w.-]+:)?resumptionToken\b[^>]*?(?:/>|>([^<]*)</(?:[\w.-]+:)?resumptionToken\s*>)"
+)
+# Bytes del final de la página en los que se busca el resumptionToken.
+COLA_PAGINA = 64 * 1024
+
+
+def registro_a_tupla(registro):
+    return tuple(registro.get(campo) for campo in CAMPOS_REGISTRO)
+
+
+def tupla_a_registro(tupla):
+    return dict(zip(CAMPOS_REGISTRO, tupla))
+
+
+def token_de_cola(contenido):
+    """
+    Devuelve el resumptionToken de una página ListRecords (bytes) buscándolo solo al final,
+    donde lo sitúa el protocolo, sin analizar el documento completo. None si no hay.
+    """
+    coincidencias = list(PATRON_RESUMPTION_TOKEN.finditer(contenido, max(0, len(contenido) - COLA_PAGINA)))
+    if not coincidencias:
+        return None
+    token = html.unescape((coincidencias[-1].group(1) or b"").decode("utf-8")).strip()
+    return token or None
+
+
+def analizar_pagina(contenido):
+    """
+    Analiza una página ListRecords en un proceso del pool. Devuelve los registros como
+    tuplas, que ocupan menos al serializarlas, y el resumptionToken.
+    """
+    registros, token = procesar_respuesta(contenido)
+    return [registro_a_tupla(registro) for registro in registros], token
+
+
+def procesar_pagina_archivada(ruta):
+    """
+    Analiza una página del archivo local. Se ejecuta en los procesos del comando `reprocesar`,
+    así que solo devuelve datos serializables: la lista de registros.
+    """
+    registros, _ = procesar_respuesta(leer_pagina(ruta))
+    return registros
+
+
+class LectorListRecords:
+    """
+    Recorre una respuesta ListRecords de forma incremental a partir de un objeto tipo archivo
+    (por ejemplo `response.raw` de una petición con `stream=True`).
+
+    Produce un registro a la vez y libera los elementos ya procesados, por lo que la memoria
+    no crece con el tamaño de la página. El resumptionToken aparece al final del documento,
+    así que `resumption_token` solo está disponible después de agotar el iterador.
+    """
+
+    def __init__(self, flujo):
+        self.flujo = flujo
+        self.resumption_token = None
+
+    def __iter__(self):
+        padres = []
+        try:
+            for evento, elemento in ET.iterparse(self.flujo, events=("start", "end")):
+                if evento == "start":
+                    padres.append(elemento)
+                    continue
+
+                padres.pop()
+                if elemento.tag == TAG_RECORD:
+                    registro = extraer_registro(elemento)
+                    if registro is None:
+                        print("Registro inválido encontrado. Saltando...")
+                    else:
+                        yield registro
+                    # Libera el registro y cualquier hermano ya procesado.
+                    if padres:
+                        padres[-1].clear()
+                elif elemento.tag == TAG_ERROR:
+                    comprobar_error_oai(elemento)
+                elif elemento.tag == TAG_RESUMPTION_TOKEN:
+                    token = (elemento.text or "").strip()
+                    self.resumption_token = token or None
+        except ET.ParseError as e:
+            raise ValueError(f"Error al analizar el XML: {e}")
@@ -1,47 +1,233 @@
 from rest_framework import generics
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import JsonResponse
-from .models import Revista, Articulo
-from .serializers import RevistaSerializer, ArticuloSerializer
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from .models import (
+    Revista, Articulo, Autor, AutorArticulo, EstadisticasPortal, EstadisticasRevista, PalabraClave,
+    PalabraClaveArticulo,
+)
+from .serializers import (
+    RevistaSerializer, RevistaListaSerializer, ArticuloSerializer, ArticuloListaSerializer,
+    ArticuloBusquedaSerializer, ArticuloBusquedaListaSerializer, AutorSerializer, AutorDetalleSerializer
+)
 from django.contrib import messages
 from .forms import RevistaImageUploadForm
+from .exportacion import CAMPOS_EXPORTACION, exportar_csv, exportar_ndjson, filas_por_bloques
+from .busqueda import buscar_articulos
+from .cache_respuestas import GLOBAL, datos_en_cache, respuesta_en_cache
+from .estadisticas import recalcular_estadisticas, recalcular_estadisticas_portal
+from .filtros import FILTROS_ARTICULOS, aplicar_filtros, contar_facetas, filtros_de_parametros
+from .paginacion import PaginacionArticulos, PaginacionAutores, PaginacionBusqueda
+from .utils import clave_normalizada
 from rest_framework.generics import ListAPIView
-from django.db.models import Min
+from django.db.models import Count, Prefetch
+
+
+def con_autores(articulos):
+    """
+    Agrega a `articulos` la carga de sus autores en orden, con una consulta por página
+    en lugar de una por artículo (ver ArticuloSerializer.autores).
+    """
+    return articulos.prefetch_related(
+        Prefetch("autorias", queryset=AutorArticulo.objects.select_related("autor").order_by("orden"))
+    )
+
+
+class SeleccionCamposMixin:
+    """
+    `?fields=a,b,c` elige los campos de la respuesta entre todos los de `serializer_campos`
+    (por defecto, `serializer_class`, que puede ser una versión compacta). El queryset
+    pasa por `limitar_columnas`, que lee con only() solo las columnas que se serializan:
+    las columnas TEXT largas no se piden a la base de datos si no se devuelven.
+    """
+    serializer_campos = None
+
+    def campos_solicitados(self):
+        """
+        Campos pedidos con `?fields=`, o None si no se indicaron.
+        """
+        parametro = self.request.query_params.get("fields", "")
+        campos = [campo.strip() for campo in parametro.split(",") if campo.strip()]
+        if not campos:
+            return None
+        desconocidos = [campo for campo in campos if campo not in self.get_serializer_class()().fields]
+        if desconocidos:
+            raise ValidationError({"fields": f"Campos desconocidos: {', '.join(desconocidos)}."})
+        return campos
+
+    def get_serializer_class(self):
+        if self.serializer_campos is not None and self.request.query_params.get("fields", "").strip(" ,"):
+            return self.serializer_campos
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("campos", self.campos_solicitados())
+        return super().get_serializer(*args, **kwargs)
+
+    def limitar_columnas(self, queryset):
+        campos = self.campos_solicitados() or list(self.get_serializer_class()().fields)
+        columnas = {campo.name for campo in queryset.model._meta.concrete_fields}
+        queryset = queryset.only(*[campo for campo in campos if campo in columnas])
+        if "autores" in campos:
+            queryset = con_autores(queryset)
+        return queryset
 
 
 class StatsView(APIView):
     """
     Devuelve estadísticas globales del portal: total de revistas, artículos y autores.
+    Se leen de la tabla materializada que se recalcula al terminar cada cosecha, y la
+    respuesta queda en caché hasta la próxima cosecha o edición de una revista.
     """
     def get(self, request):
-        total_revistas = Revista.objects.count()
-        total_articulos = Articulo.objects.count()
-        total_autores = Articulo.objects.values("creator").distinct().count()
-
-        data = {
-            "total_revistas": total_revistas,
-            "total_articulos": total_articulos,
-            "total_autores": total_autores,
+        return respuesta_en_cache(request, GLOBAL, self.datos, Response)
+
+    def datos(self):
+        portal = EstadisticasPortal.objects.filter(pk=1).first() or recalcular_estadisticas_portal()
+
+        return {
+            "total_revistas": portal.total_revistas,
+            "total_articulos": portal.total_articulos,
+            "total_autores": portal.total_autores,
         }
-        return Response(data)
 
 def instituciones_unicas(request):
     """
-    Devuelve una lista de instituciones únicas (publishers) del portal.
+    Devuelve una lista de instituciones únicas (publishers) del portal, en caché
+    hasta la próxima cosecha o edición de una revista.
     """
-    instituciones = Revista.objects.values_list('publisher', flat=True).distinct()
-    instituciones = list(filter(None, instituciones))  # Filtra valores nulos o vacíos
-    return JsonResponse(instituciones, safe=False)
+    def datos():
+        instituciones = Revista.objects.values_list('publisher', flat=True).distinct()
+        return list(filter(None, instituciones))  # Filtra valores nulos o vacíos
 
+    return respuesta_en_cache(
+        request, GLOBAL, datos, lambda instituciones: JsonResponse(instituciones, safe=False)
+    )
 
-class AllArticlesView(ListAPIView):
+
+class ArticulosFiltradosMixin:
     """
-    Vista para listar todos los artículos, sin importar la fuente.
+    Filtros de los listados de artículos (`?fuente=`, `?anio=`, `?idioma=`, `?tipo=`) y,
+    con `?facetas=1`, los conteos por valor de cada filtro junto a la página de resultados.
+    Los conteos se guardan en caché hasta la próxima cosecha.
     """
-    queryset = Articulo.objects.all()
-    serializer_class = ArticuloSerializer
+    filtros_disponibles = FILTROS_ARTICULOS
+
+    def articulos(self):
+        """
+        Artículos del listado antes de aplicar los filtros.
+        """
+        return Articulo.objects.all()
+
+    def ambito_cache(self):
+        return GLOBAL
+
+    def get_queryset(self):
+        self.filtros = filtros_de_parametros(self.request.query_params, self.filtros_disponibles)
+        return self.limitar_columnas(aplicar_filtros(self.articulos(), self.filtros))
+
+    def list(self, request, *args, **kwargs):
+        respuesta = super().list(request, *args, **kwargs)
+        if request.query_params.get("facetas") in ("1", "true"):
+            clave = "facetas:" + ",".join(f"{p}={v}" for p, v in sorted(self.filtros.items()))
+            respuesta.data["facetas"] = datos_en_cache(
+                self.ambito_cache(),
+                clave,
+                lambda: contar_facetas(self.articulos(), self.filtros, self.filtros_disponibles),
+            )
+        return respuesta
+
+
+class AllArticlesView(ArticulosFiltradosMixin, SeleccionCamposMixin, ListAPIView):
+    """
+    Vista para listar todos los artículos, sin importar la fuente, paginados por cursor.
+    """
+    serializer_class = ArticuloListaSerializer
+    serializer_campos = ArticuloSerializer
+    pagination_class = PaginacionArticulos
+
+
+class BuscarArticulosView(SeleccionCamposMixin, ListAPIView):
+    """
+    Búsqueda de texto completo en títulos, temas y descripciones (`?q=`), con los
+    resultados ordenados por relevancia y paginados. `?fuente=<id>` limita la búsqueda
+    a una revista.
+    """
+    serializer_class = ArticuloBusquedaListaSerializer
+    serializer_campos = ArticuloBusquedaSerializer
+    pagination_class = PaginacionBusqueda
+
+    def get_queryset(self):
+        consulta = self.request.query_params.get("q", "").strip()
+        if not consulta:
+            raise ValidationError({"q": "Indique el texto a buscar."})
+        articulos = Articulo.objects.all()
+        fuente = self.request.query_params.get("fuente")
+        if fuente is not None:
+            if not fuente.isdigit():
+                raise ValidationError({"fuente": "Debe ser el id de una revista."})
+            articulos = articulos.filter(fuente_id=fuente)
+        return self.limitar_columnas(buscar_articulos(consulta, articulos))
+
+
+def _fecha_de_parametro(valor):
+    """
+    Convierte una fecha (AAAA-MM-DD) o fecha y hora ISO 8601 del query string.
+    Devuelve None si el valor no es válido.
+    """
+    try:
+        fecha = parse_datetime(valor)
+        if fecha is None and parse_date(valor) is not None:
+            fecha = parse_datetime(f"{valor}T00:00:00")
+    except ValueError:
+        return None
+    if fecha is not None and is_naive(fecha):
+        fecha = make_aware(fecha)
+    return fecha
+
+
+class ExportarArticulosView(APIView):
+    """
+    Exporta los artículos en streaming, como NDJSON (por defecto) o CSV (`?formato=csv`).
+    Se filtran por revista con `?fuente=<id>` y por fecha de modificación con
+    `?desde=` y `?hasta=` (fechas ISO 8601, `hasta` exclusivo). Las filas se leen en
+    bloques y se escriben a medida que se producen, con memoria constante.
+    """
+    FORMATOS = {
+        "ndjson": (exportar_ndjson, "application/x-ndjson", "articulos.ndjson"),
+        "csv": (exportar_csv, "text/csv; charset=utf-8", "articulos.csv"),
+    }
+
+    def get(self, request):
+        formato = request.query_params.get("formato", "ndjson")
+        if formato not in self.FORMATOS:
+            return Response({"formato": f"Debe ser uno de: {', '.join(self.FORMATOS)}."}, status=400)
+
+        articulos = Articulo.objects.all()
+        fuente = request.query_params.get("fuente")
+        if fuente is not None:
+            if not fuente.isdigit():
+                return Response({"fuente": "Debe ser el id de una revista."}, status=400)
+            articulos = articulos.filter(fuente_id=fuente)
+        for parametro, filtro in (("desde", "datestamp__gte"), ("hasta", "datestamp__lt")):
+            valor = request.query_params.get(parametro)
+            if valor is None:
+                continue
+            fecha = _fecha_de_parametro(valor)
+            if fecha is None:
+                return Response({parametro: "Fecha inválida; use AAAA-MM-DD o ISO 8601."}, status=400)
+            articulos = articulos.filter(**{filtro: fecha})
+
+        exportar, content_type, nombre = self.FORMATOS[formato]
+        filas = filas_por_bloques(articulos, CAMPOS_EXPORTACION, settings.API_EXPORTACION_BLOQUE)
+        respuesta = StreamingHttpResponse(exportar(filas), content_type=content_type)
+        respuesta["Content-Disposition"] = f'attachment; filename="{nombre}"'
+        return respuesta
 
 
 def subir_imagen_revista(request, pk):
@@ -62,33 +248,45 @@ def subir_imagen_revista(request, pk):
     return render(request, 'revistas/subir_imagen.html', {'form': form, 'revista': revista})
 
 
-class RevistaListView(generics.ListAPIView):
+class RevistaListView(SeleccionCamposMixin, generics.ListAPIView):
     """
-    Vista para listar todas las revistas.
+    Vista para listar todas las revistas, en caché hasta la próxima cosecha o edición de una revista.
     """
-    queryset = Revista.objects.all()
-    serializer_class = RevistaSerializer
+    serializer_class = RevistaListaSerializer
+    serializer_campos = RevistaSerializer
+
+    def get_queryset(self):
+        return self.limitar_columnas(Revista.objects.all())
+
+    def list(self, request, *args, **kwargs):
+        def datos():
+            return self.get_serializer(self.get_queryset(), many=True).data
+
+        return respuesta_en_cache(request, GLOBAL, datos, Response)
 
 
 class RevistaDetailView(APIView):
     """
     Devuelve los detalles de una revista específica en formato JSON,
-    incluyendo información adicional como el total de artículos, autores y año de inicio.
+    incluyendo información adicional como el total de artículos, autores y años de inicio y fin,
+    que se leen de las estadísticas materializadas de la revista. La respuesta queda en
+    caché hasta la próxima cosecha o edición de la revista.
     """
     def get(self, request, pk):
-        # Obtener la revista
-        revista = get_object_or_404(Revista, pk=pk)
+        return respuesta_en_cache(request, pk, lambda: self.datos(pk), JsonResponse)
 
-        # Obtener datos adicionales
-        total_articles = Articulo.objects.filter(fuente=revista).count()
-        total_authors = Articulo.objects.filter(fuente=revista).values("creator").distinct().count()
-        
-        # Cambiar aggregate para calcular correctamente el año de inicio
-        start_year_data = Articulo.objects.filter(fuente=revista).aggregate(start_year=Min("date"))
-        start_year = start_year_data["start_year"]
+    def datos(self, pk):
+        # Revista y estadísticas materializadas en una sola consulta
+        revista = get_object_or_404(Revista.objects.select_related("estadisticas"), pk=pk)
+        try:
+            estadisticas = revista.estadisticas
+        except EstadisticasRevista.DoesNotExist:
+            # Revista aún sin cosechar desde que existen las estadísticas materializadas.
+            recalcular_estadisticas([revista])
+            estadisticas = EstadisticasRevista.objects.get(revista=revista)
 
         # Preparar los datos
-        data = {
+        return {
             "id": revista.id,
             "repository_name": revista.repository_name,
             "publisher": revista.publisher,
@@ -96,23 +294,27 @@ class RevistaDetailView(APIView):
             "last_harvest_date": revista.last_harvest_date,
             "description": revista.description,
             "official_url": revista.official_url,
-            "total_articles": total_articles,
-            "total_authors": total_authors,
-            "start_year": start_year.year if start_year else "Desconocido",
+            "total_articles": estadisticas.total_articulos,
+            "total_authors": estadisticas.total_autores,
+            "start_year": estadisticas.primer_anio or "Desconocido",
+            "end_year": estadisticas.ultimo_anio or "Desconocido",
         }
 
-        return JsonResponse(data)
-
 
-class ArticuloListView(generics.ListAPIView):
+class ArticuloListView(ArticulosFiltradosMixin, SeleccionCamposMixin, generics.ListAPIView):
     """
-    Vista para listar artículos asociados a una revista específica.
+    Vista para listar artículos asociados a una revista específica, paginados por cursor.
     """
-    serializer_class = ArticuloSerializer
+    serializer_class = ArticuloListaSerializer
+    serializer_campos = ArticuloSerializer
+    pagination_class = PaginacionArticulos
+    filtros_disponibles = {p: c for p, c in FILTROS_ARTICULOS.items() if p != "fuente"}
 
-    def get_queryset(self):
-        fuente_id = self.kwargs.get('fuente_id')
-        return Articulo.objects.filter(fuente_id=fuente_id)
+    def articulos(self):
+        return Articulo.objects.filter(fuente_id=self.kwargs.get('fuente_id'))
+
+    def ambito_cache(self):
+        return self.kwargs.get('fuente_id')
 
 
 class ArticulosPorRevistaView(APIView):
@@ -121,14 +323,117 @@ class ArticulosPorRevistaView(APIView):
     """
     def get(self, request, fuente_id):
         revista = get_object_or_404(Revista, id=fuente_id)
-        articulos = Articulo.objects.filter(fuente=revista)
+        articulos = con_autores(Articulo.objects.filter(fuente=revista))
         serializer = ArticuloSerializer(articulos, many=True)
         return Response(serializer.data)
 
 
-class ArticuloDetailView(generics.RetrieveAPIView):
+class ArticuloDetailView(SeleccionCamposMixin, generics.RetrieveAPIView):
     """
-    Vista para obtener los detalles de un artículo específico.
+    Vista para obtener los detalles de un artículo específico, con todos sus campos
+    o solo los de `?fields=`.
     """
-    queryset = Articulo.objects.all()
     serializer_class = ArticuloSerializer
+
+    def get_queryset(self):
+        return self.limitar_columnas(Articulo.objects.all())
+
+
+class AutorListView(generics.ListAPIView):
+    """
+    Vista para listar los autores en orden alfabético, paginados por cursor.
+    `?nombre=` filtra por el comienzo del nombre ("apellido, nombre"), sin distinguir
+    mayúsculas ni tildes.
+    """
+    serializer_class = AutorSerializer
+    pagination_class = PaginacionAutores
+
+    def get_queryset(self):
+        autores = Autor.objects.all()
+        nombre = clave_normalizada(self.request.query_params.get("nombre", ""))
+        if nombre:
+            # El prefijo como rango sobre la columna única, para que lo resuelva su índice
+            # también en SQLite, donde LIKE no distingue mayúsculas y no usa el índice.
+            siguiente = nombre[:-1] + chr(ord(nombre[-1]) + 1)
+            autores = autores.filter(nombre_normalizado__gte=nombre, nombre_normalizado__lt=siguiente)
+        return autores
+
+
+class AutorDetailView(generics.RetrieveAPIView):
+    """
+    Vista para obtener un autor con su número de artículos.
+    """
+    queryset = Autor.objects.annotate(total_articulos=Count("autorias"))
+    serializer_class = AutorDetalleSerializer
+
+
+class ArticulosPorAutorView(SeleccionCamposMixin, generics.ListAPIView):
+    """
+    Vista para listar los artículos de un autor, paginados por cursor.
+    """
+    serializer_class = ArticuloListaSerializer
+    serializer_campos = ArticuloSerializer
+    pagination_class = PaginacionArticulos
+
+    def get_queryset(self):
+        autor = get_object_or_404(Autor, pk=self.kwargs["pk"])
+        return self.limitar_columnas(Articulo.objects.filter(autorias__autor=autor))
+
+
+class PalabrasClaveView(APIView):
+    """
+    Devuelve las palabras clave más frecuentes con su número de artículos, en todo el
+    portal o en una revista (`?fuente=<id>`); `?limite=` indica cuántas. El conteo se
+    agrupa sobre los índices de la tabla de enlaces y la respuesta queda en caché hasta
+    la próxima cosecha (de la revista, si se filtra por una).
+    """
+    def get(self, request):
+        fuente = request.query_params.get("fuente")
+        if fuente is not None and not fuente.isdigit():
+            return Response({"fuente": "Debe ser el id de una revista."}, status=400)
+        limite = request.query_params.get("limite", str(settings.API_PALABRAS_CLAVE_LIMITE))
+        if not limite.isdigit() or int(limite) < 1:
+            return Response({"limite": "Debe ser un número entero positivo."}, status=400)
+        limite = min(int(limite), settings.API_PALABRAS_CLAVE_MAX_LIMITE)
+
+        if fuente is None:
+            return respuesta_en_cache(request, GLOBAL, lambda: self.datos(None, limite), Response)
+
+        fuente = int(fuente)
+        return respuesta_en_cache(request, fuente, lambda: self.datos(fuente, limite), Response)
+
+    def datos(self, fuente, limite):
+        enlaces = PalabraClaveArticulo.objects.all()
+        if fuente is not None:
+            enlaces = enlaces.filter(fuente_id=fuente)
+        conteos = list(
+            enlaces.values_list("palabra_clave_id")
+            .annotate(total=Count("id"))
+            .order_by("-total", "palabra_clave_id")[:limite]
+        )
+        # Los nombres se leen después, solo para las palabras clave de la respuesta.
+        palabras = PalabraClave.objects.in_bulk([palabra_id for palabra_id, _ in conteos])
+        return [
+            {"id": palabra_id, "nombre": palabras[palabra_id].nombre, "total_articulos": total}
+            for palabra_id, total in conteos
+        ]
+
+
+class ArticulosPorPalabraClaveView(SeleccionCamposMixin, generics.ListAPIView):
+    """
+    Vista para listar los artículos con una palabra clave, paginados por cursor.
+    `?fuente=<id>` los limita a una revista.
+    """
+    serializer_class = ArticuloListaSerializer
+    serializer_campos = ArticuloSerializer
+    pagination_class = PaginacionArticulos
+
+    def get_queryset(self):
+        palabra = get_object_or_404(PalabraClave, pk=self.kwargs["pk"])
+        articulos = Articulo.objects.filter(enlaces_palabras__palabra_clave=palabra)
+        fuente = self.request.query_params.get("fuente")
+        if fuente is not None:
+            if not fuente.isdigit():
+                raise ValidationError({"fuente": "Debe ser el id de una revista."})
+            articulos = articulos.filter(fuente_id=fuente)
+        return self.limitar_columnas(articulos)